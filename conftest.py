@@ -7,6 +7,29 @@ import pytz
 logger = logging.getLogger(__name__)
 
 
+def pytest_addoption(parser):
+    parser.addoption('--skip-stubs', action='store_true',
+                     help='Deselect @stub tests and do not import test modules containing nothing but @stub tests')
+    parser.addoption('--env-scheduling', action='store_true',
+                     help='With pytest-xdist, run tests needing the same environment and SDC hooks on the same worker, '
+                          'longest groups first')
+    parser.addoption('--sdc-pool', action='store_true',
+                     help='Share running Data Collectors between test modules whose hooks set them up the same way')
+    parser.addoption('--sdc-pool-size', type=int, default=4,
+                     help='Maximum number of Data Collectors kept running with --sdc-pool (default: 4)')
+
+
+def pytest_configure(config):
+    if config.getoption('env_scheduling'):
+        if not config.pluginmanager.hasplugin('xdist'):
+            raise pytest.UsageError('--env-scheduling requires pytest-xdist')
+        from environment_scheduling import EnvironmentSchedulingPlugin
+        config.pluginmanager.register(EnvironmentSchedulingPlugin(config), 'environment_scheduling')
+    if config.getoption('sdc_pool'):
+        from sdc_pool import SdcPoolPlugin
+        config.pluginmanager.register(SdcPoolPlugin(config), 'sdc_pool')
+
+
 @pytest.hookimpl(tryfirst=True, hookwrapper=True)
 def pytest_runtest_makereport(item):
     # execute all other hooks to obtain the report object
@@ -0,0 +1,198 @@
+# Copyright 2021 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A pytest-xdist scheduler grouping test modules by the environment they need (e.g. @database('oracle'),
+# @cluster('kafka')) and by the sdc_common_hook/sdc_builder_hook fixtures which decide how their SDC is set up. Each
+# group runs on a single worker, and thus a single SDC, while groups run in parallel on all workers, longest first
+# according to the durations recorded by previous runs. Modules are never split over groups, as each worker running
+# tests of a module would start its own module-scoped sdc_executor. Enabled with --env-scheduling along with xdist's -n
+# option.
+
+import ast
+import hashlib
+import logging
+import os
+from functools import lru_cache
+
+import pytest
+from xdist.scheduler import LoadScopeScheduling
+
+logger = logging.getLogger(__name__)
+
+DURATIONS_CACHE_KEY = 'stf/durations'
+
+# Markers of streamsets.testframework.markers which do not tell anything about the environment a test needs.
+NON_ENVIRONMENT_MARKERS = {'category', 'large', 'sdc_enterprise_lib_min_version', 'sdc_max_version', 'sdc_min_version'}
+# Markers of pytest itself, which may be used as pytest.mark.<name> like environment markers.
+PYTEST_MARKERS = {'filterwarnings', 'parametrize', 'skip', 'skipif', 'usefixtures', 'xfail'}
+
+HOOK_FIXTURES = ('sdc_builder_hook', 'sdc_common_hook')
+
+
+def _decorator_name(decorator):
+    if isinstance(decorator, ast.Call):
+        decorator = decorator.func
+    if isinstance(decorator, ast.Name):
+        return decorator.id
+    if isinstance(decorator, ast.Attribute):
+        return decorator.attr
+    return None
+
+
+def _is_pytest_mark(decorator):
+    # pytest.mark.<name> or pytest.mark.<name>(...)
+    if isinstance(decorator, ast.Call):
+        decorator = decorator.func
+    return (isinstance(decorator, ast.Attribute) and isinstance(decorator.value, ast.Attribute)
+            and decorator.value.attr == 'mark')
+
+
+class _ModuleInfo:
+    """What the scheduler needs to know about a test module or conftest, found by parsing its source."""
+    def __init__(self, path):
+        try:
+            with open(path) as module_file:
+                source = module_file.read()
+            tree = ast.parse(source)
+        except (OSError, SyntaxError):
+            source, tree = '', ast.Module(body=[])
+
+        markers = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module == 'streamsets.testframework.markers':
+                markers.update(alias.asname or alias.name for alias in node.names)
+        self._environment_markers = markers - NON_ENVIRONMENT_MARKERS
+
+        self.hooks = {node.name: ast.dump(node) for node in tree.body
+                      if isinstance(node, ast.FunctionDef) and node.name in HOOK_FIXTURES}
+
+        # Environment of the whole module, as sorted marker sources: its pytestmark along with the markers of each test
+        # function, test class and test method.
+        marks = []
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and any(isinstance(target, ast.Name) and target.id == 'pytestmark'
+                                                    for target in node.targets):
+                marks.extend(node.value.elts if isinstance(node.value, (ast.List, ast.Tuple)) else [node.value])
+            elif isinstance(node, ast.ClassDef):
+                marks.extend(node.decorator_list)
+                marks.extend(decorator for method in node.body if isinstance(method, ast.FunctionDef)
+                             for decorator in method.decorator_list)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                marks.extend(node.decorator_list)
+        self.environment = tuple(sorted({self._marker_source(source, mark)
+                                         for mark in marks if self._is_environment_marker(mark)}))
+
+    @staticmethod
+    def _marker_source(source, mark):
+        # pytest.mark.database('mysql') and database('mysql') are the same environment.
+        segment = ast.get_source_segment(source, mark) or _decorator_name(mark)
+        return segment.split('.mark.', 1)[-1] if _is_pytest_mark(mark) else segment
+
+    def _is_environment_marker(self, mark):
+        name = _decorator_name(mark)
+        if _is_pytest_mark(mark):
+            return name not in NON_ENVIRONMENT_MARKERS | PYTEST_MARKERS
+        return name in self._environment_markers
+
+
+@lru_cache(maxsize=None)
+def _module_info(path):
+    return _ModuleInfo(path)
+
+
+def _parents(directory, rootdir):
+    while True:
+        yield directory
+        if os.path.samefile(directory, rootdir) or os.path.dirname(directory) == directory:
+            return
+        directory = os.path.dirname(directory)
+
+
+def _hook_identity(module_path, rootdir):
+    # Each hook fixture comes from the test module itself or from the closest conftest.py defining it.
+    hooks = {}
+    conftests = [os.path.join(directory, 'conftest.py')
+                 for directory in _parents(os.path.dirname(module_path), rootdir)]
+    for path in [module_path] + conftests:
+        for name, definition in _module_info(path).hooks.items():
+            hooks.setdefault(name, definition)
+    if not hooks:
+        return 'default'
+    return hashlib.sha1(repr(sorted(hooks.items())).encode()).hexdigest()[:12]
+
+
+def module_group(nodeid, rootdir):
+    """Returns the name of the group of the test module of a test, e.g. ``stage hooks=default database('mysql')``."""
+    module = nodeid.partition('::')[0]
+    module_path = os.path.join(rootdir, module)
+    if not module.endswith('.py') or not os.path.isfile(module_path):
+        return module
+    return '{} hooks={} {}'.format(os.path.dirname(module) or '.', _hook_identity(module_path, rootdir),
+                                   ' '.join(_module_info(module_path).environment) or 'no-environment')
+
+
+class EnvironmentScheduling(LoadScopeScheduling):
+    """Distributes groups of test modules needing the same environment and SDC hooks over xdist workers, in the order
+    the groups were collected in (see :py:meth:`EnvironmentSchedulingPlugin.pytest_collection_modifyitems`).
+
+    Args:
+        config (:py:class:`_pytest.config.Config`): pytest configuration.
+        log (:obj:`py.log.Producer`, optional): xdist logger.
+    """
+    def __init__(self, config, log=None):
+        super().__init__(config, log)
+        self.rootdir = str(config.rootdir)
+
+    def _split_scope(self, nodeid):
+        return module_group(nodeid, self.rootdir)
+
+
+class EnvironmentSchedulingPlugin:
+    """Plugin making xdist use :py:class:`EnvironmentScheduling` and recording test durations for it."""
+    def __init__(self, config):
+        self.config = config
+        self.durations = config.cache.get(DURATIONS_CACHE_KEY, {})
+        self._run_durations = {}
+        # xdist (3.5 and later) otherwise queues groups by number of tests rather than in collection order.
+        if hasattr(config.option, 'loadscopereorder'):
+            config.option.loadscopereorder = False
+
+    def pytest_xdist_make_scheduler(self, config, log):
+        return EnvironmentScheduling(config, log)
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, session, config, items):
+        # Longest groups first, so that the last ones to finish are short (LPT scheduling). Every worker collects the
+        # same durations, and thus sorts its tests the same way, as xdist requires.
+        rootdir = str(config.rootdir)
+        # Tests which never ran are assumed to take as long as the average test.
+        default_duration = sum(self.durations.values()) / len(self.durations) if self.durations else 1
+        groups = {}
+        for item in items:
+            groups.setdefault(module_group(item.nodeid, rootdir), []).append(item)
+        durations = {group: sum(self.durations.get(item.nodeid, default_duration) for item in group_items)
+                     for group, group_items in groups.items()}
+        ordered = sorted(groups, key=lambda group: -durations[group])
+        logger.debug('Scheduling %s group(s) of tests: %s', len(ordered), ordered)
+        items[:] = [item for group in ordered for item in groups[group]]
+
+    def pytest_runtest_logreport(self, report):
+        self._run_durations[report.nodeid] = self._run_durations.get(report.nodeid, 0) + report.duration
+
+    def pytest_sessionfinish(self, session):
+        if hasattr(self.config, 'workerinput'):
+            # Workers forward their reports to the controller, which records the durations.
+            return
+        self.durations.update(self._run_durations)
+        self.config.cache.set(DURATIONS_CACHE_KEY, self.durations)
@@ -8,16 +8,194 @@ TODO STF-1674
 
 import logging
 import string
-from collections import deque
 
 import pytest
 import sqlalchemy
+from kafka import TopicPartition
 from kafka.admin import KafkaAdminClient, NewTopic
 from sqlalchemy.dialects.mssql import DATETIME2
 from streamsets.testframework.utils import get_random_string
 
+from .utils.utils_database import bulk_load_table, configure_jdbc_producer
+from .utils.utils_dataset_cache import DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES, DEFAULT_TTL, DatasetCache
+from .utils.utils_elasticsearch import (DEFAULT_CHUNK_SIZE, DEFAULT_MAX_CHUNK_BYTES, DEFAULT_THREAD_COUNT, bulk_index,
+                                        create_snapshot, restore_snapshot)
+from .utils.utils_kafka import bulk_load_topic
+from .utils.utils_metrics import (DEFAULT_SAMPLING_INTERVAL, ResourceSampler, format_stage_latency_breakdown,
+                                  get_batch_processing_percentiles, get_heap_used, get_stage_latency_breakdown)
+from .utils.utils_results import BenchmarkResultStore, compare
+from .utils.utils_scaling import DEFAULT_MIN_GAIN, format_scaling_report, scaling_reports
+from .utils.utils_warm_benchmark import WarmPipelineBenchmark
+
 logger = logging.getLogger(__name__)
 
+ELASTICSEARCH_VERSION_8 = 8
+
+
+@pytest.fixture(scope='module')
+def dataset_cache(benchmark_args):
+    # Datasets are only cached across sessions when asked for (DATASET_CACHE=true), as cached tables and topics are
+    # deliberately left behind in the environment.  DATASET_CACHE_TTL and DATASET_CACHE_MAX_ENTRIES bound how much data
+    # is left behind.
+    if str(benchmark_args.get('DATASET_CACHE', False)).lower() != 'true':
+        return None
+    return DatasetCache(path=benchmark_args.get('DATASET_CACHE_PATH', DEFAULT_CACHE_PATH),
+                        ttl=int(benchmark_args.get('DATASET_CACHE_TTL', DEFAULT_TTL)),
+                        max_entries=int(benchmark_args.get('DATASET_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)))
+
+
+def _benchmark_durations(benchmark_data):
+    # Per-run durations are used when exposed, otherwise the mean duration stands for a single sample.
+    duration = benchmark_data.metrics['test_duration_secs']
+    for key in ('data', 'values'):
+        if duration.get(key):
+            return list(duration[key])
+    return [duration['mean']]
+
+
+def _thread_and_batch_size_params(params):
+    threads = next((value for name, value in params.items() if 'thread' in name), None)
+    batch_size = next((value for name, value in params.items() if 'batch_size' in name), None)
+    return threads, batch_size
+
+
+@pytest.fixture(autouse=True)
+def benchmark_results(request, sdc_executor, benchmark_args, monkeypatch):
+    # Results of sdc_executor.benchmark_pipeline() are stored in a SQLite database if RESULTS_DB is passed as a
+    # benchmark argument.  If BASELINE_SDC_VERSION is passed as well, each benchmark is compared against the results
+    # recorded for that version and a warning is logged when its throughput regressed.
+    # SDC resource usage (heap, GC, CPU, threads, file descriptors and stage batch timers) is sampled every
+    # RESOURCE_SAMPLING_INTERVAL seconds while the benchmark runs, and stored alongside its results.
+    results_db = benchmark_args.get('RESULTS_DB')
+    if not results_db:
+        yield None
+        return
+
+    store = BenchmarkResultStore(results_db)
+    benchmark_pipeline = sdc_executor.benchmark_pipeline
+    benchmark = f'{request.module.__name__}::{request.function.__name__}'
+    params = dict(request.node.callspec.params) if hasattr(request.node, 'callspec') else {}
+    dataset = (request.getfixturevalue('datasets').default.name if 'datasets' in request.fixturenames
+               else benchmark_args.get('DATASET'))
+
+    sampling_interval = float(benchmark_args.get('RESOURCE_SAMPLING_INTERVAL', DEFAULT_SAMPLING_INTERVAL))
+
+    def recording_benchmark_pipeline(pipeline, *args, **kwargs):
+        with ResourceSampler(sdc_executor, pipeline, interval=sampling_interval) as sampler:
+            benchmark_data = benchmark_pipeline(pipeline, *args, **kwargs)
+        record_count = kwargs['record_count'] if 'record_count' in kwargs else args[0]
+        threads, batch_size = _thread_and_batch_size_params(params)
+        batch_latency = get_batch_processing_percentiles(sdc_executor, pipeline)
+        run_id = store.record(benchmark, params, sdc_executor.version,
+                              samples=[record_count / duration for duration in _benchmark_durations(benchmark_data)],
+                              dataset=dataset, threads=threads, batch_size=batch_size, record_count=record_count,
+                              batch_latency_p50=batch_latency['p50'], batch_latency_p95=batch_latency['p95'],
+                              heap_used=get_heap_used(sdc_executor), metrics=benchmark_data.metrics)
+        store.record_resource_samples(run_id, sampler.samples)
+        return benchmark_data
+
+    monkeypatch.setattr(sdc_executor, 'benchmark_pipeline', recording_benchmark_pipeline)
+    yield store
+
+    baseline_version = benchmark_args.get('BASELINE_SDC_VERSION')
+    if baseline_version:
+        for comparison in compare(store, baseline_version, sdc_executor.version, benchmark=benchmark):
+            if comparison.params == params and comparison.regression:
+                logger.warning('%s%s regressed by %.1f%% against SDC %s (%.0f -> %.0f records/sec, p=%.3f)',
+                               benchmark, params, -100 * comparison.change, baseline_version,
+                               comparison.baseline_median, comparison.candidate_median, comparison.p_value)
+
+
+@pytest.fixture(autouse=True)
+def stage_latency_report(sdc_executor, monkeypatch):
+    # After each sdc_executor.benchmark_pipeline() call, the batch processing time of the last run is broken down by
+    # stage, so that the stages dominating multi-processor pipelines stand out.
+    benchmark_pipeline = sdc_executor.benchmark_pipeline
+
+    def reporting_benchmark_pipeline(pipeline, *args, **kwargs):
+        benchmark_data = benchmark_pipeline(pipeline, *args, **kwargs)
+        try:
+            metrics = sdc_executor.get_pipeline_history(pipeline).latest.metrics
+            breakdown = get_stage_latency_breakdown(metrics)
+        except Exception as e:
+            logger.warning('Unable to break down batch processing time of pipeline %s: %s', pipeline.id, str(e))
+        else:
+            if breakdown:
+                logger.info('Batch processing time by stage of pipeline %s:\n%s',
+                            pipeline.id, format_stage_latency_breakdown(breakdown))
+        return benchmark_data
+
+    monkeypatch.setattr(sdc_executor, 'benchmark_pipeline', reporting_benchmark_pipeline)
+    yield
+
+
+@pytest.fixture(scope='module', autouse=True)
+def thread_scaling_report(request, sdc_executor, benchmark_args):
+    # Once all benchmarks of a module ran, the ones parametrized by thread count get a speedup and parallel efficiency
+    # report, along with Amdahl/USL fits and the knee of the curve.  Requires RESULTS_DB (see benchmark_results).
+    yield
+    results_db = benchmark_args.get('RESULTS_DB')
+    if not results_db:
+        return
+
+    store = BenchmarkResultStore(results_db)
+    benchmarks = {benchmark for benchmark, _ in store.benchmarks(sdc_executor.version)
+                  if benchmark.startswith(f'{request.module.__name__}::')}
+    min_gain = float(benchmark_args.get('SCALING_MIN_GAIN', DEFAULT_MIN_GAIN))
+    for benchmark in sorted(benchmarks):
+        for report in scaling_reports(store, benchmark, sdc_executor.version, min_gain=min_gain):
+            logger.info('%s', format_scaling_report(report))
+
+
+@pytest.fixture(scope='module')
+def warm_pipeline_templates(sdc_executor):
+    # Pipeline templates imported by warm_benchmark, shared by all tests of a module and removed once they all ran.
+    templates = {}
+    yield templates
+    for template in templates.values():
+        try:
+            template.remove()
+        except Exception as e:
+            logger.warning('Unable to remove pipeline %s: %s', template.pipeline.id, str(e))
+
+
+class WarmBenchmark:
+    """Runs benchmark cases against pipeline templates imported once per module (see
+    :py:class:`WarmPipelineBenchmark`), recording results like ``benchmark_pipeline`` when RESULTS_DB is set.
+    """
+    def __init__(self, request, sdc_executor, templates, store, warmup_record_count):
+        self._request = request
+        self._sdc_executor = sdc_executor
+        self._templates = templates
+        self._store = store
+        self._warmup_record_count = warmup_record_count
+
+    def run(self, template_name, build_pipeline, record_count, runs=1, **runtime_parameters):
+        """Runs the template named ``template_name``, built and imported by calling ``build_pipeline()`` the first
+        time it is used in the module, with the given runtime parameters.
+        """
+        if template_name not in self._templates:
+            self._templates[template_name] = WarmPipelineBenchmark(self._sdc_executor, build_pipeline(),
+                                                                   warmup_record_count=self._warmup_record_count)
+        result = self._templates[template_name].run(record_count, runs=runs, **runtime_parameters)
+
+        if self._store is not None:
+            params = dict(self._request.node.callspec.params) if hasattr(self._request.node, 'callspec') else {}
+            threads, batch_size = _thread_and_batch_size_params(params)
+            self._store.record(f'{self._request.module.__name__}::{self._request.function.__name__}', params,
+                               self._sdc_executor.version, samples=result.records_per_second, threads=threads,
+                               batch_size=batch_size, record_count=record_count,
+                               metrics=dict(mode='warm', runtime_parameters=runtime_parameters,
+                                            durations=result.durations))
+        return result
+
+
+@pytest.fixture
+def warm_benchmark(request, sdc_executor, benchmark_args, benchmark_results, warm_pipeline_templates):
+    # WARMUP_RECORD_COUNT records are processed by each template before its first measured run.
+    return WarmBenchmark(request, sdc_executor, warm_pipeline_templates, store=benchmark_results,
+                         warmup_record_count=int(benchmark_args.get('WARMUP_RECORD_COUNT', 1_000_000)))
+
 
 @pytest.fixture(scope='module')
 def sdc_common_hook():
@@ -28,14 +206,31 @@ def sdc_common_hook():
 
 
 class DatabaseTable:
-    """Configures a test table with a schema for a `dataset`, and optionally loads the table with test records."""
-    def __init__(self, database, sdc_builder, sdc_executor, stage_type, dataset):
+    """Configures a test table with a schema for a `dataset`, and optionally loads the table with test records.
+
+    Records are loaded either by an SDC pipeline reading the Benchmark origin (``loader='pipeline'``, the default) or
+    streamed straight into the database using its bulk path (``loader='native'``). The native loader is considerably
+    faster for large datasets, but it writes synthetic values derived from the Avro schema of the dataset (see
+    :py:func:`utils.utils_datasets.generate_records`) rather than the records of the Benchmark origin, so it is opt-in.
+
+    If a :py:class:`DatasetCache` is given, a table already loaded with the same data (e.g. by a previous session) is
+    reused instead of being loaded again, in which case ``cached`` is ``True`` and the table should not be dropped.
+    """
+    LOADERS = ['native', 'pipeline']
+
+    def __init__(self, database, sdc_builder, sdc_executor, stage_type, dataset, loader='pipeline', cache=None):
         self._database = database
         self._sdc_builder = sdc_builder
         self._sdc_executor = sdc_executor
         self._dataset = dataset
         self._stage_type = stage_type
         self._loaded_records = 0
+        self._cache = cache
+        self.cached = False
+
+        if loader not in self.LOADERS:
+            raise ValueError(f'Invalid loader: {loader}. Valid loaders are: {", ".join(self.LOADERS)}')
+        self._loader = loader
 
         if self._stage_type == 'origin':
             self.name = dataset.origin_name
@@ -89,6 +284,45 @@ class DatabaseTable:
         table.create(self._database.engine)
         return table
 
+    @property
+    def _environment(self):
+        url = self._database.engine.url
+        return f'{url.drivername}://{url.host}:{url.port}/{url.database}'
+
+    def _count_rows(self, name):
+        table = sqlalchemy.Table(name, sqlalchemy.MetaData())
+        try:
+            with self._database.engine.connect() as connection:
+                return connection.execute(sqlalchemy.select([sqlalchemy.func.count()]).select_from(table)).scalar()
+        except sqlalchemy.exc.DBAPIError as e:
+            logger.debug('Unable to count rows of table %s: %s', name, str(e))
+            return None
+
+    def _use_cached_table(self, cache_key, record_count):
+        entry = self._cache.get(cache_key, self._environment)
+        if entry is None:
+            return False
+
+        if self._count_rows(entry['name']) != record_count:
+            logger.info('Cached table %s does not hold %s records anymore, it will be loaded again',
+                        entry['name'], record_count)
+            self._cache.remove(cache_key)
+            return False
+
+        logger.info('Reusing table %s already loaded with %s records', entry['name'], record_count)
+        self.name = entry['name']
+        self.table = sqlalchemy.Table(self.name, sqlalchemy.MetaData(), *self._avro_to_sql_columns())
+        self._loaded_records = record_count
+        self.cached = True
+        return True
+
+    def _cache_table(self, cache_key):
+        self._cache.put(cache_key, self._environment, self.name, record_count=self._loaded_records)
+        self.cached = True
+        for entry in self._cache.evict(self._environment):
+            logger.info('Evicting table %s from the dataset cache', entry['name'])
+            sqlalchemy.Table(entry['name'], sqlalchemy.MetaData()).drop(self._database.engine, checkfirst=True)
+
     def load_records(self, record_count, run_stmt_before_create_table=None, run_stmt_after_create_table=None):
         # This method is typically called from module-scoped fixtures.  It aims to reduce the number of times a
         # dataset is loaded within that scope.
@@ -99,11 +333,30 @@ class DatabaseTable:
         if record_count <= self._loaded_records and not run_stmt_after_create_table:
             return
 
+        # Tables altered after creation (e.g. to enable change tracking) are always loaded again, hence not cached.
+        cache_key = None
+        if self._cache is not None and not run_stmt_after_create_table:
+            cache_key = self._cache.key(self._dataset, record_count, target_type=self._database.type,
+                                        loader=self._loader, run_stmt_before_create_table=run_stmt_before_create_table)
+            if self._use_cached_table(cache_key, record_count):
+                return
+
         self.table = self._create_table(run_stmt_before_create_table)
+        self.cached = False
 
         if run_stmt_after_create_table:
             self._database.engine.connect().execute(run_stmt_after_create_table)
 
+        if self._loader == 'native':
+            bulk_load_table(self._database, self.table, self._dataset, record_count)
+            self._loaded_records = record_count
+        else:
+            self._load_records_with_pipeline(record_count)
+
+        if cache_key is not None:
+            self._cache_table(cache_key)
+
+    def _load_records_with_pipeline(self, record_count):
         pipeline_builder = self._sdc_builder.get_pipeline_builder()
         benchmark_stages = pipeline_builder.add_benchmark_stages()
         benchmark_stages.origin.set_dataset(self._dataset)
@@ -111,19 +364,7 @@ class DatabaseTable:
 
         jdbc_producer = pipeline_builder.add_stage('JDBC Producer', type='destination')
         jdbc_producer.set_attributes(default_operation='INSERT', field_to_column_mapping=[], table_name=self.name)
-
-        if self._database.type == 'MySQL':
-            jdbc_producer.use_multi_row_operation = True
-            jdbc_producer.statement_parameter_limit = 32768  # bind variable limit for older versions of the database
-        elif self._database.type == 'Oracle':
-            jdbc_producer.enclose_object_names = True
-            jdbc_producer.use_multi_row_operation = False
-        elif self._database.type == 'PostgreSQL':
-            jdbc_producer.enclose_object_names = True
-            jdbc_producer.statement_parameter_limit = 32768  # bind variable limit for older versions of the database
-        elif self._database.type == 'SQLServer':
-            jdbc_producer.use_multi_row_operation = False
-            jdbc_producer.init_query = f'SET IDENTITY_INSERT dbo.{self.name} ON'
+        configure_jdbc_producer(jdbc_producer, self._database.type, self.name)
 
         benchmark_stages.origin >> jdbc_producer
 
@@ -143,6 +384,16 @@ class DatabaseTable:
             finally:
                 self._sdc_executor.remove_pipeline(pipeline)
 
+    def count_records(self):
+        # Number of records currently in the table, or None if the table cannot be read.
+        return self._count_rows(self.name)
+
+    def create(self, run_stmt_before_create_table=None):
+        # Creates the table empty, e.g. for a JDBC destination to insert into.
+        self.table = self._create_table(run_stmt_before_create_table)
+        self.cached = False
+        self._loaded_records = 0
+
     def drop(self):
         if self.table is not None:
             logger.debug('Dropping table %s', self.name)
@@ -151,8 +402,21 @@ class DatabaseTable:
 
 
 class KafkaTopic:
-    """Configures a test topic and optionally loads the topic with test records."""
-    def __init__(self, cluster, sdc_builder, sdc_executor, stage_type, dataset, data_format='AVRO'):
+    """Configures a test topic and optionally loads the topic with test records.
+
+    Records are loaded either by an SDC pipeline reading the Benchmark origin (``loader='pipeline'``, the default) or
+    produced straight into the topic by one producer per partition (``loader='native'``). The native loader is
+    considerably faster for large datasets, but it writes synthetic values derived from the Avro schema of the dataset
+    (see :py:func:`utils.utils_datasets.generate_records`) rather than the records of the Benchmark origin, so it is
+    opt-in.
+
+    If a :py:class:`DatasetCache` is given, a topic already loaded with the same data (e.g. by a previous session) is
+    reused instead of being loaded again, in which case ``cached`` is ``True`` and the topic should not be deleted.
+    """
+    LOADERS = ['native', 'pipeline']
+
+    def __init__(self, cluster, sdc_builder, sdc_executor, stage_type, dataset, data_format='AVRO', cache=None,
+                 loader='pipeline'):
         self._cluster = cluster
         self._sdc_builder = sdc_builder
         self._sdc_executor = sdc_executor
@@ -160,6 +424,12 @@ class KafkaTopic:
         self._data_format = data_format
         self._stage_type = stage_type
         self._loaded_records = 0
+        self._cache = cache
+        self.cached = False
+
+        if loader not in self.LOADERS:
+            raise ValueError(f'Invalid loader: {loader}. Valid loaders are: {", ".join(self.LOADERS)}')
+        self._loader = loader
 
         if self._stage_type == 'origin':
             self.name = dataset.origin_name
@@ -180,6 +450,56 @@ class KafkaTopic:
         admin_client.create_topics(new_topics=[topic], timeout_ms=60000)
         self.topic = topic
 
+    @property
+    def _environment(self):
+        return f'kafka://{self._cluster.kafka.brokers}'
+
+    def _count_messages(self, name):
+        consumer = self._cluster.kafka.consumer()
+        try:
+            partitions = consumer.partitions_for_topic(name)
+            if not partitions:
+                return None
+            topic_partitions = [TopicPartition(name, partition) for partition in partitions]
+            end_offsets = consumer.end_offsets(topic_partitions)
+            beginning_offsets = consumer.beginning_offsets(topic_partitions)
+            return sum(end_offsets[tp] - beginning_offsets[tp] for tp in topic_partitions)
+        finally:
+            consumer.close()
+
+    def _use_cached_topic(self, cache_key):
+        entry = self._cache.get(cache_key, self._environment)
+        if entry is None:
+            return False
+
+        message_count = self._count_messages(entry['name'])
+        if message_count != entry['message_count']:
+            logger.info('Cached topic %s does not hold %s messages anymore, it will be loaded again',
+                        entry['name'], entry['message_count'])
+            self._cache.remove(cache_key)
+            return False
+
+        logger.info('Reusing topic %s already loaded with %s messages', entry['name'], message_count)
+        self.name = entry['name']
+        self.topic = NewTopic(name=self.name, num_partitions=self._dataset.num_partitions, replication_factor=1)
+        self._loaded_records = entry['record_count']
+        self.cached = True
+        return True
+
+    def _cache_topic(self, cache_key):
+        self._cache.put(cache_key, self._environment, self.name, record_count=self._loaded_records,
+                        message_count=self._count_messages(self.name))
+        self.cached = True
+        evicted = [entry['name'] for entry in self._cache.evict(self._environment)]
+        if evicted:
+            logger.info('Evicting topics %s from the dataset cache', ', '.join(evicted))
+            try:
+                admin_client = KafkaAdminClient(bootstrap_servers=self._cluster.kafka.brokers,
+                                                request_timeout_ms=300000)
+                admin_client.delete_topics(evicted)
+            except Exception as e:
+                logger.warning('Unable to delete Kafka topics %s: %s', ', '.join(evicted), str(e))
+
     def load_records(self, record_count):
         if record_count > self._dataset.num_records:
             raise ValueError(f'Requested origin topic record count ({record_count}) exceeds records in'
@@ -188,9 +508,34 @@ class KafkaTopic:
         if record_count <= self._loaded_records:
             return
 
-        if self.topic is None:
+        cache_key = None
+        if self._cache is not None:
+            cache_key = self._cache.key(self._dataset, record_count, target_type='Kafka',
+                                        data_format=self._data_format, loader=self._loader)
+            if self._use_cached_topic(cache_key):
+                return
+
+        # Records are appended to the topic, so a topic reused from the cache has to be created again.
+        if self.topic is None or self.cached:
             self._create_topic()
+            self.cached = False
+            self._loaded_records = 0
+
+        if self._loader == 'native':
+            # Only the records missing from the topic are produced, picking up the dataset where the last load ended.
+            bulk_load_topic(self._cluster.kafka.brokers, self.name, self._dataset,
+                            record_count=record_count - self._loaded_records,
+                            num_partitions=self._dataset.num_partitions,
+                            data_format=self._data_format,
+                            start=self._loaded_records + 1)
+            self._loaded_records = record_count
+        else:
+            self._load_records_with_pipeline(record_count)
+
+        if cache_key is not None:
+            self._cache_topic(cache_key)
 
+    def _load_records_with_pipeline(self, record_count):
         pipeline_builder = self._sdc_builder.get_pipeline_builder()
         benchmark_stages = pipeline_builder.add_benchmark_stages()
         benchmark_stages.origin.set_dataset(self._dataset)
@@ -231,6 +576,12 @@ class KafkaTopic:
             finally:
                 self._sdc_executor.remove_pipeline(pipeline)
 
+    def create(self):
+        # Creates the topic empty, with the dataset's partitions, e.g. for a Kafka destination to write to.
+        self._create_topic()
+        self.cached = False
+        self._loaded_records = 0
+
     def delete(self):
         logger.debug('Deleting topic %s', self.name)
         try:
@@ -243,16 +594,19 @@ class KafkaTopic:
 
 
 @pytest.fixture(scope='module')
-def origin_table(database, sdc_builder, sdc_executor, datasets, keep_data):
+def origin_table(database, sdc_builder, sdc_executor, datasets, benchmark_args, dataset_cache, keep_data):
     # This fixture is module-scoped so that data can be loaded once for all tests in a given module, then cleaned
     # up to minimize resource utilization for Docker-based STEs.
     # When using it in tests, try to use the same value for origin_table.load_records() for all tests in the module.
+    # Origin tables are loaded by a pipeline reading the Benchmark origin. Pass DATASET_LOADER=native as a benchmark
+    # argument to bulk load synthetic records straight into the database instead.
     table = None
     try:
-        table = DatabaseTable(database, sdc_builder, sdc_executor, stage_type='origin', dataset=datasets.default)
+        table = DatabaseTable(database, sdc_builder, sdc_executor, stage_type='origin', dataset=datasets.default,
+                              loader=benchmark_args.get('DATASET_LOADER', 'pipeline'), cache=dataset_cache)
         yield table
     finally:
-        if not keep_data and table is not None:
+        if not keep_data and table is not None and not table.cached:
             table.drop()
 
 
@@ -262,7 +616,9 @@ def destination_table(database, sdc_builder, sdc_executor, datasets, keep_data):
     # resource utilization for Docker-based STEs.
     table = None
     try:
-        table = DatabaseTable(database, sdc_builder, sdc_executor, stage_type='destination', dataset=datasets.default)
+        # Tables pre-loaded for UPDATE and UPSERT must hold the keys the Benchmark origin writes, hence the pipeline.
+        table = DatabaseTable(database, sdc_builder, sdc_executor, stage_type='destination', dataset=datasets.default,
+                              loader='pipeline')
         yield table
     finally:
         if not keep_data and table is not None:
@@ -270,16 +626,19 @@ def destination_table(database, sdc_builder, sdc_executor, datasets, keep_data):
 
 
 @pytest.fixture(scope='module')
-def origin_topic(cluster, sdc_builder, sdc_executor, datasets, keep_data):
+def origin_topic(cluster, sdc_builder, sdc_executor, datasets, benchmark_args, dataset_cache, keep_data):
     # This fixture is module-scoped so that data can be loaded once for all tests in a given module, then cleaned
     # up to minimize resource utilization for Docker-based STEs.
     # When using it in tests, try to use the same value for origin_topic.load_records() for all tests in the module.
+    # Origin topics are loaded by a pipeline reading the Benchmark origin. Pass DATASET_LOADER=native as a benchmark
+    # argument to produce synthetic records straight into Kafka instead.
     topic = None
     try:
-        topic = KafkaTopic(cluster, sdc_builder, sdc_executor, stage_type='origin', dataset=datasets.default)
+        topic = KafkaTopic(cluster, sdc_builder, sdc_executor, stage_type='origin', dataset=datasets.default,
+                           cache=dataset_cache, loader=benchmark_args.get('DATASET_LOADER', 'pipeline'))
         yield topic
     finally:
-        if not keep_data and topic is not None:
+        if not keep_data and topic is not None and not topic.cached:
             topic.delete()
 
 
@@ -304,25 +663,33 @@ def elasticsearch_origin_index(elasticsearch, benchmark_args, keep_data):
     # There is currently a bug in the framework for pipelines that auto-stop (e.g. batch pipelines)
     # So we add 100k records to the source so that it won't automatically stop but will wait on the
     # framework to stop it.
-    upper = benchmark_args.get('RECORD_COUNT', 5_000_000) + 100_000
-
-    def generator():
-        for i in range(1, upper):
-            if i % 10_000 == 0:
-                logger.info(f'Inserting document with id/number {i}')
-
-            yield {
-                "_index": index,
-                "_type": "data",
-                "_source": {"number": i}
-            }
-
-    logger.info('Creating index %s', index)
-    elasticsearch.client.create_index(index)
-    logger.info('Populating index %s', index)
-    deque(elasticsearch.client.parallel_bulk(generator(), thread_count=10))
-    logger.info('Refreshing index %s', index)
-    elasticsearch.client.refresh_index(index)
+    doc_count = int(benchmark_args.get('RECORD_COUNT', 5_000_000)) + 100_000 - 1
+
+    # The loaded index is snapshotted and restored on later runs when a snapshot repository registered in the cluster
+    # is passed as ES_SNAPSHOT_REPOSITORY.
+    snapshot_repository = benchmark_args.get('ES_SNAPSHOT_REPOSITORY')
+    snapshot = f'stf-numbers-{doc_count}'
+    client = elasticsearch.client.client
+
+    def generator(start, stop):
+        for i in range(start + 1, stop + 1):
+            document = {'_index': index, '_source': {'number': i}}
+            if elasticsearch.major_version < ELASTICSEARCH_VERSION_8:
+                document['_type'] = 'data'
+            yield document
+
+    if snapshot_repository and restore_snapshot(client, snapshot_repository, snapshot, index):
+        client.indices.refresh(index=index)
+    else:
+        logger.info('Creating index %s', index)
+        elasticsearch.client.create_index(index)
+        logger.info('Populating index %s', index)
+        bulk_index(client, index, generator, doc_count,
+                   thread_count=int(benchmark_args.get('ES_BULK_THREADS', DEFAULT_THREAD_COUNT)),
+                   chunk_size=int(benchmark_args.get('ES_BULK_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)),
+                   max_chunk_bytes=int(benchmark_args.get('ES_BULK_MAX_CHUNK_BYTES', DEFAULT_MAX_CHUNK_BYTES)))
+        if snapshot_repository:
+            create_snapshot(client, snapshot_repository, snapshot, index)
 
     yield index
 
@@ -13,11 +13,12 @@
 # limitations under the License.
 
 import logging
-import os
 
 from streamsets.testframework.markers import azure, sdc_min_version
 from streamsets.testframework.utils import get_random_string
 
+from stage.utils.utils_object_store import AdlsGen2ObjectStore, ObjectTreeSpec, seed_object_tree
+
 logger = logging.getLogger(__name__)
 
 ADLS_GEN2_ORIGIN = 'com_streamsets_pipeline_stage_origin_datalake_gen2_DataLakeGen2DSource'
@@ -30,6 +31,7 @@ def test_initial_scan(sdc_builder, sdc_executor, azure, keep_data):
 
     directory_name = f'stf_perf_{get_random_string()}'
     fs = azure.datalake.file_system
+    store = AdlsGen2ObjectStore(fs)
 
     try:
         pipeline_builder = sdc_builder.get_pipeline_builder()
@@ -43,26 +45,16 @@ def test_initial_scan(sdc_builder, sdc_executor, azure, keep_data):
         azure_data_lake_storage_gen2 >> benchmark_stages.destination
         pipeline = pipeline_builder.build().configure_for_environment(azure)
 
-        # Populate the Azure directory with 100 subdirectories with 10 files each.
+        # Populate the Azure directory with 100 subdirectories with 10 files each, holding a single line (their path).
         fs.mkdir(directory_name)
-
-        for _ in range(100):
-            folder_name = get_random_string(length=10)
-            for _ in range(10):
-                file_name = "{}.txt".format(get_random_string(length=10))
-                file_path = os.path.join(directory_name, folder_name, file_name)
-                try:
-                    logger.debug("Creating new file: %s ...", file_path)
-                    res1 = fs.touch(file_path)
-                    res2 = fs.write(file_path, file_path)
-                    if not (res1.response.ok and res2.response.ok):
-                        raise RuntimeError(f'Could not create file: {file_path}')
-                except Exception as e:
-                    logger.error("Could not create file: %s: %s", file_path, str(e))
+        result = seed_object_tree(store, directory_name,
+                                  ObjectTreeSpec(depth=1, fan_out=100, files_per_directory=10, file_size=1))
+        if result.failures:
+            raise RuntimeError(f'Could not create {len(result.failures)} files under {directory_name}')
 
         sdc_executor.benchmark_pipeline(pipeline, record_count=1000)
 
     finally:
         if not keep_data:
             logger.info('Azure Data Lake directory %s and underlying files will be deleted.', directory_name)
-            fs.rmdir(directory_name, recursive=True)
+            store.delete_tree(directory_name)
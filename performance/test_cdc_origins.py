@@ -0,0 +1,211 @@
+# Copyright 2023 StreamSets Inc.
+
+import logging
+import random
+import string
+import time
+
+import pytest
+from streamsets.testframework.markers import database, sdc_min_version
+from streamsets.testframework.utils import get_random_string
+
+from .utils.utils_cdc import COMMITTED_AT_COLUMN, DmlWorkload, LatencyLanes, create_workload_tables
+
+logger = logging.getLogger(__name__)
+
+INPUT_RECORDS_COUNTER = 'pipeline.batchInputRecords.counter'
+# Records still arriving this long after the workload stopped are waited for; the origin caught up once none arrive.
+QUIET_PERIOD = 30  # seconds
+
+SQL_SERVER_SCHEMA = 'dbo'
+# Inserts and updates carry the commit time of the new row image; deletes and update before-images do not.
+INSERT_OR_UPDATE = "(record:attribute('sdc.operation.type') == '1' || record:attribute('sdc.operation.type') == '3')"
+
+
+def _operation_mix(value):
+    # e.g. insert:50,update:30,delete:20
+    return {operation: float(weight) for operation, weight in (item.split(':') for item in value.split(','))}
+
+
+def _captured_records(sdc_executor, pipeline):
+    metrics = sdc_executor.get_pipeline_metrics(pipeline)
+    return metrics.counter(INPUT_RECORDS_COUNTER).count if metrics else 0
+
+
+@pytest.fixture
+def workload_tables(database, benchmark_args, keep_data):
+    """Empty tables for the DML workload; their number is the benchmark argument TABLE_COUNT."""
+    schema = SQL_SERVER_SCHEMA if database.type == 'SQLServer' else None
+    prefix, tables = create_workload_tables(database.engine, int(benchmark_args.get('TABLE_COUNT', 4)), schema=schema)
+    yield prefix, tables
+    if not keep_data:
+        for table in tables:
+            logger.info('Dropping table %s in %s database ...', table, database.type)
+            table.drop(database.engine)
+
+
+@pytest.fixture
+def cdc_benchmark(request, sdc_executor, database, benchmark_args, benchmark_results):
+    """Returns a function running a DML workload against the tables captured by a CDC pipeline, then measuring the
+    sustained capture throughput and the commit-to-record latency of the pipeline.
+
+    Throughput is reported in changes (workload operations) per second up to the last captured record, as origins map
+    changes to records differently: one record per transaction, or two per update with before-images.  The run fails
+    rather than being recorded unless the pipeline captured as many records as ``expected_records`` (a function of the
+    workload result, one record per change by default) gives for the record shape of the origin.
+
+    Workload settings are benchmark arguments: DURATION (seconds), WORKLOAD_THREADS, TRANSACTION_SIZE (operations),
+    TRANSACTION_RATE (transactions/sec over all threads, as fast as possible if not set) and OPERATION_MIX (e.g.
+    ``insert:50,update:30,delete:20``).  Results are recorded like ``benchmark_pipeline`` when RESULTS_DB is set.
+    """
+    def run(pipeline, tables, latency_lanes, session_statements=None, expected_records=None):
+        workload = DmlWorkload(database.engine, tables,
+                               operation_mix=_operation_mix(benchmark_args.get('OPERATION_MIX',
+                                                                               'insert:50,update:30,delete:20')),
+                               transaction_size=int(benchmark_args.get('TRANSACTION_SIZE', 10)),
+                               threads=int(benchmark_args.get('WORKLOAD_THREADS', 4)),
+                               session_statements=session_statements)
+        rate = benchmark_args.get('TRANSACTION_RATE')
+
+        sdc_executor.add_pipeline(pipeline)
+        sdc_executor.start_pipeline(pipeline)
+        try:
+            start = time.monotonic()
+            result = workload.run(float(benchmark_args.get('DURATION', 120)), rate=float(rate) if rate else None)
+            workload_end = time.monotonic()
+
+            captured, last_increase = _captured_records(sdc_executor, pipeline), time.monotonic()
+            while time.monotonic() - last_increase < QUIET_PERIOD:
+                time.sleep(1)
+                count = _captured_records(sdc_executor, pipeline)
+                if count > captured:
+                    captured, last_increase = count, time.monotonic()
+            buckets, unmeasured = latency_lanes.histogram(sdc_executor.get_pipeline_metrics(pipeline))
+        finally:
+            sdc_executor.stop_pipeline(pipeline)
+
+        changes = result.inserts + result.updates + result.deletes
+        capture_duration = last_increase - start
+        changes_per_second = changes / capture_duration
+        records_per_second = captured / capture_duration
+        catch_up = max(last_increase - workload_end, 0.0)
+        latency = {f'latency_p{percentile}_ms': LatencyLanes.percentile(buckets, percentile)
+                   for percentile in (50, 95, 99)}
+        logger.info('%s changes captured as %s records (%.0f changes/sec, %.0f records/sec), caught up %.1f s after '
+                    'the workload, commit-to-record latency %s (%s records not measured)', changes, captured,
+                    changes_per_second, records_per_second, catch_up, latency, unmeasured)
+
+        assert captured > 0, f'No records captured for {changes} changes'
+        expected = expected_records(result) if expected_records else changes
+        assert captured == expected, (f'{captured} records captured for {changes} changes, expected {expected}; '
+                                      'the throughput would not reflect the workload')
+
+        if benchmark_results is not None:
+            params = dict(request.node.callspec.params) if hasattr(request.node, 'callspec') else {}
+            benchmark_results.record(f'{request.module.__name__}::{request.function.__name__}', params,
+                                     sdc_executor.version, samples=[changes_per_second],
+                                     threads=params.get('number_of_threads'), record_count=changes,
+                                     metrics=dict(result._asdict(), captured_records=captured,
+                                                  records_per_second=records_per_second,
+                                                  catch_up_seconds=catch_up, unmeasured_records=unmeasured,
+                                                  latency_buckets={str(bound): count
+                                                                   for bound, count in buckets.items()},
+                                                  **latency))
+        return changes_per_second, latency
+    return run
+
+
+@database('postgresql')
+@sdc_min_version('5.1.0')
+@pytest.mark.parametrize('wal2json_format, record_contents', [('TRANSACTION', 'TRANSACTION'),
+                                                              ('TRANSACTION', 'OPERATION'),
+                                                              ('CHUNKED_TRANSACTION', 'OPERATION'),
+                                                              ('OPERATION', 'OPERATION')])
+def test_postgresql_cdc_client(sdc_builder, sdc_executor, database, workload_tables, cdc_benchmark, wal2json_format,
+                               record_contents):
+    """Benchmark PostgreSQL CDC Client origin capture throughput and latency by wal2json format and record contents.
+
+    With TRANSACTION record contents, each record holds a whole transaction and only its first change is timed, so the
+    latency histogram has one sample per transaction rather than per change.
+    """
+    if not database.is_cdc_enabled:
+        pytest.skip('Test only runs against PostgreSQL with CDC enabled.')
+    prefix, tables = workload_tables
+
+    pipeline_builder = sdc_builder.get_pipeline_builder()
+    postgres_cdc_client = pipeline_builder.add_stage('PostgreSQL CDC Client')
+    postgres_cdc_client.set_attributes(remove_replication_slot_on_close=True,
+                                       replication_slot=get_random_string(string.ascii_lowercase, 10),
+                                       ssl_mode='DISABLED',
+                                       tables=[{'schema': 'public', 'table': f'{prefix}_%'}],
+                                       record_contents=record_contents,
+                                       wal2json_format=wal2json_format)
+    if record_contents == 'TRANSACTION':
+        # Transaction records hold their changes as lists of column values, in table column order.
+        committed_at_path = f'/change[0]/columnvalues[{tables[0].columns.keys().index(COMMITTED_AT_COLUMN)}]'
+    else:
+        committed_at_path = f'/{COMMITTED_AT_COLUMN}'
+    latency_lanes = LatencyLanes(pipeline_builder, postgres_cdc_client, committed_at_path)
+
+    pipeline = pipeline_builder.build().configure_for_environment(database)
+    cdc_benchmark(pipeline, tables, latency_lanes,
+                  expected_records=(lambda result: result.transactions) if record_contents == 'TRANSACTION' else None)
+
+
+@database('mysql')
+@pytest.mark.parametrize('binlog_row_image', ['FULL', 'MINIMAL'])
+def test_mysql_binary_log(sdc_builder, sdc_executor, database, workload_tables, cdc_benchmark, binlog_row_image):
+    """Benchmark MySQL Binary Log origin capture throughput and latency by binlog row image, which the workload sets for
+    its sessions (requiring the SYSTEM_VARIABLES_ADMIN or SUPER privilege)."""
+    if not database.is_cdc_enabled:
+        pytest.skip('Test only runs against MySQL with CDC enabled.')
+    prefix, tables = workload_tables
+
+    with database.engine.connect() as connection:
+        binlog_file, binlog_position = connection.execute('SHOW MASTER STATUS').fetchone()[:2]
+
+    pipeline_builder = sdc_builder.get_pipeline_builder()
+    mysql_binary_log = pipeline_builder.add_stage('MySQL Binary Log')
+    mysql_binary_log.set_attributes(initial_offset=f'{binlog_file}:{binlog_position}',
+                                    server_id=str(random.randint(1, 2147483647)),
+                                    include_tables=f'{database.database}.{prefix}_%')
+    latency_lanes = LatencyLanes(pipeline_builder, mysql_binary_log, f'/Data/{COMMITTED_AT_COLUMN}',
+                                 condition=INSERT_OR_UPDATE)
+
+    pipeline = pipeline_builder.build().configure_for_environment(database)
+    cdc_benchmark(pipeline, tables, latency_lanes,
+                  session_statements=[f"SET SESSION binlog_row_image = '{binlog_row_image}'"])
+
+
+@database('sqlserver')
+@pytest.mark.parametrize('number_of_threads', [1, 4])
+def test_sql_server_cdc_client(sdc_builder, sdc_executor, database, workload_tables, cdc_benchmark,
+                               number_of_threads):
+    """Benchmark SQL Server CDC Client origin capture throughput and latency, which includes the polling interval of the
+    CDC capture job, with multithreading"""
+    if not database.is_cdc_enabled:
+        pytest.skip('Test only runs against SQL Server with CDC enabled.')
+    prefix, tables = workload_tables
+
+    with database.engine.connect() as connection:
+        for table in tables:
+            connection.execute(f"exec sys.sp_cdc_enable_table @source_schema='{SQL_SERVER_SCHEMA}', "
+                               f"@source_name='{table.name}', @capture_instance='{SQL_SERVER_SCHEMA}_{table.name}', "
+                               f"@supports_net_changes=1, @role_name=NULL")
+        while connection.execute(f"SELECT COUNT(*) FROM sys.tables WHERE is_tracked_by_cdc = 1 "
+                                 f"AND name LIKE '{prefix}[_]%'").scalar() < len(tables):
+            logger.info('Waiting until CDC is enabled for tables %s_*', prefix)
+            time.sleep(1)
+
+    pipeline_builder = sdc_builder.get_pipeline_builder()
+    sql_server_cdc = pipeline_builder.add_stage('SQL Server CDC Client')
+    sql_server_cdc.set_attributes(maximum_pool_size=number_of_threads,
+                                  number_of_threads=number_of_threads,
+                                  table_configs=[{'capture_instance': f'{SQL_SERVER_SCHEMA}_{prefix}_%'}])
+    latency_lanes = LatencyLanes(pipeline_builder, sql_server_cdc, f'/{COMMITTED_AT_COLUMN}',
+                                 condition=INSERT_OR_UPDATE)
+
+    pipeline = pipeline_builder.build().configure_for_environment(database)
+    # Updates are captured as a before-image record and an after-image record.
+    cdc_benchmark(pipeline, tables, latency_lanes,
+                  expected_records=lambda result: result.inserts + 2 * result.updates + result.deletes)
@@ -0,0 +1,117 @@
+# Copyright 2023 StreamSets Inc.
+
+import logging
+
+import pytest
+from streamsets.testframework.markers import sdc_min_version
+
+from .utils.utils_http_load import HttpLoadGenerator, make_payload
+
+logger = logging.getLogger(__name__)
+
+HTTP_PORT = 9999
+APPLICATION_ID = 'benchmark'
+# Closed-loop runs keep this many requests in flight per receiver thread, so that backpressure shows.
+REQUESTS_IN_FLIGHT_PER_THREAD = 2
+# Origin settings parsing the payloads of each format (see make_payload).
+ORIGIN_DATA_FORMATS = {'JSON': dict(data_format='JSON'),
+                       'DELIMITED': dict(data_format='DELIMITED', header_line='WITH_HEADER'),
+                       'TEXT': dict(data_format='TEXT')}
+
+
+@pytest.fixture
+def payload_format(benchmark_args):
+    """Format of the request payloads, the benchmark argument PAYLOAD_FORMAT (one of ``ORIGIN_DATA_FORMATS``)."""
+    payload_format = benchmark_args.get('PAYLOAD_FORMAT', 'JSON')
+    if payload_format not in ORIGIN_DATA_FORMATS:
+        raise ValueError(f'Invalid payload format: {payload_format}. '
+                         f'Valid formats are: {", ".join(ORIGIN_DATA_FORMATS)}')
+    return payload_format
+
+
+@pytest.fixture
+def http_load(request, sdc_executor, benchmark_args, benchmark_results, payload_format):
+    """Returns a function running an HTTP load against a started origin and recording its result like
+    ``benchmark_pipeline`` when RESULTS_DB is set.
+
+    Load settings are benchmark arguments: DURATION (seconds), REQUEST_RATE (requests/sec of open-loop runs),
+    CONNECTIONS (pool size of open-loop runs), RECORDS_PER_REQUEST, RECORD_SIZE (bytes) and PAYLOAD_FORMAT.
+    """
+    records_per_request = int(benchmark_args.get('RECORDS_PER_REQUEST', 100))
+    generator = HttpLoadGenerator(f'http://{sdc_executor.server_host}:{HTTP_PORT}/',
+                                  make_payload(payload_format, records_per_request,
+                                               int(benchmark_args.get('RECORD_SIZE', 100))),
+                                  application_id=APPLICATION_ID,
+                                  records_per_request=records_per_request,
+                                  connections=int(benchmark_args.get('CONNECTIONS', 64)))
+    duration = float(benchmark_args.get('DURATION', 60))
+
+    def run(mode, concurrency=None):
+        generator.wait_until_listening()
+        if mode == 'open':
+            result = generator.open_loop(float(benchmark_args.get('REQUEST_RATE', 1000)), duration)
+        else:
+            result = generator.closed_loop(concurrency, duration)
+
+        if benchmark_results is not None:
+            params = dict(request.node.callspec.params)
+            benchmark_results.record(f'{request.module.__name__}::{request.function.__name__}', params,
+                                     sdc_executor.version, samples=[result.records_per_second],
+                                     threads=params.get('max_concurrent_requests'),
+                                     record_count=result.records,
+                                     metrics=dict(result._asdict(), payload_format=payload_format,
+                                                  records_per_request=records_per_request))
+        return result
+    return run
+
+
+@sdc_min_version('3.17.0')
+@pytest.mark.parametrize('mode', ['open', 'closed'])
+@pytest.mark.parametrize('max_concurrent_requests', [1, 4, 16])
+def test_http_server(sdc_builder, sdc_executor, http_load, payload_format, mode, max_concurrent_requests):
+    """Benchmark HTTP Server origin: latency percentiles and 503 rate under a fixed request rate (open loop) or a fixed
+    number of requests in flight (closed loop), by number of receiver threads."""
+    pipeline_builder = sdc_builder.get_pipeline_builder()
+
+    http_server = pipeline_builder.add_stage('HTTP Server')
+    http_server.set_attributes(http_listening_port=HTTP_PORT,
+                               list_of_application_ids=[{'credential': APPLICATION_ID}],
+                               max_concurrent_requests=max_concurrent_requests,
+                               **ORIGIN_DATA_FORMATS[payload_format])
+    trash = pipeline_builder.add_stage('Trash')
+    http_server >> trash
+
+    pipeline = pipeline_builder.build()
+    sdc_executor.add_pipeline(pipeline)
+
+    sdc_executor.start_pipeline(pipeline)
+    try:
+        http_load(mode, concurrency=REQUESTS_IN_FLIGHT_PER_THREAD * max_concurrent_requests)
+    finally:
+        sdc_executor.stop_pipeline(pipeline)
+
+
+@sdc_min_version('3.17.0')
+@pytest.mark.parametrize('mode', ['open', 'closed'])
+@pytest.mark.parametrize('max_concurrent_requests', [1, 4, 16])
+def test_rest_service(sdc_builder, sdc_executor, http_load, payload_format, mode, max_concurrent_requests):
+    """Benchmark REST Service origin, which answers each request once its records reached Send Response to Origin,
+    under a fixed request rate (open loop) or a fixed number of requests in flight (closed loop)."""
+    pipeline_builder = sdc_builder.get_pipeline_builder()
+
+    rest_service = pipeline_builder.add_stage('REST Service')
+    rest_service.set_attributes(http_listening_port=HTTP_PORT,
+                                list_of_application_ids=[{'credential': APPLICATION_ID}],
+                                max_concurrent_requests=max_concurrent_requests,
+                                **ORIGIN_DATA_FORMATS[payload_format])
+    send_response = pipeline_builder.add_stage('Send Response to Origin')
+    rest_service >> send_response
+
+    pipeline = pipeline_builder.build()
+    sdc_executor.add_pipeline(pipeline)
+
+    sdc_executor.start_pipeline(pipeline)
+    try:
+        http_load(mode, concurrency=REQUESTS_IN_FLIGHT_PER_THREAD * max_concurrent_requests)
+    finally:
+        sdc_executor.stop_pipeline(pipeline)
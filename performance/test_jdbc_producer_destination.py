@@ -0,0 +1,141 @@
+# Copyright 2023 StreamSets Inc.
+
+import logging
+import statistics
+from collections import defaultdict
+
+import pytest
+from streamsets.testframework.markers import database
+
+from .utils.utils_database import configure_jdbc_producer
+
+logger = logging.getLogger(__name__)
+
+RECORD_COUNT = 1_000_000
+# Number of runs of each case, each against a freshly created table; cases are compared by their median throughput.
+RUNS = 3
+# Maximum number of parameters of a statement; multi-row statements past it fail rather than being split.
+MAX_STATEMENT_PARAMETERS = {'PostgreSQL': 32767, 'SQLServer': 2100}
+
+
+@pytest.fixture(scope='module')
+def recommended_settings():
+    # Throughput samples of each case by database and sweep; once all benchmarks of the module ran, the settings with
+    # the highest median throughput in each sweep are logged as the recommended JDBC Producer settings for each
+    # database.  A recommendation whose runs overlap those of the runner-up is flagged as inconclusive.
+    results = defaultdict(list)
+    yield results
+    for database_type in sorted({database_type for database_type, _ in results}):
+        lines = []
+        for (result_database_type, sweep), cases in sorted(results.items()):
+            if result_database_type != database_type:
+                continue
+            cases = sorted(cases, key=lambda case: statistics.median(case[1]), reverse=True)
+            settings, samples = cases[0]
+            others = ''.join(f'; {_format(case_settings)}: {statistics.median(case_samples):.0f}'
+                             for case_settings, case_samples in cases[1:])
+            inconclusive = (' - inconclusive, runs overlap with the runner-up'
+                            if len(cases) > 1 and min(samples) <= max(cases[1][1]) else '')
+            lines.append(f'  {sweep}: {_format(settings)} ({statistics.median(samples):.0f} records/sec{others})'
+                         f'{inconclusive}')
+        logger.info('Recommended JDBC Producer settings for %s:\n%s', database_type, '\n'.join(lines))
+
+
+def _format(settings):
+    return ', '.join(f'{name}={value}' for name, value in settings.items())
+
+
+@pytest.fixture
+def jdbc_producer_benchmark(sdc_builder, sdc_executor, database, datasets, destination_table, benchmark_args,
+                            recommended_settings):
+    """Returns a function benchmarking the JDBC Producer destination fed by the benchmark origin, with the settings
+    each database is loaded with (see ``configure_jdbc_producer``) overridden by the given ones.
+
+    The number of records written is the benchmark argument RECORD_COUNT.  UPDATE and UPSERT cases write to a table
+    pre-loaded by a pipeline with the same records, INSERT cases to an empty one.  Each case runs RUNS times against a
+    freshly created table, and its median throughput is returned.
+    """
+    def run(sweep, default_operation='INSERT', batch_size=None, number_of_threads=1, **jdbc_producer_settings):
+        record_count = int(benchmark_args.get('RECORD_COUNT', RECORD_COUNT))
+        samples = []
+        for _ in range(RUNS):
+            # Every run writes the same keys, so the table is created again before each run: a second INSERT run into
+            # the same table would fail on the keys written by the first one.
+            destination_table.create()
+            if default_operation != 'INSERT':
+                destination_table.load_records(record_count)
+                loaded = destination_table.count_records()
+                assert loaded == record_count, (f'{default_operation} needs {record_count} pre-loaded records to '
+                                                f'rewrite, table {destination_table.name} holds {loaded}')
+
+            pipeline = _build_pipeline(default_operation, batch_size, number_of_threads, jdbc_producer_settings)
+            benchmark_data = sdc_executor.benchmark_pipeline(pipeline, runs=1, record_count=record_count)
+            error_records = (sdc_executor.get_pipeline_history(pipeline).latest.metrics
+                             .counter('pipeline.batchErrorRecords.counter').count)
+            assert error_records == 0, f'JDBC Producer failed to {default_operation} {error_records} records'
+            samples.append(record_count / benchmark_data.metrics['test_duration_secs']['mean'])
+
+        settings = dict(jdbc_producer_settings, default_operation=default_operation)
+        if batch_size is not None:
+            settings['batch_size'] = batch_size
+        if number_of_threads != 1:
+            settings['number_of_threads'] = number_of_threads
+        recommended_settings[database.type, sweep].append((settings, samples))
+        return statistics.median(samples)
+
+    def _build_pipeline(default_operation, batch_size, number_of_threads, jdbc_producer_settings):
+        pipeline_builder = sdc_builder.get_pipeline_builder()
+        benchmark_stages = pipeline_builder.add_benchmark_stages()
+        benchmark_stages.origin.set_dataset(datasets.default)
+        benchmark_stages.origin.set_attributes(number_of_threads=number_of_threads)
+        if batch_size is not None:
+            benchmark_stages.origin.set_attributes(batch_size_in_recs=batch_size)
+
+        jdbc_producer = pipeline_builder.add_stage('JDBC Producer', type='destination')
+        jdbc_producer.set_attributes(default_operation=default_operation, field_to_column_mapping=[],
+                                     table_name=destination_table.name)
+        configure_jdbc_producer(jdbc_producer, database.type, destination_table.name)
+        # Each pipeline runner gets a connection of its own.
+        jdbc_producer.set_attributes(maximum_pool_size=number_of_threads, **jdbc_producer_settings)
+
+        benchmark_stages.origin >> jdbc_producer
+        return pipeline_builder.build().configure_for_environment(database)
+    return run
+
+
+@database
+@pytest.mark.parametrize('use_multi_row_operation, statement_parameter_limit', [(False, -1),
+                                                                                (True, -1),
+                                                                                (True, 2_000),
+                                                                                (True, 32_768)])
+def test_multi_row_operation(database, jdbc_producer_benchmark, use_multi_row_operation, statement_parameter_limit):
+    """Benchmark JDBC Producer destination inserts by multi-row operation and statement parameter limit"""
+    if use_multi_row_operation and database.type == 'Oracle':
+        pytest.skip('JDBC Producer does not support multi-row operations with Oracle.')
+    max_parameters = MAX_STATEMENT_PARAMETERS.get(database.type)
+    if use_multi_row_operation and max_parameters and not 0 < statement_parameter_limit <= max_parameters:
+        pytest.skip(f'{database.type} statements take at most {max_parameters} parameters.')
+
+    jdbc_producer_benchmark('multi-row operation', use_multi_row_operation=use_multi_row_operation,
+                            statement_parameter_limit=statement_parameter_limit)
+
+
+@database
+@pytest.mark.parametrize('default_operation', ['INSERT', 'UPSERT', 'UPDATE'])
+def test_default_operation(jdbc_producer_benchmark, default_operation):
+    """Benchmark JDBC Producer destination by operation, UPSERT and UPDATE rewriting every row of a pre-loaded table"""
+    jdbc_producer_benchmark('default operation', default_operation=default_operation)
+
+
+@database
+@pytest.mark.parametrize('batch_size', [1_000, 10_000, 20_000])
+def test_batch_size(jdbc_producer_benchmark, batch_size):
+    """Benchmark JDBC Producer destination inserts by batch size"""
+    jdbc_producer_benchmark('batch size', batch_size=batch_size)
+
+
+@database
+@pytest.mark.parametrize('number_of_threads', [1, 4, 8])
+def test_connection_pool_size(jdbc_producer_benchmark, number_of_threads):
+    """Benchmark JDBC Producer destination inserts by connection pool size, with one pipeline runner per connection"""
+    jdbc_producer_benchmark('connection pool size', number_of_threads=number_of_threads)
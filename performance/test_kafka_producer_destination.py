@@ -0,0 +1,129 @@
+# Copyright 2023 StreamSets Inc.
+
+import logging
+import time
+
+import pytest
+from streamsets.testframework.markers import cluster
+
+from .utils.utils_kafka import ProduceLagSampler, end_offsets
+
+logger = logging.getLogger(__name__)
+
+RUNS = 3
+RECORD_COUNT = 1_000_000
+# End offsets are polled until they stopped moving for this long after the benchmark, in case the brokers still commit
+# the last messages.
+OFFSETS_SETTLE_PERIOD = 5  # seconds
+OFFSETS_TIMEOUT = 300  # seconds
+
+# Producer overrides (kafka_configuration) of the batching profiles: Kafka's defaults, and larger batches waiting a
+# little for more records.
+BATCHING = {'default': {'linger.ms': '0', 'batch.size': '16384'},
+            'batched': {'linger.ms': '20', 'batch.size': '1048576'}}
+
+
+def _settled_end_offsets(brokers, topic, expected):
+    """Returns the end offsets of ``topic`` once they reached ``expected`` messages (or stopped moving)."""
+    start = time.monotonic()
+    offsets, last_change = end_offsets(brokers, topic), start
+    while time.monotonic() - start < OFFSETS_TIMEOUT:
+        if sum(offsets.values()) >= expected and time.monotonic() - last_change >= OFFSETS_SETTLE_PERIOD:
+            break
+        if sum(offsets.values()) < expected and time.monotonic() - last_change >= OFFSETS_TIMEOUT / 10:
+            # Messages still missing after a while are not coming anymore.
+            break
+        time.sleep(0.5)
+        current = end_offsets(brokers, topic)
+        if current != offsets:
+            offsets, last_change = current, time.monotonic()
+    return offsets
+
+
+def _lag_percentiles(lags):
+    # In milliseconds, None if no lag could be measured.
+    lags = sorted(lags)
+    return {name: round(lags[min(int(quantile * len(lags)), len(lags) - 1)] * 1000) if lags else None
+            for name, quantile in (('lag_p50_ms', 0.5), ('lag_p95_ms', 0.95), ('lag_max_ms', 1))}
+
+
+@pytest.fixture
+def kafka_producer_benchmark(sdc_builder, sdc_executor, cluster, datasets, destination_topic, benchmark_args):
+    """Returns a function benchmarking the Kafka Producer destination fed by the benchmark origin into an empty topic,
+    then checking that the topic holds every record produced.
+
+    While the benchmark runs, the end offsets of the topic are sampled along with the output record counter of the
+    pipeline, and the produce-to-commit lag (how long after the pipeline counted records as output the topic held them)
+    is logged and returned with the number of messages delivered.
+
+    The number of records of each run is the benchmark argument RECORD_COUNT.
+    """
+    def run(data_format='AVRO', compression_codec='none', batching='default', partition_strategy='ROUND_ROBIN',
+            number_of_threads=1):
+        destination_topic.create()
+
+        pipeline_builder = sdc_builder.get_pipeline_builder()
+        benchmark_stages = pipeline_builder.add_benchmark_stages()
+        benchmark_stages.origin.set_dataset(datasets.default)
+        benchmark_stages.origin.set_attributes(number_of_threads=number_of_threads)
+
+        kafka_producer = pipeline_builder.add_stage(name='com_streamsets_pipeline_stage_destination_kafka_KafkaDTarget',
+                                                    type='destination',
+                                                    library=cluster.kafka.standalone_stage_lib)
+        kafka_producer.set_attributes(topic=destination_topic.name,
+                                      data_format=data_format,
+                                      partition_strategy=partition_strategy,
+                                      kafka_configuration=[{'key': key, 'value': value} for key, value in
+                                                           dict(BATCHING[batching],
+                                                                **{'compression.type': compression_codec}).items()])
+        if data_format == 'AVRO':
+            kafka_producer.avro_schema_location = 'HEADER'
+        elif data_format == 'DELIMITED':
+            kafka_producer.header_line = 'NO_HEADER'
+
+        benchmark_stages.origin >> kafka_producer
+        pipeline = pipeline_builder.build().configure_for_environment(cluster)
+
+        record_count = int(benchmark_args.get('RECORD_COUNT', RECORD_COUNT))
+        with ProduceLagSampler(cluster.kafka.brokers, destination_topic.name, sdc_executor, pipeline) as lag_sampler:
+            sdc_executor.benchmark_pipeline(pipeline, runs=RUNS, record_count=record_count)
+
+        # Each run stops once it produced at least record_count records, so the topic may hold a few more.
+        offsets = _settled_end_offsets(cluster.kafka.brokers, destination_topic.name, RUNS * record_count)
+        delivered = sum(offsets.values())
+        logger.info('%s messages delivered to %s (%s per partition)', delivered, destination_topic.name, offsets)
+        assert delivered >= RUNS * record_count
+        if partition_strategy == 'ROUND_ROBIN':
+            assert all(offsets.values()), f'Partitions left empty by round robin: {offsets}'
+
+        lags, unmeasured = lag_sampler.lags()
+        lag = _lag_percentiles(lags)
+        logger.info('Produce-to-commit lag of %s: %s from %s samples (%s samples not seen committed while sampling)',
+                    destination_topic.name, lag, len(lags), unmeasured)
+        return delivered, lag
+    return run
+
+
+@cluster('kafka')
+@pytest.mark.parametrize('data_format', ['AVRO', 'JSON', 'DELIMITED'])
+@pytest.mark.parametrize('compression_codec', ['none', 'gzip', 'snappy', 'lz4'])
+def test_compression(kafka_producer_benchmark, data_format, compression_codec):
+    """Benchmark Kafka Producer destination by data format and compression codec"""
+    kafka_producer_benchmark(data_format=data_format, compression_codec=compression_codec)
+
+
+@cluster('kafka')
+@pytest.mark.parametrize('batching', sorted(BATCHING))
+@pytest.mark.parametrize('number_of_threads', [1, 4, 8])
+def test_batching(kafka_producer_benchmark, batching, number_of_threads):
+    """Benchmark Kafka Producer destination by linger.ms/batch.size producer overrides, with multithreading"""
+    kafka_producer_benchmark(compression_codec='lz4', batching=batching, number_of_threads=number_of_threads)
+
+
+@cluster('kafka')
+@pytest.mark.parametrize('partition_strategy', ['ROUND_ROBIN', 'RANDOM', 'DEFAULT'])
+@pytest.mark.parametrize('number_of_threads', [1, 4, 8])
+def test_partition_strategy(kafka_producer_benchmark, partition_strategy, number_of_threads):
+    """Benchmark Kafka Producer destination by partition strategy, with multithreading"""
+    kafka_producer_benchmark(compression_codec='lz4', batching='batched', partition_strategy=partition_strategy,
+                             number_of_threads=number_of_threads)
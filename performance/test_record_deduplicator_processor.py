@@ -18,3 +18,25 @@ def test_defaults(sdc_executor, sdc_builder, thread_count):
     pipeline = pipeline_builder.build()
 
     sdc_executor.benchmark_pipeline(pipeline, record_count=5_000_000, max_time=240, skip_metrics=['file_descriptors'])
+
+
+@pytest.mark.parametrize('thread_count', [1, 4, 8])
+@pytest.mark.parametrize('batch_size', [1_000, 10_000])
+def test_thread_and_batch_sizes_warm(sdc_executor, sdc_builder, warm_benchmark, thread_count, batch_size):
+    """Benchmark Record Deduplicator processor with a pipeline imported once for all thread and batch sizes"""
+
+    def build_pipeline():
+        pipeline_builder = sdc_builder.get_pipeline_builder()
+        record_deduplicator = pipeline_builder.add_stage('Record Deduplicator')
+
+        benchmark_stages = pipeline_builder.add_benchmark_stages()
+        benchmark_stages.origin.set_attributes(number_of_threads='${THREADS}', batch_size_in_recs='${BATCH_SIZE}')
+        benchmark_stages.origin >> record_deduplicator >> benchmark_stages.destination
+        record_deduplicator >> benchmark_stages.destination
+
+        pipeline = pipeline_builder.build()
+        pipeline.add_parameters(THREADS=1, BATCH_SIZE=1_000)
+        return pipeline
+
+    warm_benchmark.run('record deduplicator', build_pipeline, record_count=5_000_000, runs=3,
+                       THREADS=thread_count, BATCH_SIZE=batch_size)
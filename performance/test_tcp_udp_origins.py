@@ -0,0 +1,122 @@
+# Copyright 2023 StreamSets Inc.
+
+import logging
+import time
+
+import pytest
+
+from .utils.utils_traffic import TrafficGenerator
+
+logger = logging.getLogger(__name__)
+
+PORT = 9995
+INPUT_RECORDS_COUNTER = 'pipeline.batchInputRecords.counter'
+# Records still arriving this long after the traffic stopped are waited for; after that, missing ones are dropped.
+QUIET_PERIOD = 10  # seconds
+
+TCP_MODES = {'DELIMITED': dict(tcp_mode='DELIMITED_RECORDS', data_format='TEXT'),
+             'SYSLOG': dict(tcp_mode='SYSLOG', syslog_message_transfer_framing_mode='NON_TRANSPARENT_FRAMING')}
+UDP_DATA_FORMATS = {'DELIMITED': 'RAW_DATA', 'SYSLOG': 'SYSLOG', 'COLLECTD': 'COLLECTD', 'NETFLOW': 'NETFLOW'}
+
+
+def _received_records(sdc_executor, pipeline):
+    metrics = sdc_executor.get_pipeline_metrics(pipeline)
+    return metrics.counter(INPUT_RECORDS_COUNTER).count if metrics else 0
+
+
+@pytest.fixture
+def ingest_benchmark(request, sdc_executor, benchmark_args, benchmark_results):
+    """Returns a function sending traffic to a started TCP or UDP origin and measuring the records it ingested.
+
+    Traffic settings are benchmark arguments: MESSAGE_RATE (messages/sec), DURATION (seconds) and FLOWS (number of TCP
+    connections or UDP sockets).  Results are recorded like ``benchmark_pipeline`` when RESULTS_DB is set.
+    """
+    def run(pipeline, protocol, message_format, flows=None):
+        generator = TrafficGenerator(sdc_executor.server_host, PORT, protocol=protocol, message_format=message_format,
+                                     flows=int(flows or benchmark_args.get('FLOWS', 1000 if protocol == 'TCP' else 16)))
+        traffic = generator.run(rate=float(benchmark_args.get('MESSAGE_RATE', 50_000)),
+                                duration=float(benchmark_args.get('DURATION', 60)))
+
+        # Records are counted until none arrived for QUIET_PERIOD; the ingest rate is measured from the time traffic
+        # started, once all flows were open, up to the last record.
+        received, last_increase = _received_records(sdc_executor, pipeline), time.monotonic()
+        while time.monotonic() - last_increase < QUIET_PERIOD and received < traffic.records_sent:
+            time.sleep(1)
+            count = _received_records(sdc_executor, pipeline)
+            if count > received:
+                received, last_increase = count, time.monotonic()
+
+        dropped = max(traffic.records_sent - received, 0)
+        records_per_second = received / (last_increase - traffic.started)
+        logger.info('%s %s: %s of %s records ingested (%.0f records/sec), %s dropped, %s late messages',
+                    protocol, message_format, received, traffic.records_sent, records_per_second, dropped,
+                    traffic.late_messages)
+
+        if benchmark_results is not None:
+            params = dict(request.node.callspec.params)
+            metrics = dict(traffic._asdict(), received_records=received, dropped_records=dropped)
+            # A time.monotonic() time, meaningless outside of this process.
+            del metrics['started']
+            benchmark_results.record(f'{request.module.__name__}::{request.function.__name__}', params,
+                                     sdc_executor.version, samples=[records_per_second],
+                                     threads=params.get('number_of_receiver_threads'), record_count=received,
+                                     metrics=metrics)
+        return records_per_second, dropped, traffic
+    return run
+
+
+@pytest.mark.parametrize('message_format', ['DELIMITED', 'SYSLOG'])
+@pytest.mark.parametrize('epoll', [False, True])
+@pytest.mark.parametrize('number_of_receiver_threads', [1, 4, 8])
+def test_tcp_server(sdc_builder, sdc_executor, ingest_benchmark, message_format, epoll, number_of_receiver_threads):
+    """Benchmark TCP Server origin with thousands of concurrent connections, by receiver threads and epoll mode"""
+    pipeline_builder = sdc_builder.get_pipeline_builder()
+
+    tcp_server = pipeline_builder.add_stage('TCP Server')
+    tcp_server.set_attributes(port=[str(PORT)],
+                              number_of_receiver_threads=number_of_receiver_threads,
+                              enable_native_transports_in_epoll=epoll,
+                              max_batch_size_in_messages=10_000,
+                              batch_wait_time_in_ms=100,
+                              **TCP_MODES[message_format])
+    trash = pipeline_builder.add_stage('Trash')
+    tcp_server >> trash
+
+    pipeline = pipeline_builder.build(title=f'TCP Server {number_of_receiver_threads} threads epoll {epoll}')
+    sdc_executor.add_pipeline(pipeline)
+
+    sdc_executor.start_pipeline(pipeline)
+    try:
+        ingest_benchmark(pipeline, 'TCP', message_format)
+    finally:
+        sdc_executor.stop_pipeline(pipeline)
+
+
+@pytest.mark.parametrize('message_format', sorted(UDP_DATA_FORMATS))
+# Without epoll, a single thread receives the datagrams whatever the number of receiver threads.
+@pytest.mark.parametrize('epoll, number_of_receiver_threads', [(False, 1), (True, 1), (True, 4), (True, 8)])
+def test_udp_multithreaded_source(sdc_builder, sdc_executor, ingest_benchmark, message_format, epoll,
+                                  number_of_receiver_threads):
+    """Benchmark UDP Multithreaded Source origin with datagrams from many source ports, by receiver threads and epoll
+    mode; records missing once traffic stopped were dropped (e.g. by a full packet queue or socket buffer)."""
+    pipeline_builder = sdc_builder.get_pipeline_builder()
+
+    udp_source = pipeline_builder.add_stage('UDP Multithreaded Source')
+    udp_source.set_attributes(port=[str(PORT)],
+                              data_format=UDP_DATA_FORMATS[message_format],
+                              number_of_receiver_threads=number_of_receiver_threads,
+                              number_of_worker_threads=number_of_receiver_threads,
+                              use_native_transports_in_epoll=epoll,
+                              max_batch_size_in_messages=10_000,
+                              batch_wait_time_in_ms=100)
+    trash = pipeline_builder.add_stage('Trash')
+    udp_source >> trash
+
+    pipeline = pipeline_builder.build(title=f'UDP {number_of_receiver_threads} threads epoll {epoll}')
+    sdc_executor.add_pipeline(pipeline)
+
+    sdc_executor.start_pipeline(pipeline)
+    try:
+        ingest_benchmark(pipeline, 'UDP', message_format)
+    finally:
+        sdc_executor.stop_pipeline(pipeline)
@@ -0,0 +1,232 @@
+# Copyright 2023 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing a concurrent DML workload and commit-to-record latency measurement for CDC origin benchmarks
+import logging
+import math
+import random
+import string
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import sqlalchemy
+from streamsets.testframework.utils import get_random_string
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ['insert', 'update', 'delete']
+DEFAULT_OPERATION_MIX = {'insert': 0.5, 'update': 0.3, 'delete': 0.2}
+PAYLOAD_POOL_SIZE = 1_000
+
+# Milliseconds since the epoch at which the transaction writing the row started, compared with the time the record
+# reaches SDC's latency stage.  Both clocks are assumed in sync (same host, or NTP).
+COMMITTED_AT_COLUMN = 'committed_at'
+LATENCY_ATTRIBUTE = 'cdc.latency.ms'
+# Upper bounds of the latency buckets, in milliseconds; latencies above the last one are counted in an overflow bucket.
+LATENCY_BOUNDS = [10, 50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000, 30_000]
+
+WorkloadResult = namedtuple('WorkloadResult', ['threads', 'transaction_size', 'duration', 'transactions', 'inserts',
+                                               'updates', 'deletes', 'operations_per_second'])
+
+
+def create_workload_tables(engine, table_count, prefix=None, schema=None):
+    """Creates ``table_count`` empty tables sharing a random name prefix, so that CDC origins can select them all with
+    a single pattern.
+
+    Returns:
+        The prefix and a :obj:`list` of :py:class:`sqlalchemy.Table`.
+    """
+    prefix = prefix or get_random_string(string.ascii_lowercase, 10)
+    metadata = sqlalchemy.MetaData()
+    tables = [sqlalchemy.Table(f'{prefix}_{index}', metadata,
+                               sqlalchemy.Column('id', sqlalchemy.Integer, primary_key=True, autoincrement=False),
+                               sqlalchemy.Column('payload', sqlalchemy.String(100)),
+                               sqlalchemy.Column(COMMITTED_AT_COLUMN, sqlalchemy.BigInteger),
+                               schema=schema)
+              for index in range(table_count)]
+    logger.info('Creating %s workload table(s) %s_*', table_count, prefix)
+    metadata.create_all(engine)
+    return prefix, tables
+
+
+class DmlWorkload:
+    """Runs a mix of inserts, updates and deletes against a set of tables from concurrent threads, in transactions of a
+    fixed number of operations.
+
+    Each thread works on its own id space, so that threads never wait on each other's locks, and only updates or
+    deletes rows it inserted itself.  Every row written by a transaction gets its ``committed_at`` column set to the
+    time the transaction started, so measured latencies include the time it took to commit.
+
+    Args:
+        engine (:py:class:`sqlalchemy.engine.Engine`): Engine of the database.
+        tables (:obj:`list`): Tables created by :py:func:`create_workload_tables`.
+        operation_mix (:obj:`dict`, optional): Relative weights of ``insert``, ``update`` and ``delete``.
+            Default: ``{'insert': 0.5, 'update': 0.3, 'delete': 0.2}``.
+        transaction_size (:obj:`int`, optional): Operations per transaction. Default: ``10``.
+        threads (:obj:`int`, optional): Number of concurrent threads (and connections). Default: ``4``.
+        session_statements (:obj:`list`, optional): Statements run on each connection before the workload, e.g.
+            ``SET SESSION binlog_row_image = 'MINIMAL'``. Default: ``None``.
+    """
+    def __init__(self, engine, tables, operation_mix=None, transaction_size=10, threads=4, session_statements=None):
+        operation_mix = operation_mix or DEFAULT_OPERATION_MIX
+        if set(operation_mix) - set(OPERATIONS):
+            raise ValueError(f'Invalid operations: {", ".join(set(operation_mix) - set(OPERATIONS))}. '
+                             f'Valid operations are: {", ".join(OPERATIONS)}')
+        self._engine = engine
+        self.tables = tables
+        self._operations = list(operation_mix)
+        self._weights = [operation_mix[operation] for operation in self._operations]
+        self.transaction_size = transaction_size
+        self.threads = threads
+        self._session_statements = session_statements or []
+        # Generated up front, so that generating them does not limit the workload.
+        self._payloads = [get_random_string(string.ascii_letters, 50) for _ in range(PAYLOAD_POOL_SIZE)]
+
+    def _worker(self, index, deadline, interval):
+        rng = random.Random(index)
+        live_ids = {table.name: [] for table in self.tables}
+        next_id = index
+        operations = Counter()
+        transactions = 0
+        with self._engine.connect() as connection:
+            for statement in self._session_statements:
+                connection.execute(sqlalchemy.text(statement))
+            next_start = time.monotonic()
+            while time.monotonic() < deadline:
+                if interval:
+                    time.sleep(max(0.0, next_start - time.monotonic()))
+                    next_start += interval
+                committed_at = int(time.time() * 1000)
+                with connection.begin():
+                    for _ in range(self.transaction_size):
+                        table = rng.choice(self.tables)
+                        ids = live_ids[table.name]
+                        operation = rng.choices(self._operations, self._weights)[0] if ids else 'insert'
+                        payload = rng.choice(self._payloads)
+                        if operation == 'insert':
+                            connection.execute(table.insert().values(id=next_id, payload=payload,
+                                                                     **{COMMITTED_AT_COLUMN: committed_at}))
+                            ids.append(next_id)
+                            next_id += self.threads
+                        elif operation == 'update':
+                            connection.execute(table.update()
+                                                    .where(table.c.id == rng.choice(ids))
+                                                    .values(payload=payload, **{COMMITTED_AT_COLUMN: committed_at}))
+                        else:
+                            # Swapped with the last id, so that removing it does not shift the list.
+                            position = rng.randrange(len(ids))
+                            ids[position], ids[-1] = ids[-1], ids[position]
+                            connection.execute(table.delete().where(table.c.id == ids.pop()))
+                        operations[operation] += 1
+                transactions += 1
+        return transactions, operations
+
+    def run(self, duration, rate=None):
+        """Runs the workload for ``duration`` seconds, at ``rate`` transactions per second over all threads, or as fast
+        as the database allows if ``rate`` is ``None``.
+
+        Returns:
+            A :py:class:`WorkloadResult`.
+        """
+        interval = self.threads / rate if rate else None
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            futures = [executor.submit(self._worker, index, start + duration, interval)
+                       for index in range(self.threads)]
+            results = [future.result() for future in futures]
+        elapsed = time.monotonic() - start
+
+        operations = sum((operations for _, operations in results), Counter())
+        result = WorkloadResult(threads=self.threads,
+                                transaction_size=self.transaction_size,
+                                duration=elapsed,
+                                transactions=sum(transactions for transactions, _ in results),
+                                inserts=operations['insert'],
+                                updates=operations['update'],
+                                deletes=operations['delete'],
+                                operations_per_second=sum(operations.values()) / elapsed)
+        logger.info('DML workload: %s transactions (%s inserts, %s updates, %s deletes) in %.1f s from %s thread(s), '
+                    '%.0f operations/sec', result.transactions, result.inserts, result.updates, result.deletes,
+                    result.duration, self.threads, result.operations_per_second)
+        return result
+
+
+class LatencyLanes:
+    """Measures commit-to-record latency inside a CDC pipeline: an Expression Evaluator sets the latency of each record
+    carrying a ``committed_at`` value as a header attribute, and a Stream Selector routes records to one Trash per
+    latency bucket, whose input counters then make up a histogram.
+
+    Records without a commit time (e.g. deletes, whose images lack the column) are routed to a bucket of their own.
+
+    Args:
+        pipeline_builder (:py:class:`streamsets.sdk.sdc_models.PipelineBuilder`): Pipeline builder.
+        origin: CDC origin stage, connected to the latency stages.
+        committed_at_path (:obj:`str`): Path of the ``committed_at`` column in the origin's records.
+        condition (:obj:`str`, optional): Additional EL condition (without ``${}``) selecting records to measure,
+            e.g. on their operation type. Default: ``None``.
+        bounds (:obj:`list`, optional): Upper bounds of the buckets in milliseconds. Default: ``LATENCY_BOUNDS``.
+    """
+    def __init__(self, pipeline_builder, origin, committed_at_path, condition=None, bounds=LATENCY_BOUNDS):
+        self.bounds = bounds
+        measured = f"record:exists('{committed_at_path}')" + (f' && {condition}' if condition else '')
+        expression_evaluator = pipeline_builder.add_stage('Expression Evaluator')
+        expression_evaluator.header_attribute_expressions = [{
+            'attributeToSet': LATENCY_ATTRIBUTE,
+            'headerAttributeExpression': f"${{{measured} ? time:dateTimeToMilliseconds(time:now()) - "
+                                         f"record:value('{committed_at_path}') : 0}}"
+        }]
+        stream_selector = pipeline_builder.add_stage('Stream Selector')
+        origin >> expression_evaluator >> stream_selector
+
+        # One bucket per bound (the first one also holding latencies made negative by clock skew), then unmeasured
+        # records and the overflow (default) bucket.
+        latency = f"record:attribute('{LATENCY_ATTRIBUTE}')"
+        lower_bounds = [None] + bounds[:-1]
+        predicates = ([f'${{{measured} && {latency} < {upper}' +
+                       (f' && {latency} >= {lower}}}' if lower is not None else '}')
+                       for lower, upper in zip(lower_bounds, bounds)] +
+                      [f'${{!({measured})}}', 'default'])
+        self._trashes = []
+        for _ in predicates:
+            trash = pipeline_builder.add_stage('Trash')
+            stream_selector >> trash
+            self._trashes.append(trash)
+        stream_selector.condition = [dict(outputLane=lane, predicate=predicate)
+                                     for lane, predicate in zip(stream_selector.output_lanes, predicates)]
+
+    def _count(self, metrics, trash):
+        return metrics.counter(f'stage.{trash.instance_name}.inputRecords.counter').count
+
+    def histogram(self, metrics):
+        """Returns the record count of each bucket as a :obj:`dict` of upper bound (``math.inf`` for the overflow
+        bucket) to count, and the number of unmeasured records."""
+        counts = [self._count(metrics, trash) for trash in self._trashes]
+        buckets = dict(zip(self.bounds, counts[:len(self.bounds)]))
+        buckets[math.inf] = counts[-1]
+        return buckets, counts[-2]
+
+    @staticmethod
+    def percentile(buckets, percentile):
+        """Returns the upper bound of the bucket holding the given percentile (e.g. ``99``) in milliseconds,
+        ``math.inf`` if it is past the last bound, or ``None`` if no record was measured."""
+        measured = sum(buckets.values())
+        if not measured:
+            return None
+        seen = 0
+        for bound in sorted(buckets):
+            seen += buckets[bound]
+            if seen >= percentile / 100 * measured:
+                return bound
+        return math.inf
@@ -0,0 +1,159 @@
+# Copyright 2023 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing utils for bulk loading benchmark datasets straight into databases, bypassing SDC
+import csv
+import io
+import logging
+import os
+import tempfile
+import time
+
+import sqlalchemy
+
+from .utils_datasets import DEFAULT_CHUNK_SIZE, chunked, generate_records
+
+logger = logging.getLogger(__name__)
+
+
+def _to_delimited_value(value, database_type):
+    if isinstance(value, bool):
+        if database_type == 'PostgreSQL':
+            return 't' if value else 'f'
+        return int(value)
+    return value
+
+
+def _write_delimited(rows, columns, database_type, output):
+    writer = csv.writer(output, lineterminator='\n')
+    for row in rows:
+        writer.writerow([_to_delimited_value(row[column], database_type) for column in columns])
+
+
+def _load_mysql(engine, table, records, chunk_size):
+    # LOAD DATA LOCAL INFILE has to be enabled on the client side as well, hence the dedicated engine.
+    local_infile_engine = sqlalchemy.create_engine(engine.url, connect_args={'local_infile': True})
+    columns = [column.name for column in table.columns]
+    preparer = engine.dialect.identifier_preparer
+    column_list = ', '.join(preparer.format_column(column) for column in table.columns)
+    try:
+        with local_infile_engine.begin() as connection:
+            for chunk in chunked(records, chunk_size):
+                # Each chunk is spooled to its own file so that memory stays flat regardless of the record count.
+                with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False) as chunk_file:
+                    _write_delimited(chunk, columns, 'MySQL', chunk_file)
+                try:
+                    connection.execute(sqlalchemy.text(
+                        f"LOAD DATA LOCAL INFILE '{chunk_file.name}' INTO TABLE {preparer.format_table(table)} "
+                        f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' LINES TERMINATED BY '\\n' "
+                        f"({column_list})"
+                    ))
+                finally:
+                    os.remove(chunk_file.name)
+                yield len(chunk)
+    finally:
+        local_infile_engine.dispose()
+
+
+def _load_postgresql(engine, table, records, chunk_size):
+    columns = [column.name for column in table.columns]
+    preparer = engine.dialect.identifier_preparer
+    column_list = ', '.join(preparer.format_column(column) for column in table.columns)
+    copy_statement = f'COPY {preparer.format_table(table)} ({column_list}) FROM STDIN WITH (FORMAT csv)'
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for chunk in chunked(records, chunk_size):
+            buffer = io.StringIO()
+            _write_delimited(chunk, columns, 'PostgreSQL', buffer)
+            buffer.seek(0)
+            cursor.copy_expert(copy_statement, buffer)
+            yield len(chunk)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def _load_executemany(engine, table, records, chunk_size):
+    # For Oracle, SQLAlchemy hands executemany() straight to cx_Oracle which binds each chunk as arrays.  For SQL
+    # Server, pyodbc's fast_executemany does the same, which is the closest we can get to bcp without shelling out to
+    # it.
+    # SQLAlchemy also takes care of SET IDENTITY_INSERT for SQL Server as the primary key is an IDENTITY column.
+    if engine.dialect.name == 'mssql' and engine.dialect.driver == 'pyodbc':
+        engine = sqlalchemy.create_engine(engine.url, fast_executemany=True)
+    insert = table.insert()
+    with engine.begin() as connection:
+        for chunk in chunked(records, chunk_size):
+            connection.execute(insert, chunk)
+            yield len(chunk)
+
+
+def configure_jdbc_producer(jdbc_producer, database_type, table_name):
+    """Applies the JDBC Producer settings each database needs or writes fastest with, as used to load datasets.
+
+    Args:
+        jdbc_producer: JDBC Producer stage.
+        database_type (:obj:`str`): STF database type, e.g. ``PostgreSQL``.
+        table_name (:obj:`str`): Name of the table written to.
+    """
+    if database_type == 'MySQL':
+        jdbc_producer.use_multi_row_operation = True
+        jdbc_producer.statement_parameter_limit = 32768  # bind variable limit for older versions of the database
+    elif database_type == 'Oracle':
+        jdbc_producer.enclose_object_names = True
+        jdbc_producer.use_multi_row_operation = False
+    elif database_type == 'PostgreSQL':
+        jdbc_producer.enclose_object_names = True
+        jdbc_producer.statement_parameter_limit = 32768  # bind variable limit for older versions of the database
+    elif database_type == 'SQLServer':
+        jdbc_producer.use_multi_row_operation = False
+        jdbc_producer.init_query = f'SET IDENTITY_INSERT dbo.{table_name} ON'
+
+
+_LOADERS = {
+    'MySQL': _load_mysql,
+    'PostgreSQL': _load_postgresql,
+    'Oracle': _load_executemany,
+    'SQLServer': _load_executemany,
+}
+
+
+def bulk_load_table(database, table, dataset, record_count, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Loads ``record_count`` records of ``dataset`` into ``table`` using the bulk path of the database engine.
+
+    Records are generated and sent in chunks of ``chunk_size`` so that memory use does not grow with the record count.
+    Databases without a dedicated bulk path fall back to chunked ``executemany`` inserts.
+
+    Args:
+        database: STF database environment.
+        table (:py:class:`sqlalchemy.Table`): Table to load, as created for the dataset schema.
+        dataset: STF benchmark dataset.
+        record_count (:obj:`int`): Number of records to load.
+        chunk_size (:obj:`int`, optional): Number of records sent to the database at once. Default: ``50000``.
+    """
+    loader = _LOADERS.get(database.type, _load_executemany)
+    column_names = {column.name for column in table.columns}
+    records = ({name: value for name, value in record.items() if name in column_names}
+               for record in generate_records(dataset, record_count))
+
+    logger.info('Bulk loading %s records into table %s using %s ...', record_count, table.name, loader.__name__)
+    start = time.time()
+    loaded = 0
+    for chunk_count in loader(database.engine, table, records, chunk_size):
+        loaded += chunk_count
+        logger.debug('Loaded %s/%s records into table %s', loaded, record_count, table.name)
+    elapsed = time.time() - start
+    logger.info('Loaded %s records into table %s in %.2f s (%.0f records/s)',
+                loaded, table.name, elapsed, loaded / elapsed if elapsed else loaded)
+    return loaded
@@ -0,0 +1,118 @@
+# Copyright 2023 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing a persistent cache of benchmark datasets already loaded into test environments
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.streamsets', 'stf_dataset_cache.json')
+DEFAULT_MAX_ENTRIES = 10
+DEFAULT_TTL = 7 * 24 * 60 * 60  # seconds
+
+
+class DatasetCache:
+    """Keeps track of the tables and topics that were populated with a dataset, so that later sessions and other
+    modules can reuse them instead of loading the data again.
+
+    Entries are content-addressed: the key is derived from the dataset name, a hash of its schema, the record count, the
+    target type and any other attribute that affects the loaded data (e.g. the data format of a topic).  The cache only
+    records where the data lives; callers are expected to validate an entry against the environment before reusing it
+    and to drop the data of the entries returned by :py:meth:`evict`.
+
+    Args:
+        path (:obj:`str`, optional): Path of the JSON file backing the cache. Default: ``DEFAULT_CACHE_PATH``.
+        ttl (:obj:`int`, optional): Seconds after which an unused entry expires. Default: ``DEFAULT_TTL``.
+        max_entries (:obj:`int`, optional): Number of entries kept per environment, least recently used entries are
+            evicted first. Default: ``DEFAULT_MAX_ENTRIES``.
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @staticmethod
+    def key(dataset, record_count, target_type, **attributes):
+        schema_hash = hashlib.sha256(json.dumps(dataset.avro_schema, sort_keys=True).encode()).hexdigest()
+        content = json.dumps(dict(dataset=dataset.name, schema=schema_hash, record_count=record_count,
+                                  target_type=target_type, **attributes), sort_keys=True, default=str)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _read(self):
+        try:
+            with open(self.path) as cache_file:
+                return json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning('Ignoring corrupt dataset cache %s: %s', self.path, str(e))
+            return {}
+
+    def _write(self, entries):
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first so that concurrent sessions never read a partially written cache.
+        with tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as cache_file:
+            json.dump(entries, cache_file, indent=2, sort_keys=True)
+        os.replace(cache_file.name, self.path)
+
+    def get(self, key, environment):
+        """Returns the entry for ``key`` in ``environment`` and marks it as recently used, or ``None``."""
+        entries = self._read()
+        entry = entries.get(key)
+        if entry is None or entry['environment'] != environment:
+            return None
+        if time.time() - entry['last_used'] > self.ttl:
+            logger.debug('Dataset cache entry %s for %s has expired', key, entry['name'])
+            return None
+        entry['last_used'] = time.time()
+        self._write(entries)
+        return entry
+
+    def put(self, key, environment, name, **metadata):
+        """Records that ``name`` (a table or topic) in ``environment`` holds the data identified by ``key``."""
+        entries = self._read()
+        # Loading data into a table or topic replaces whatever another entry recorded for it.
+        for stale_key in [k for k, e in entries.items() if e['environment'] == environment and e['name'] == name]:
+            del entries[stale_key]
+        now = time.time()
+        entries[key] = dict(environment=environment, name=name, created=now, last_used=now, **metadata)
+        self._write(entries)
+
+    def remove(self, key):
+        entries = self._read()
+        if entries.pop(key, None) is not None:
+            self._write(entries)
+
+    def evict(self, environment):
+        """Removes expired and least recently used entries of ``environment`` and returns them.
+
+        Entries of other environments are left untouched, since their data can only be dropped from there.
+        """
+        entries = self._read()
+        now = time.time()
+        candidates = sorted(((k, e) for k, e in entries.items() if e['environment'] == environment),
+                            key=lambda item: item[1]['last_used'], reverse=True)
+        evicted = [(k, e) for index, (k, e) in enumerate(candidates)
+                   if index >= self.max_entries or now - e['last_used'] > self.ttl]
+        for key, _ in evicted:
+            del entries[key]
+        if evicted:
+            self._write(entries)
+        return [entry for _, entry in evicted]
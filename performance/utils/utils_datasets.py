@@ -0,0 +1,85 @@
+# Copyright 2023 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing utils for generating benchmark dataset records outside of SDC
+import hashlib
+from datetime import datetime, timedelta
+from itertools import islice
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Base timestamp for generated 'timestamp-millis' values, so that the same record index always maps to the same value.
+_BASE_TIMESTAMP = datetime(2021, 1, 1)
+
+
+def avro_field_types(dataset):
+    """Returns a list of (field name, field type) tuples for the fields of a dataset's Avro schema.
+
+    Nullable fields are declared as unions (e.g. ``['null', 'string']``), in which case the non-null type is used.
+    Logical types (e.g. ``timestamp-millis``) take precedence over their underlying primitive type.
+    """
+    field_types = []
+    for field in dataset.avro_schema['fields']:
+        field_type = field['type']
+        if isinstance(field_type, list):
+            field_type = field_type[1]
+        if isinstance(field_type, dict):
+            field_type = field_type.get('logicalType', field_type.get('type'))
+        field_types.append((field['name'], field_type))
+    return field_types
+
+
+def _generate_value(field_type, index):
+    if field_type in ['int', 'long']:
+        return index
+    elif field_type == 'string':
+        return hashlib.md5(str(index).encode()).hexdigest()
+    elif field_type in ['bool', 'boolean']:
+        return index % 2 == 0
+    elif field_type == 'timestamp-millis':
+        return _BASE_TIMESTAMP + timedelta(milliseconds=index)
+    elif field_type in ['float', 'double']:
+        return index / 4
+    raise ValueError(f'Unsupported Avro field type: {field_type}')
+
+
+def generate_records(dataset, record_count, start=1):
+    """Lazily generates ``record_count`` records (as dicts) matching the Avro schema of ``dataset``.
+
+    Values are derived from the record index, so a given index always yields the same record, and the primary key of
+    the dataset is unique across the generated records.
+
+    The values are synthetic and differ from those of the Benchmark origin: integers are the record index, strings
+    are its MD5 hex digest, floating point numbers are a quarter of it and timestamps count up one millisecond per
+    record from 2021-01-01.
+    """
+    return generate_field_records(avro_field_types(dataset), record_count, start)
+
+
+def generate_field_records(field_types, record_count, start=1):
+    """Same as :py:func:`generate_records`, for a list of (field name, field type) tuples as returned by
+    :py:func:`avro_field_types`.  Useful where the dataset itself is not available (e.g. in worker processes).
+    """
+    for index in range(start, start + record_count):
+        yield {name: _generate_value(field_type, index) for name, field_type in field_types}
+
+
+def chunked(iterable, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Splits ``iterable`` into lists of at most ``chunk_size`` items without materializing the whole iterable."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
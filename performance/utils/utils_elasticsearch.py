@@ -0,0 +1,157 @@
+# Copyright 2023 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing utils for bulk indexing benchmark documents into Elasticsearch
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from elasticsearch.exceptions import NotFoundError, TransportError
+from elasticsearch.helpers import streaming_bulk
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THREAD_COUNT = 10
+DEFAULT_CHUNK_SIZE = 5_000
+DEFAULT_MAX_CHUNK_BYTES = 10 * 1024 * 1024
+DEFAULT_MAX_RETRIES = 8
+DEFAULT_INITIAL_BACKOFF = 2  # seconds, doubled on every retry of a rejected chunk
+DEFAULT_REPORT_INTERVAL = 10  # seconds
+
+
+@contextmanager
+def bulk_load_settings(client, index):
+    """Disables refreshes and replicas of ``index`` while loading it, then restores them and refreshes the index."""
+    settings = client.indices.get_settings(index=index)[index]['settings']['index']
+    refresh_interval = settings.get('refresh_interval', '1s')
+    number_of_replicas = settings.get('number_of_replicas', '1')
+
+    logger.debug('Disabling refresh and replicas of index %s', index)
+    client.indices.put_settings(index=index, body={'index': {'refresh_interval': '-1', 'number_of_replicas': 0}})
+    try:
+        yield
+    finally:
+        logger.debug('Restoring refresh interval (%s) and replicas (%s) of index %s',
+                     refresh_interval, number_of_replicas, index)
+        client.indices.put_settings(index=index, body={'index': {'refresh_interval': refresh_interval,
+                                                                 'number_of_replicas': number_of_replicas}})
+        client.indices.refresh(index=index)
+
+
+class _Progress:
+    def __init__(self, index, doc_count, report_interval):
+        self._index = index
+        self._doc_count = doc_count
+        self._report_interval = report_interval
+        self._lock = threading.Lock()
+        self._start = self._last_report = time.time()
+        self.indexed = 0
+        self.failed = 0
+
+    def update(self, ok):
+        with self._lock:
+            if ok:
+                self.indexed += 1
+            else:
+                self.failed += 1
+            now = time.time()
+            if now - self._last_report >= self._report_interval:
+                self._last_report = now
+                logger.info('Indexed %s/%s documents into %s (%.0f docs/s)',
+                            self.indexed, self._doc_count, self._index, self.indexed / (now - self._start))
+
+
+def bulk_index(client, index, generate_documents, doc_count, thread_count=DEFAULT_THREAD_COUNT,
+               chunk_size=DEFAULT_CHUNK_SIZE, max_chunk_bytes=DEFAULT_MAX_CHUNK_BYTES, max_retries=DEFAULT_MAX_RETRIES,
+               initial_backoff=DEFAULT_INITIAL_BACKOFF, report_interval=DEFAULT_REPORT_INTERVAL):
+    """Indexes ``doc_count`` documents into ``index`` using ``thread_count`` concurrent bulk streams.
+
+    Each thread indexes a contiguous range of documents, one bounded chunk at a time, so that the cluster applies
+    backpressure: a thread only generates its next chunk once the previous one was accepted.  Chunks rejected by the
+    cluster (HTTP 429) are retried with exponential backoff.  Refreshes and replicas are disabled during the load.
+
+    Args:
+        client (:py:class:`elasticsearch.Elasticsearch`): Elasticsearch client.
+        index (:obj:`str`): Index to load. It must already exist.
+        generate_documents (callable): Called with (start, stop) and returning an iterable of bulk actions for the
+            documents in that range.
+        doc_count (:obj:`int`): Number of documents to index.
+        thread_count (:obj:`int`, optional): Number of concurrent bulk streams. Default: ``10``.
+        chunk_size (:obj:`int`, optional): Maximum number of documents per bulk request. Default: ``5000``.
+        max_chunk_bytes (:obj:`int`, optional): Maximum size of a bulk request in bytes. Default: 10 MiB.
+        max_retries (:obj:`int`, optional): Number of retries of a rejected chunk. Default: ``8``.
+        initial_backoff (:obj:`int`, optional): Seconds to wait before the first retry. Default: ``2``.
+        report_interval (:obj:`int`, optional): Seconds between progress reports. Default: ``10``.
+
+    Returns:
+        The number of documents indexed.
+    """
+    progress = _Progress(index, doc_count, report_interval)
+    range_size = -(-doc_count // thread_count)
+
+    def index_range(start, stop):
+        for ok, item in streaming_bulk(client, generate_documents(start, stop), chunk_size=chunk_size,
+                                       max_chunk_bytes=max_chunk_bytes, max_retries=max_retries,
+                                       initial_backoff=initial_backoff, raise_on_error=False):
+            if not ok:
+                logger.warning('Failed to index document into %s: %s', index, item)
+            progress.update(ok)
+
+    logger.info('Indexing %s documents into %s using %s threads ...', doc_count, index, thread_count)
+    start_time = time.time()
+    with bulk_load_settings(client, index):
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            futures = [executor.submit(index_range, start, min(start + range_size, doc_count))
+                       for start in range(0, doc_count, range_size)]
+            for future in futures:
+                future.result()
+    elapsed = time.time() - start_time
+
+    logger.info('Indexed %s documents into %s in %.2f s (%.0f docs/s)',
+                progress.indexed, index, elapsed, progress.indexed / elapsed if elapsed else progress.indexed)
+    if progress.failed:
+        raise RuntimeError(f'Failed to index {progress.failed} documents into {index}')
+    return progress.indexed
+
+
+def restore_snapshot(client, repository, snapshot, index):
+    """Restores the index held by ``snapshot`` as ``index``, if the snapshot exists in ``repository``.
+
+    Returns:
+        ``True`` if the index was restored, ``False`` if there is no such snapshot.
+    """
+    try:
+        client.snapshot.get(repository=repository, snapshot=snapshot)
+    except NotFoundError:
+        return False
+
+    logger.info('Restoring index %s from snapshot %s/%s ...', index, repository, snapshot)
+    client.snapshot.restore(repository=repository, snapshot=snapshot,
+                            body={'indices': '*', 'include_global_state': False,
+                                  'rename_pattern': '.+', 'rename_replacement': index},
+                            wait_for_completion=True)
+    return True
+
+
+def create_snapshot(client, repository, snapshot, index):
+    """Snapshots ``index`` into ``repository`` so that later runs can restore it instead of indexing it again."""
+    logger.info('Creating snapshot %s/%s of index %s ...', repository, snapshot, index)
+    try:
+        client.snapshot.create(repository=repository, snapshot=snapshot,
+                               body={'indices': index, 'include_global_state': False},
+                               wait_for_completion=True)
+    except TransportError as e:
+        logger.warning('Unable to create snapshot %s/%s: %s', repository, snapshot, str(e))
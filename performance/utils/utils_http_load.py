@@ -0,0 +1,306 @@
+# Copyright 2023 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing an asyncio HTTP load generator for the HTTP Server and REST Service origins
+import asyncio
+import json
+import logging
+import math
+import ssl
+import time
+from collections import Counter, namedtuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+APPLICATION_ID_HEADER = 'X-SDC-APPLICATION-ID'
+# Status the origins answer with when all their receiver threads are busy.
+BACKPRESSURE_STATUS = 503
+
+DEFAULT_CONNECTIONS = 16
+DEFAULT_TIMEOUT = 30  # seconds
+
+PAYLOAD_FORMATS = ['JSON', 'DELIMITED', 'TEXT']
+
+# records counts the records of successful (2xx) requests only.
+LoadResult = namedtuple('LoadResult', ['mode', 'duration', 'requests', 'records', 'statuses', 'errors',
+                                       'requests_per_second', 'records_per_second', 'backpressure_rate', 'p50', 'p99',
+                                       'p999', 'max'])
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram: each bucket is ``precision`` wider than the previous one, so that percentiles
+    are accurate to ``precision`` whatever the number of samples, in constant memory.
+
+    Args:
+        precision (:obj:`float`, optional): Relative width of the buckets. Default: ``0.01``.
+    """
+    def __init__(self, precision=0.01):
+        self._log_base = math.log1p(precision)
+        self._buckets = Counter()
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, latency):
+        """Records a latency in seconds."""
+        self._buckets[int(math.log(max(latency, 1e-6) * 1e6) / self._log_base)] += 1
+        self.count += 1
+        self.max = max(self.max, latency)
+
+    def percentile(self, percentile):
+        """Returns the given percentile (e.g. ``99.9``) in seconds, or ``None`` if nothing was recorded."""
+        if not self.count:
+            return None
+        rank = percentile / 100 * self.count
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                # Upper bound of the bucket.
+                return min(math.exp((bucket + 1) * self._log_base) / 1e6, self.max)
+        return self.max
+
+
+def make_payload(data_format='JSON', records_per_request=1, record_size=100):
+    """Returns a request body of ``records_per_request`` records of about ``record_size`` bytes each.
+
+    JSON records are concatenated objects (``{...}{...}``), as the origins parse them with the multiple objects mode;
+    DELIMITED records are CSV lines with a header line, and TEXT records plain lines.
+    """
+    if data_format not in PAYLOAD_FORMATS:
+        raise ValueError(f'Invalid payload format: {data_format}. Valid formats are: {", ".join(PAYLOAD_FORMATS)}')
+    if data_format == 'JSON':
+        overhead = len(json.dumps({'id': records_per_request, 'payload': ''}))
+        records = [json.dumps({'id': i, 'payload': 'x' * max(record_size - overhead, 0)})
+                   for i in range(records_per_request)]
+        return ''.join(records).encode()
+    if data_format == 'DELIMITED':
+        lines = ['id,payload'] + [f'{i},{"x" * max(record_size - len(str(i)) - 2, 0)}'
+                                  for i in range(records_per_request)]
+    else:
+        lines = ['x' * max(record_size - 1, 0) for _ in range(records_per_request)]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+class _Connection:
+    """A keep-alive HTTP/1.1 connection, opened again whenever the server closed it."""
+    def __init__(self, host, port, ssl_context):
+        self._host = host
+        self._port = port
+        self._ssl_context = ssl_context
+        self._reader = None
+        self._writer = None
+
+    async def _open(self):
+        self._reader, self._writer = await asyncio.open_connection(self._host, self._port, ssl=self._ssl_context)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def request(self, raw_request):
+        """Sends a serialized request and returns the response status, reading (and discarding) the response body."""
+        reused = self._writer is not None
+        if not reused:
+            await self._open()
+        try:
+            return await self._exchange(raw_request)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            if not reused:
+                raise
+        # The server may have closed the connection while it was idle.
+        await self._open()
+        try:
+            return await self._exchange(raw_request)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            raise
+
+    async def _exchange(self, raw_request):
+        self._writer.write(raw_request)
+        await self._writer.drain()
+        return await self._read_response()
+
+    async def _read_response(self):
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionResetError('Connection closed by server')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await self._reader.readline()).split(b';')[0], 16)
+                await self._reader.readexactly(size + 2)
+                if not size:
+                    break
+        elif 'content-length' in headers:
+            await self._reader.readexactly(int(headers['content-length']))
+        else:
+            await self._reader.read()
+            self.close()
+            return status
+
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status
+
+
+class HttpLoadGenerator:
+    """Sends the same request to an HTTP endpoint (e.g. an HTTP Server or REST Service origin) over a pool of keep-alive
+    connections, either at a fixed rate (open loop) or with a fixed number of requests in flight (closed loop).
+
+    Open-loop latencies are measured from the time each request was scheduled to be sent, so that requests delayed
+    because all connections were busy (or the origin was slow to answer) are accounted for rather than omitted.
+
+    Args:
+        url (:obj:`str`): URL to send requests to, e.g. ``http://sdc:9999/``.
+        payload (:obj:`bytes`): Request body, see :py:func:`make_payload`.
+        application_id (:obj:`str`, optional): Value of the ``X-SDC-APPLICATION-ID`` header. Default: ``None``.
+        records_per_request (:obj:`int`, optional): Number of records in the payload, to report records/sec.
+            Default: ``1``.
+        connections (:obj:`int`, optional): Size of the connection pool. Default: ``16``.
+        method (:obj:`str`, optional): HTTP method. Default: ``'POST'``.
+        headers (:obj:`dict`, optional): Additional headers. Default: ``None``.
+        timeout (:obj:`float`, optional): Timeout of each request in seconds. Default: ``30``.
+    """
+    def __init__(self, url, payload, application_id=None, records_per_request=1, connections=DEFAULT_CONNECTIONS,
+                 method='POST', headers=None, timeout=DEFAULT_TIMEOUT):
+        split_url = urlsplit(url)
+        self.host = split_url.hostname
+        self.port = split_url.port or (443 if split_url.scheme == 'https' else 80)
+        self._ssl_context = None
+        if split_url.scheme == 'https':
+            # Origins under test use self-signed certificates.
+            self._ssl_context = ssl.create_default_context()
+            self._ssl_context.check_hostname = False
+            self._ssl_context.verify_mode = ssl.CERT_NONE
+        self.records_per_request = records_per_request
+        self.connections = connections
+        self.timeout = timeout
+
+        request_headers = {'Host': f'{self.host}:{self.port}', 'Content-Length': str(len(payload)),
+                           'Connection': 'keep-alive'}
+        if application_id is not None:
+            request_headers[APPLICATION_ID_HEADER] = application_id
+        request_headers.update(headers or {})
+        head = f'{method} {split_url.path or "/"}{"?" + split_url.query if split_url.query else ""} HTTP/1.1\r\n'
+        head += ''.join(f'{name}: {value}\r\n' for name, value in request_headers.items())
+        self._raw_request = (head + '\r\n').encode('latin-1') + payload
+
+    def wait_until_listening(self, timeout=60):
+        """Waits until the endpoint accepts connections, e.g. after starting the origin's pipeline."""
+        async def wait():
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    _, writer = await asyncio.open_connection(self.host, self.port, ssl=self._ssl_context)
+                    writer.close()
+                    return
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f'{self.host}:{self.port} not listening after {timeout} seconds')
+                    await asyncio.sleep(0.5)
+        asyncio.run(wait())
+
+    async def _send(self, pool, histogram, statuses, errors, scheduled):
+        connection = await pool.get()
+        try:
+            status = await asyncio.wait_for(connection.request(self._raw_request), self.timeout)
+            statuses[status] += 1
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            connection.close()
+            errors[type(e).__name__] += 1
+        finally:
+            pool.put_nowait(connection)
+        histogram.record(time.monotonic() - scheduled)
+
+    def _pool(self, size):
+        pool = asyncio.Queue()
+        for _ in range(size):
+            pool.put_nowait(_Connection(self.host, self.port, self._ssl_context))
+        return pool
+
+    def _result(self, mode, duration, histogram, statuses, errors, pool):
+        while not pool.empty():
+            pool.get_nowait().close()
+        requests = sum(statuses.values()) + sum(errors.values())
+        successes = sum(count for status, count in statuses.items() if 200 <= status < 300)
+        result = LoadResult(mode=mode,
+                            duration=duration,
+                            requests=requests,
+                            records=successes * self.records_per_request,
+                            statuses=dict(statuses),
+                            errors=dict(errors),
+                            requests_per_second=requests / duration,
+                            records_per_second=successes * self.records_per_request / duration,
+                            backpressure_rate=statuses[BACKPRESSURE_STATUS] / requests if requests else 0.0,
+                            p50=histogram.percentile(50),
+                            p99=histogram.percentile(99),
+                            p999=histogram.percentile(99.9),
+                            max=histogram.max)
+        logger.info('%s loop: %s requests in %.1f s (%.0f requests/sec), statuses %s, errors %s, '
+                    '%.2f%% backpressure, latency p50 %.1f ms, p99 %.1f ms, p99.9 %.1f ms',
+                    mode, requests, duration, result.requests_per_second, result.statuses, result.errors,
+                    100 * result.backpressure_rate, 1000 * (result.p50 or 0), 1000 * (result.p99 or 0),
+                    1000 * (result.p999 or 0))
+        return result
+
+    async def _open_loop(self, rate, duration):
+        pool, histogram, statuses, errors = self._pool(self.connections), LatencyHistogram(), Counter(), Counter()
+        start = time.monotonic()
+        tasks = []
+        for i in range(int(rate * duration)):
+            scheduled = start + i / rate
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(self._send(pool, histogram, statuses, errors, scheduled)))
+        await asyncio.gather(*tasks)
+        return self._result('open', time.monotonic() - start, histogram, statuses, errors, pool)
+
+    async def _closed_loop(self, concurrency, duration):
+        pool, histogram, statuses, errors = self._pool(concurrency), LatencyHistogram(), Counter(), Counter()
+        start = time.monotonic()
+
+        async def worker():
+            while time.monotonic() - start < duration:
+                await self._send(pool, histogram, statuses, errors, time.monotonic())
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return self._result('closed', time.monotonic() - start, histogram, statuses, errors, pool)
+
+    def open_loop(self, rate, duration):
+        """Sends ``rate`` requests per second for ``duration`` seconds, whatever the response times.
+
+        Returns:
+            A :py:class:`LoadResult`.
+        """
+        return asyncio.run(self._open_loop(rate, duration))
+
+    def closed_loop(self, concurrency, duration):
+        """Keeps ``concurrency`` requests in flight for ``duration`` seconds, each sent as soon as the previous one on
+        its connection is answered.
+
+        Returns:
+            A :py:class:`LoadResult`.
+        """
+        return asyncio.run(self._closed_loop(concurrency, duration))
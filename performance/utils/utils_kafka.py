@@ -0,0 +1,304 @@
+# Copyright 2023 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing utils for loading benchmark datasets straight into Kafka topics, bypassing SDC
+import csv
+import io
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timezone
+
+import avro.io
+import avro.schema
+from kafka import KafkaConsumer, KafkaProducer, TopicPartition
+
+from .utils_datasets import avro_field_types, generate_field_records
+
+logger = logging.getLogger(__name__)
+
+DATA_FORMATS = ['AVRO', 'DELIMITED', 'TEXT']
+
+OUTPUT_RECORDS_COUNTER = 'pipeline.batchOutputRecords.counter'
+DEFAULT_LAG_SAMPLING_INTERVAL = 0.2  # seconds
+
+# Records counted by a pipeline (or messages committed to a topic) at a given time.monotonic() time.
+CountSample = namedtuple('CountSample', ['time', 'count'])
+
+DEFAULT_PRODUCER_CONFIG = dict(acks='all',
+                               batch_size=1024 * 1024,
+                               compression_type='gzip',
+                               linger_ms=50,
+                               retries=5)
+
+# Only recent versions of kafka-python support idempotent producers.  Without idempotence, a single in-flight request
+# per connection keeps retries from reordering or duplicating messages.
+if 'enable_idempotence' in KafkaProducer.DEFAULT_CONFIG:
+    DEFAULT_PRODUCER_CONFIG.update(enable_idempotence=True, max_in_flight_requests_per_connection=5)
+else:
+    DEFAULT_PRODUCER_CONFIG.update(max_in_flight_requests_per_connection=1)
+
+
+class AvroContainerSerializer:
+    """Serializes records as single-record Avro container files, as written by SDC's Kafka Producer with the schema
+    in the message header.
+
+    The container header (magic, metadata and sync marker) is the same for every message, so it is encoded only once.
+    """
+    def __init__(self, avro_schema, field_types):
+        # The Avro library only reliably encodes timezone-aware datetimes as timestamp-millis.
+        self._timestamp_fields = [name for name, field_type in field_types if field_type == 'timestamp-millis']
+        schema_json = json.dumps(avro_schema)
+        self._datum_writer = avro.io.DatumWriter(avro.schema.parse(schema_json))
+        self._sync_marker = os.urandom(16)
+
+        header = io.BytesIO()
+        encoder = avro.io.BinaryEncoder(header)
+        header.write(b'Obj\x01')
+        encoder.write_long(2)
+        encoder.write_utf8('avro.schema')
+        encoder.write_bytes(schema_json.encode())
+        encoder.write_utf8('avro.codec')
+        encoder.write_bytes(b'null')
+        encoder.write_long(0)
+        header.write(self._sync_marker)
+        self._header = header.getvalue()
+
+    def __call__(self, record):
+        for name in self._timestamp_fields:
+            record[name] = record[name].replace(tzinfo=timezone.utc)
+        datum = io.BytesIO()
+        self._datum_writer.write(record, avro.io.BinaryEncoder(datum))
+        datum = datum.getvalue()
+
+        message = io.BytesIO()
+        message.write(self._header)
+        encoder = avro.io.BinaryEncoder(message)
+        encoder.write_long(1)
+        encoder.write_long(len(datum))
+        message.write(datum)
+        message.write(self._sync_marker)
+        return message.getvalue()
+
+
+class DelimitedSerializer:
+    """Serializes records as CSV with a header line, as written by SDC's Kafka Producer with ``WITH_HEADER``."""
+    def __init__(self, field_names):
+        self._field_names = field_names
+        self._header = self._row(field_names)
+
+    @staticmethod
+    def _row(values):
+        line = io.StringIO()
+        csv.writer(line, lineterminator='\n').writerow(values)
+        return line.getvalue()
+
+    def __call__(self, record):
+        return (self._header + self._row([record[name] for name in self._field_names])).encode()
+
+
+def _text_serializer(record):
+    # Mirrors the Data Generator stage writing each record as JSON to the /text field.
+    return json.dumps(record, default=str).encode()
+
+
+def _serializer(data_format, avro_schema, field_types):
+    if data_format == 'AVRO':
+        return AvroContainerSerializer(avro_schema, field_types)
+    elif data_format == 'DELIMITED':
+        return DelimitedSerializer([name for name, _ in field_types])
+    elif data_format == 'TEXT':
+        return _text_serializer
+    raise ValueError(f'Invalid data format: {data_format}. Valid formats are: {", ".join(DATA_FORMATS)}')
+
+
+def _load_partition(brokers, topic, partition, field_types, avro_schema, data_format, start, record_count,
+                    producer_config):
+    # Runs in a worker process, so that serialization of each partition happens in parallel.
+    serialize = _serializer(data_format, avro_schema, field_types)
+    producer = KafkaProducer(bootstrap_servers=brokers, **producer_config)
+    try:
+        for record in generate_field_records(field_types, record_count, start):
+            producer.send(topic, value=serialize(record), partition=partition)
+        producer.flush()
+    finally:
+        producer.close()
+    return record_count
+
+
+def end_offsets(brokers, topic):
+    """Returns the end offset of each partition of ``topic``."""
+    consumer = KafkaConsumer(bootstrap_servers=brokers)
+    try:
+        topic_partitions = [TopicPartition(topic, partition) for partition in consumer.partitions_for_topic(topic)]
+        return {tp.partition: offset for tp, offset in consumer.end_offsets(topic_partitions).items()}
+    finally:
+        consumer.close()
+
+
+class ProduceLagSampler:
+    """Samples, in a background thread while a benchmark runs, how long the messages committed to a topic trail the
+    records a pipeline counted as output.
+
+    Every ``interval`` seconds, the output record counter of ``pipeline`` and the sum of the end offsets of ``topic``
+    are read.  The output record counter restarts with each run of the pipeline, so it is accumulated across runs, and
+    end offsets are counted from the ones the topic had when sampling started.  Sampling errors (e.g. while the pipeline
+    is starting) are logged and skipped.
+
+    Use as a context manager; samples are available as lists of :py:class:`CountSample` in ``produced`` and
+    ``committed``, and the lag derived from them from :py:meth:`lags`.
+    """
+    def __init__(self, brokers, topic, sdc_executor, pipeline, interval=DEFAULT_LAG_SAMPLING_INTERVAL):
+        self._brokers = brokers
+        self._topic = topic
+        self._sdc_executor = sdc_executor
+        self._pipeline = pipeline
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+        self._consumer = None
+        self._topic_partitions = None
+        self._baseline = None
+        self._previous_runs = 0
+        self._last_count = 0
+        self.produced = []
+        self.committed = []
+
+    def _sample_committed(self):
+        if not self._topic_partitions:
+            partitions = self._consumer.partitions_for_topic(self._topic)
+            if not partitions:
+                return
+            self._topic_partitions = [TopicPartition(self._topic, partition) for partition in partitions]
+        committed = sum(self._consumer.end_offsets(self._topic_partitions).values())
+        if self._baseline is None:
+            self._baseline = committed
+        self.committed.append(CountSample(time.monotonic(), committed - self._baseline))
+
+    def _sample_produced(self):
+        metrics = self._sdc_executor.get_pipeline_metrics(self._pipeline)
+        if not metrics:
+            return
+        count = metrics.counter(OUTPUT_RECORDS_COUNTER).count
+        if count < self._last_count:
+            # The pipeline was started again for a new run.
+            self._previous_runs += self._last_count
+        self._last_count = count
+        self.produced.append(CountSample(time.monotonic(), self._previous_runs + count))
+
+    def _run(self):
+        while not self._stopped.is_set():
+            for name, sample in (('committed messages', self._sample_committed),
+                                 ('produced records', self._sample_produced)):
+                try:
+                    sample()
+                except Exception as e:
+                    logger.debug('Unable to sample %s: %s', name, str(e))
+            self._stopped.wait(self._interval)
+
+    def lags(self):
+        """Returns the produce-to-commit lag (in seconds) of each produced sample, i.e. the time until the topic was
+        first seen holding as many messages, and the number of produced samples never seen committed while sampling.
+
+        The lag is only as precise as the sampling interval.
+        """
+        lags, unmeasured = [], 0
+        for produced in self.produced:
+            if produced.count == 0:
+                continue
+            committed_at = next((committed.time for committed in self.committed
+                                 if committed.time >= produced.time and committed.count >= produced.count), None)
+            if committed_at is None:
+                unmeasured += 1
+            else:
+                lags.append(committed_at - produced.time)
+        return lags, unmeasured
+
+    def start(self):
+        self._consumer = KafkaConsumer(bootstrap_servers=self._brokers)
+        self._thread = threading.Thread(target=self._run, name='kafka-produce-lag-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._consumer is not None:
+            self._consumer.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def bulk_load_topic(brokers, topic, dataset, record_count, num_partitions, data_format='AVRO', start=1,
+                    producer_config=None, max_workers=None):
+    """Loads ``record_count`` records of ``dataset`` into ``topic``, fanning out across its partitions.
+
+    Each partition gets a contiguous range of the records, produced by its own batched and compressed producer in a
+    worker process.  Completion is verified against the end offsets of the partitions rather than producer metrics.
+
+    Args:
+        brokers (:obj:`str`): Kafka bootstrap servers.
+        topic (:obj:`str`): Topic to load; it must already exist with ``num_partitions`` partitions.
+        dataset: STF benchmark dataset.
+        record_count (:obj:`int`): Number of records to load.
+        num_partitions (:obj:`int`): Number of partitions of the topic.
+        data_format (:obj:`str`, optional): One of ``AVRO``, ``DELIMITED`` or ``TEXT``. Default: ``AVRO``.
+        start (:obj:`int`, optional): Index of the first record to generate. Default: ``1``.
+        producer_config (:obj:`dict`, optional): Overrides of ``DEFAULT_PRODUCER_CONFIG``.
+        max_workers (:obj:`int`, optional): Number of worker processes. Default: one per partition, up to the number
+            of CPUs.
+    """
+    if data_format not in DATA_FORMATS:
+        raise ValueError(f'Invalid data format: {data_format}. Valid formats are: {", ".join(DATA_FORMATS)}')
+
+    config = dict(DEFAULT_PRODUCER_CONFIG, **(producer_config or {}))
+    field_types = avro_field_types(dataset)
+    offsets_before = end_offsets(brokers, topic)
+
+    ranges = []
+    partition_start = start
+    for partition in range(num_partitions):
+        partition_count = record_count // num_partitions + (1 if partition < record_count % num_partitions else 0)
+        ranges.append((partition, partition_start, partition_count))
+        partition_start += partition_count
+
+    logger.info('Loading %s %s records into topic %s across %s partitions ...',
+                record_count, data_format, topic, num_partitions)
+    start_time = time.time()
+    with ProcessPoolExecutor(max_workers=max_workers or min(num_partitions, os.cpu_count() or 1)) as executor:
+        futures = [executor.submit(_load_partition, brokers, topic, partition, field_types, dataset.avro_schema,
+                                   data_format, partition_start, partition_count, config)
+                   for partition, partition_start, partition_count in ranges]
+        loaded = sum(future.result() for future in futures)
+    elapsed = time.time() - start_time
+
+    offsets_after = end_offsets(brokers, topic)
+    for partition, _, partition_count in ranges:
+        produced = offsets_after.get(partition, 0) - offsets_before.get(partition, 0)
+        if produced != partition_count:
+            raise RuntimeError(f'Expected {partition_count} new messages in partition {partition} of topic {topic}, '
+                               f'found {produced}')
+
+    logger.info('Loaded %s records into topic %s in %.2f s (%.0f records/s)',
+                loaded, topic, elapsed, loaded / elapsed if elapsed else loaded)
+    return loaded
@@ -0,0 +1,175 @@
+# Copyright 2023 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing utils for reading SDC JVM and pipeline metrics during benchmarks
+import logging
+import re
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+BATCH_PROCESSING_TIMER = 'pipeline.batchProcessing.timer'
+STAGE_BATCH_PROCESSING_TIMER = re.compile(r'^stage\.(?P<stage>.+)\.batchProcessing\.timer$')
+
+DEFAULT_SAMPLING_INTERVAL = 5  # seconds
+
+StageLatency = namedtuple('StageLatency', ['stage', 'batch_count', 'total_time', 'fraction', 'p50', 'p99'])
+ResourceSample = namedtuple('ResourceSample', ['elapsed', 'heap_used', 'gc_count', 'gc_time', 'cpu_load',
+                                               'thread_count', 'open_file_descriptors', 'stage_timers'])
+
+
+def get_jmx_beans(sdc_executor, query=None):
+    """Returns the JMX beans exposed by the SDC REST API, optionally filtered by a JMX object name query
+    (e.g. ``java.lang:type=Memory``).
+    """
+    url = f'{sdc_executor.api_client.server_url}/rest/v1/system/jmx'
+    response = sdc_executor.api_client.session.get(url, params={'qry': query} if query else None)
+    response.raise_for_status()
+    return response.json()['beans']
+
+
+def get_heap_used(sdc_executor):
+    """Returns the heap used by the SDC JVM in bytes, or ``None`` if it cannot be read."""
+    try:
+        memory, = get_jmx_beans(sdc_executor, 'java.lang:type=Memory')
+        return memory['HeapMemoryUsage']['used']
+    except Exception as e:
+        logger.warning('Unable to read heap usage from SDC: %s', str(e))
+        return None
+
+
+def get_batch_processing_percentiles(sdc_executor, pipeline, percentiles=('p50', 'p95')):
+    """Returns the requested percentiles (in seconds) of the batch processing timer of the last run of a pipeline, or
+    ``None`` for each of them if the pipeline history is not available anymore.
+    """
+    try:
+        history = sdc_executor.get_pipeline_history(pipeline)
+        timer = history.latest.metrics.timer(BATCH_PROCESSING_TIMER)
+        return {percentile: timer._data.get(percentile) for percentile in percentiles}
+    except Exception as e:
+        logger.warning('Unable to read %s for pipeline %s: %s', BATCH_PROCESSING_TIMER, pipeline.id, str(e))
+        return {percentile: None for percentile in percentiles}
+
+
+def get_stage_batch_timers(metrics):
+    """Returns the batch processing timer data of each stage, by stage instance name, from pipeline metrics."""
+    timers = {}
+    for name, data in metrics._data.get('timers', {}).items():
+        match = STAGE_BATCH_PROCESSING_TIMER.match(name)
+        if match:
+            timers[match.group('stage')] = data
+    return timers
+
+
+def get_stage_latency_breakdown(metrics):
+    """Breaks down the batch processing time of a pipeline run by stage.
+
+    The time spent in a stage is estimated as its batch count times its mean batch processing time, from which the
+    fraction of the total time of all stages is derived.
+
+    Args:
+        metrics: Pipeline metrics, e.g. ``sdc_executor.get_pipeline_history(pipeline).latest.metrics``.
+
+    Returns:
+        A list of :py:class:`StageLatency`, from the stage that used the most time to the one that used the least.
+    """
+    timers = get_stage_batch_timers(metrics)
+    totals = {stage: timer.get('count', 0) * timer.get('mean', 0) for stage, timer in timers.items()}
+    overall = sum(totals.values())
+    breakdown = [StageLatency(stage, timers[stage].get('count', 0), total, total / overall if overall else 0.0,
+                              timers[stage].get('p50'), timers[stage].get('p99'))
+                 for stage, total in totals.items()]
+    return sorted(breakdown, key=lambda stage_latency: stage_latency.total_time, reverse=True)
+
+
+def format_stage_latency_breakdown(breakdown):
+    """Renders a stage latency breakdown as a human readable table, with latencies in milliseconds."""
+    def _format(value):
+        return f'{value * 1000:.2f}' if value is not None else 'n/a'
+
+    lines = [f'{"stage":<40} {"batches":>8} {"time (s)":>10} {"share":>6} {"p50 (ms)":>9} {"p99 (ms)":>9}']
+    for stage in breakdown:
+        lines.append(f'{stage.stage:<40} {stage.batch_count:>8} {stage.total_time:>10.2f} {stage.fraction:>6.1%} '
+                     f'{_format(stage.p50):>9} {_format(stage.p99):>9}')
+    return '\n'.join(lines)
+
+
+def _sample_jvm(sdc_executor):
+    beans = {bean['name']: bean for bean in get_jmx_beans(sdc_executor, 'java.lang:*')}
+    memory = beans.get('java.lang:type=Memory', {})
+    operating_system = beans.get('java.lang:type=OperatingSystem', {})
+    threading_bean = beans.get('java.lang:type=Threading', {})
+    collectors = [bean for name, bean in beans.items() if name.startswith('java.lang:type=GarbageCollector')]
+    return dict(heap_used=memory.get('HeapMemoryUsage', {}).get('used'),
+                gc_count=sum(collector.get('CollectionCount', 0) for collector in collectors),
+                gc_time=sum(collector.get('CollectionTime', 0) for collector in collectors),
+                cpu_load=operating_system.get('ProcessCpuLoad'),
+                thread_count=threading_bean.get('ThreadCount'),
+                open_file_descriptors=operating_system.get('OpenFileDescriptorCount'))
+
+
+class ResourceSampler:
+    """Samples SDC resource usage in a background thread while a benchmark runs.
+
+    Every ``interval`` seconds, heap used, cumulated GC count and time (ms), process CPU load, thread count and open
+    file descriptors are read from the JVM through the SDC JMX REST endpoint, along with the batch processing timer of
+    each stage of ``pipeline`` if given.  Sampling errors (e.g. while the pipeline is starting) are logged and skipped.
+
+    Use as a context manager; samples are available as a list of :py:class:`ResourceSample` in ``samples``.
+    """
+    def __init__(self, sdc_executor, pipeline=None, interval=DEFAULT_SAMPLING_INTERVAL):
+        self._sdc_executor = sdc_executor
+        self._pipeline = pipeline
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+        self._start = None
+        self.samples = []
+
+    def _sample(self):
+        jvm = _sample_jvm(self._sdc_executor)
+        stage_timers = None
+        if self._pipeline is not None:
+            try:
+                stage_timers = get_stage_batch_timers(self._sdc_executor.get_pipeline_metrics(self._pipeline))
+            except Exception as e:
+                logger.debug('Unable to read metrics of pipeline %s: %s', self._pipeline.id, str(e))
+        return ResourceSample(elapsed=time.time() - self._start, stage_timers=stage_timers, **jvm)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.samples.append(self._sample())
+            except Exception as e:
+                logger.debug('Unable to sample SDC resources: %s', str(e))
+            self._stopped.wait(self._interval)
+
+    def start(self):
+        self._start = time.time()
+        self._thread = threading.Thread(target=self._run, name='sdc-resource-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
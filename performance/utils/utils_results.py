@@ -0,0 +1,234 @@
+# Copyright 2023 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing a local store of benchmark results and a comparator to detect throughput regressions
+import json
+import logging
+import math
+import os
+import sqlite3
+import statistics
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ALPHA = 0.05
+# Changes of the median throughput smaller than this are not reported, however significant they are.
+DEFAULT_MIN_CHANGE = 0.05
+
+Comparison = namedtuple('Comparison', ['benchmark', 'params', 'baseline_median', 'candidate_median', 'change',
+                                       'p_value', 'regression'])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    benchmark TEXT NOT NULL,
+    params TEXT NOT NULL,
+    sdc_version TEXT NOT NULL,
+    dataset TEXT,
+    threads INTEGER,
+    batch_size INTEGER,
+    record_count INTEGER,
+    batch_latency_p50 REAL,
+    batch_latency_p95 REAL,
+    heap_used INTEGER,
+    metrics TEXT,
+    recorded REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    records_per_second REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resource_samples (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    elapsed REAL NOT NULL,
+    heap_used INTEGER,
+    gc_count INTEGER,
+    gc_time INTEGER,
+    cpu_load REAL,
+    thread_count INTEGER,
+    open_file_descriptors INTEGER,
+    stage_timers TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_benchmark ON runs (benchmark, params, sdc_version);
+"""
+
+
+class BenchmarkResultStore:
+    """SQLite-backed store of benchmark results.
+
+    Each call to ``benchmark_pipeline`` is stored as a run, along with one throughput sample (records/sec) per pipeline
+    run, so that throughput distributions can be compared between SDC versions.  Resource usage sampled during a run
+    (see :py:class:`~.utils_metrics.ResourceSampler`) is stored as a time series next to it.
+
+    Args:
+        path (:obj:`str`): Path of the SQLite database. It is created if it does not exist.
+    """
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+    def record(self, benchmark, params, sdc_version, samples, dataset=None, threads=None, batch_size=None,
+               record_count=None, batch_latency_p50=None, batch_latency_p95=None, heap_used=None, metrics=None):
+        """Stores a benchmark run and returns its id."""
+        with self._connect() as connection:
+            cursor = connection.execute(
+                'INSERT INTO runs (benchmark, params, sdc_version, dataset, threads, batch_size, record_count, '
+                'batch_latency_p50, batch_latency_p95, heap_used, metrics, recorded) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (benchmark, json.dumps(params, sort_keys=True, default=str), str(sdc_version), dataset, threads,
+                 batch_size, record_count, batch_latency_p50, batch_latency_p95, heap_used,
+                 json.dumps(metrics, default=str) if metrics is not None else None, time.time())
+            )
+            run_id = cursor.lastrowid
+            connection.executemany('INSERT INTO samples (run_id, records_per_second) VALUES (?, ?)',
+                                   [(run_id, sample) for sample in samples])
+        return run_id
+
+    def record_resource_samples(self, run_id, samples):
+        """Stores the :py:class:`~.utils_metrics.ResourceSample` time series of a run."""
+        with self._connect() as connection:
+            connection.executemany(
+                'INSERT INTO resource_samples (run_id, elapsed, heap_used, gc_count, gc_time, cpu_load, thread_count, '
+                'open_file_descriptors, stage_timers) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(run_id, sample.elapsed, sample.heap_used, sample.gc_count, sample.gc_time, sample.cpu_load,
+                  sample.thread_count, sample.open_file_descriptors,
+                  json.dumps(sample.stage_timers) if sample.stage_timers is not None else None)
+                 for sample in samples]
+            )
+
+    def resource_samples(self, run_id):
+        """Returns the resource usage time series of a run as a list of dicts, ordered by elapsed time."""
+        with self._connect() as connection:
+            connection.row_factory = sqlite3.Row
+            rows = connection.execute('SELECT * FROM resource_samples WHERE run_id = ? ORDER BY elapsed',
+                                      (run_id,)).fetchall()
+        samples = [dict(row) for row in rows]
+        for sample in samples:
+            if sample['stage_timers'] is not None:
+                sample['stage_timers'] = json.loads(sample['stage_timers'])
+        return samples
+
+    def samples(self, benchmark, params, sdc_version):
+        """Returns all throughput samples recorded for a benchmark with the given parameters and SDC version."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                'SELECT s.records_per_second FROM samples s JOIN runs r ON s.run_id = r.id '
+                'WHERE r.benchmark = ? AND r.params = ? AND r.sdc_version = ?',
+                (benchmark, json.dumps(params, sort_keys=True, default=str), str(sdc_version))
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def threads_samples(self, benchmark, sdc_version):
+        """Returns (params, threads, samples) tuples for the runs of a benchmark that recorded a thread count,
+        samples of runs with the same parameters being merged.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                'SELECT r.params, r.threads, s.records_per_second FROM samples s JOIN runs r ON s.run_id = r.id '
+                'WHERE r.benchmark = ? AND r.sdc_version = ? AND r.threads IS NOT NULL',
+                (benchmark, str(sdc_version))
+            ).fetchall()
+        grouped = {}
+        for params, threads, sample in rows:
+            grouped.setdefault((params, threads), []).append(sample)
+        return [(json.loads(params), threads, samples) for (params, threads), samples in grouped.items()]
+
+    def benchmarks(self, sdc_version):
+        """Returns the (benchmark, params) pairs recorded for an SDC version."""
+        with self._connect() as connection:
+            rows = connection.execute('SELECT DISTINCT benchmark, params FROM runs WHERE sdc_version = ?',
+                                      (str(sdc_version),)).fetchall()
+        return [(benchmark, json.loads(params)) for benchmark, params in rows]
+
+
+@lru_cache(maxsize=None)
+def _u_distribution(n1, n2):
+    # Number of arrangements of n1 + n2 untied samples yielding each value of U, using the usual recurrence on whether
+    # the largest sample belongs to the first or the second group.
+    if n1 == 0 or n2 == 0:
+        return (1,)
+    with_first = _u_distribution(n1 - 1, n2)
+    with_second = _u_distribution(n1, n2 - 1)
+    counts = [0] * (n1 * n2 + 1)
+    for u, count in enumerate(with_first):
+        counts[u + n2] += count
+    for u, count in enumerate(with_second):
+        counts[u] += count
+    return tuple(counts)
+
+
+def mann_whitney_u(baseline, candidate):
+    """One-sided Mann-Whitney U test of whether ``candidate`` values tend to be smaller than ``baseline`` values.
+
+    Returns:
+        A (U, p-value) tuple, U being the number of (baseline, candidate) pairs where the baseline value is larger
+        (ties counting for half).
+    """
+    n1, n2 = len(baseline), len(candidate)
+    if not n1 or not n2:
+        raise ValueError('Both samples must contain at least one value')
+
+    u = sum(1.0 if b > c else 0.5 if b == c else 0.0 for b in baseline for c in candidate)
+    values = list(baseline) + list(candidate)
+    has_ties = len(set(values)) != len(values)
+
+    if not has_ties and n1 * n2 <= 400:
+        counts = _u_distribution(n1, n2)
+        return u, sum(counts[int(u):]) / sum(counts)
+
+    # Normal approximation, with tie and continuity corrections.
+    n = n1 + n2
+    tie_term = sum(count ** 3 - count for count in (values.count(value) for value in set(values)))
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    if sigma == 0:
+        return u, 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / sigma
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def compare(store, baseline_version, candidate_version, alpha=DEFAULT_ALPHA, min_change=DEFAULT_MIN_CHANGE,
+            benchmark=None):
+    """Compares the throughput of every benchmark (or only ``benchmark``) recorded for both SDC versions.
+
+    A benchmark is flagged as a regression when its candidate throughput is significantly lower than the baseline one
+    (one-sided Mann-Whitney U test at level ``alpha``) and its median dropped by at least ``min_change``.
+
+    Returns:
+        A list of :py:class:`Comparison` instances, one per benchmark and parameters recorded for both versions.
+    """
+    comparisons = []
+    for recorded_benchmark, params in store.benchmarks(candidate_version):
+        if benchmark is not None and recorded_benchmark != benchmark:
+            continue
+        baseline = store.samples(recorded_benchmark, params, baseline_version)
+        candidate = store.samples(recorded_benchmark, params, candidate_version)
+        if not baseline or not candidate:
+            continue
+
+        _, p_value = mann_whitney_u(baseline, candidate)
+        baseline_median, candidate_median = statistics.median(baseline), statistics.median(candidate)
+        change = (candidate_median - baseline_median) / baseline_median
+        comparisons.append(Comparison(recorded_benchmark, params, baseline_median, candidate_median, change, p_value,
+                                      regression=p_value <= alpha and change <= -min_change))
+    return comparisons
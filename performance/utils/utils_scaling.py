@@ -0,0 +1,143 @@
+# Copyright 2023 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing thread-scaling analysis of benchmarks parametrized by thread count
+import math
+import statistics
+from collections import namedtuple
+
+# Adding threads past the knee increases throughput by less than this fraction.
+DEFAULT_MIN_GAIN = 0.1
+
+ScalingPoint = namedtuple('ScalingPoint', ['threads', 'throughput', 'speedup', 'efficiency'])
+ScalingReport = namedtuple('ScalingReport', ['benchmark', 'params', 'points', 'amdahl_serial_fraction',
+                                             'usl_contention', 'usl_coherency', 'usl_peak_threads', 'knee_threads'])
+
+
+def _relative_capacity(points):
+    # USL and Amdahl are expressed relative to the single-threaded throughput; if it was not measured, it is
+    # extrapolated from the smallest thread count assuming linear scaling up to there.
+    base = points[0]
+    single_thread_throughput = base.throughput / base.threads
+    return [(point.threads, point.throughput / single_thread_throughput) for point in points]
+
+
+def fit_amdahl(points):
+    """Fits Amdahl's law to scaling points and returns the serial fraction of the workload."""
+    # n / C(n) - 1 = s * (n - 1), solved by least squares.
+    samples = [(n - 1, n / capacity - 1) for n, capacity in _relative_capacity(points) if n > 1]
+    denominator = sum(x * x for x, _ in samples)
+    if not denominator:
+        return None
+    return min(max(sum(x * y for x, y in samples) / denominator, 0.0), 1.0)
+
+
+def fit_usl(points):
+    """Fits the Universal Scalability Law to scaling points.
+
+    Returns:
+        A (contention, coherency) tuple, i.e. the sigma and kappa coefficients of the USL.
+    """
+    # n / C(n) - 1 = sigma * (n - 1) + kappa * n * (n - 1), solved by least squares without intercept.
+    samples = [(n - 1, n * (n - 1), n / capacity - 1) for n, capacity in _relative_capacity(points) if n > 1]
+    if not samples:
+        return None, None
+    s11 = sum(x1 * x1 for x1, _, _ in samples)
+    s12 = sum(x1 * x2 for x1, x2, _ in samples)
+    s22 = sum(x2 * x2 for _, x2, _ in samples)
+    s1y = sum(x1 * y for x1, _, y in samples)
+    s2y = sum(x2 * y for _, x2, y in samples)
+    determinant = s11 * s22 - s12 * s12
+    if determinant:
+        sigma = (s1y * s22 - s2y * s12) / determinant
+        kappa = (s2y * s11 - s1y * s12) / determinant
+        if sigma >= 0 and kappa >= 0:
+            return sigma, kappa
+    # With too few points or a negative coefficient, fall back to fitting a single coefficient.
+    if s2y > 0 and (not s11 or s1y <= 0):
+        return 0.0, s2y / s22
+    return max(s1y / s11, 0.0), 0.0
+
+
+def _knee(points, min_gain):
+    for point, next_point in zip(points, points[1:]):
+        if next_point.throughput < point.throughput * (1 + min_gain):
+            return point.threads
+    return points[-1].threads
+
+
+def scaling_report(benchmark, params, throughput_by_threads, min_gain=DEFAULT_MIN_GAIN):
+    """Computes speedup and parallel efficiency curves of a benchmark and fits Amdahl and USL models to them.
+
+    Args:
+        benchmark (:obj:`str`): Benchmark name.
+        params (:obj:`dict`): Parameters (other than the thread count) shared by the runs.
+        throughput_by_threads (:obj:`dict`): Throughput (records/sec) by thread count.
+        min_gain (:obj:`float`, optional): Relative throughput gain under which adding threads is not worth it, used to
+            determine the knee of the curve. Default: ``0.1``.
+
+    Returns:
+        A :py:class:`ScalingReport`. ``usl_peak_threads`` is the thread count for which the USL predicts the highest
+        throughput (``None`` if the model does not predict a peak), while ``knee_threads`` is the largest measured
+        thread count before adding more threads stopped increasing throughput by at least ``min_gain``.
+    """
+    thread_counts = sorted(throughput_by_threads)
+    base_threads = thread_counts[0]
+    base_throughput = throughput_by_threads[base_threads]
+    points = []
+    for threads in thread_counts:
+        speedup = throughput_by_threads[threads] / base_throughput
+        points.append(ScalingPoint(threads, throughput_by_threads[threads], speedup,
+                                   speedup * base_threads / threads))
+
+    sigma, kappa = fit_usl(points)
+    peak = math.sqrt((1 - sigma) / kappa) if kappa and sigma < 1 else None
+    return ScalingReport(benchmark, params, points, fit_amdahl(points), sigma, kappa, peak, _knee(points, min_gain))
+
+
+def scaling_reports(store, benchmark, sdc_version, min_gain=DEFAULT_MIN_GAIN):
+    """Builds a :py:class:`ScalingReport` for each set of parameters a benchmark was run with for at least two
+    different thread counts, using the median throughput recorded for each thread count.
+    """
+    groups = {}
+    for params, threads, samples in store.threads_samples(benchmark, sdc_version):
+        other_params = {name: value for name, value in params.items() if 'thread' not in name}
+        key = tuple(sorted((name, str(value)) for name, value in other_params.items()))
+        groups.setdefault(key, (other_params, {}))[1].setdefault(threads, []).extend(samples)
+
+    reports = []
+    for other_params, samples_by_threads in groups.values():
+        if len(samples_by_threads) < 2:
+            continue
+        throughput_by_threads = {threads: statistics.median(samples)
+                                 for threads, samples in samples_by_threads.items()}
+        reports.append(scaling_report(benchmark, other_params, throughput_by_threads, min_gain))
+    return reports
+
+
+def format_scaling_report(report):
+    """Renders a :py:class:`ScalingReport` as a human readable table."""
+    def _format(value, pattern):
+        return pattern.format(value) if value is not None else 'n/a'
+
+    lines = [f'Thread scaling of {report.benchmark} {report.params}',
+             f'{"threads":>8} {"records/sec":>14} {"speedup":>8} {"efficiency":>10}']
+    for point in report.points:
+        lines.append(f'{point.threads:>8} {point.throughput:>14.0f} {point.speedup:>8.2f} {point.efficiency:>10.0%}')
+    lines.append(f'Amdahl serial fraction: {_format(report.amdahl_serial_fraction, "{:.3f}")}, '
+                 f'USL contention: {_format(report.usl_contention, "{:.4f}")}, '
+                 f'USL coherency: {_format(report.usl_coherency, "{:.5f}")}, '
+                 f'USL peak: {_format(report.usl_peak_threads, "{:.1f}")} threads, '
+                 f'knee: {report.knee_threads} threads')
+    return '\n'.join(lines)
@@ -0,0 +1,209 @@
+# Copyright 2023 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing a TCP/UDP traffic generator for the TCP Server and UDP origins
+import asyncio
+import logging
+import resource
+import socket
+import struct
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+PROTOCOLS = ['TCP', 'UDP']
+
+DEFAULT_TICK = 0.01  # seconds
+# Messages sent later than this after their scheduled time are counted as late.
+DEFAULT_LATE_AFTER = 0.1  # seconds
+# Distinct messages generated up front and then cycled through, so that generating them does not limit the rate.
+MESSAGE_POOL_SIZE = 1_000
+# Buffered bytes above which a TCP connection is drained before more is written to it.
+WRITE_HIGH_WATER_MARK = 64 * 1024
+# TCP connections opened at once.
+CONNECT_BATCH_SIZE = 500
+
+NETFLOW_V5_RECORDS_PER_PACKET = 30
+COLLECTD_VALUES_PER_PACKET = 10
+
+MessageFormat = namedtuple('MessageFormat', ['build', 'records_per_message', 'protocols'])
+# started is the time.monotonic() time the first message was due, once every flow was opened.
+TrafficResult = namedtuple('TrafficResult', ['protocol', 'message_format', 'flows', 'started', 'duration',
+                                             'messages_sent', 'records_sent', 'late_messages', 'messages_per_second'])
+
+
+def syslog_message(i):
+    """Returns an RFC 5424 syslog message, newline terminated (non-transparent framing for TCP)."""
+    timestamp = datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+    return f'<34>1 {timestamp} benchmark-host benchmark {i % 65536} ID{i % 100} - message {i}\n'.encode()
+
+
+def delimited_message(i):
+    """Returns a newline-terminated delimited record."""
+    return f'{i},benchmark-host,{i % 100},message {i}\n'.encode()
+
+
+def _collectd_string_part(part_type, value):
+    encoded = value.encode() + b'\0'
+    return struct.pack('!HH', part_type, 4 + len(encoded)) + encoded
+
+
+def _collectd_numeric_part(part_type, value):
+    return struct.pack('!HHQ', part_type, 12, value)
+
+
+def collectd_packet(i, values=COLLECTD_VALUES_PER_PACKET):
+    """Returns a collectd binary protocol packet of ``values`` gauge value lists."""
+    parts = [_collectd_string_part(0x0000, 'benchmark-host'),
+             _collectd_numeric_part(0x0001, int(time.time())),
+             _collectd_numeric_part(0x0007, 10),
+             _collectd_string_part(0x0002, 'cpu'),
+             _collectd_string_part(0x0004, 'gauge')]
+    for value in range(values):
+        parts.append(_collectd_string_part(0x0003, str((i + value) % 64)))
+        # A single gauge (type 1), as a little-endian double.
+        parts.append(struct.pack('!HHHB', 0x0006, 15, 1, 1) + struct.pack('<d', float(i + value)))
+    return b''.join(parts)
+
+
+def netflow_v5_packet(i, records=NETFLOW_V5_RECORDS_PER_PACKET):
+    """Returns a NetFlow v5 export packet of ``records`` flow records."""
+    now = time.time()
+    header = struct.pack('!HHIIIIBBH', 5, records, int(now * 1000) & 0xFFFFFFFF, int(now), 0, i * records, 0, 0, 0)
+    flows = [struct.pack('!4s4s4sHHIIIIHHBBBBHHBBH',
+                         socket.inet_aton(f'10.0.{flow % 256}.{i % 256}'), socket.inet_aton('10.1.0.1'),
+                         socket.inet_aton('0.0.0.0'), 1, 2, 10, 1500, 0, 1000, 1024 + flow, 443, 0, 0x18, 6, 0,
+                         0, 0, 24, 24, 0)
+             for flow in range(records)]
+    return header + b''.join(flows)
+
+
+MESSAGE_FORMATS = {'DELIMITED': MessageFormat(delimited_message, 1, ('TCP', 'UDP')),
+                   'SYSLOG': MessageFormat(syslog_message, 1, ('TCP', 'UDP')),
+                   'COLLECTD': MessageFormat(collectd_packet, COLLECTD_VALUES_PER_PACKET, ('UDP',)),
+                   'NETFLOW': MessageFormat(netflow_v5_packet, NETFLOW_V5_RECORDS_PER_PACKET, ('UDP',))}
+
+
+class _UdpFlow(asyncio.DatagramProtocol):
+    def error_received(self, exc):
+        logger.debug('UDP send error: %s', exc)
+
+
+class TrafficGenerator:
+    """Sends messages to a TCP or UDP port at a fixed rate (open loop), spread over many concurrent flows: TCP
+    connections, or UDP sockets each with its own source port so that the origin's receiver threads share them.
+
+    Messages are sent in ticks: every ``tick`` seconds, the messages scheduled since the previous tick are written,
+    round-robin over the flows. TCP connections whose send buffer fills up are drained before more is written to
+    them, so that the generator slows down (and messages get late) rather than buffering without limit.
+
+    Args:
+        host (:obj:`str`): Host to send to.
+        port (:obj:`int`): Port to send to.
+        protocol (:obj:`str`, optional): ``'TCP'`` or ``'UDP'``. Default: ``'TCP'``.
+        message_format (:obj:`str`, optional): One of :py:const:`MESSAGE_FORMATS`. Default: ``'DELIMITED'``.
+        flows (:obj:`int`, optional): Number of TCP connections or UDP sockets. Default: ``1``.
+        tick (:obj:`float`, optional): Time between two sends, in seconds. Default: ``0.01``.
+        late_after (:obj:`float`, optional): Delay after which a message is late, in seconds. Default: ``0.1``.
+    """
+    def __init__(self, host, port, protocol='TCP', message_format='DELIMITED', flows=1, tick=DEFAULT_TICK,
+                 late_after=DEFAULT_LATE_AFTER):
+        if protocol not in PROTOCOLS:
+            raise ValueError(f'Invalid protocol: {protocol}. Valid protocols are: {", ".join(PROTOCOLS)}')
+        if message_format not in MESSAGE_FORMATS or protocol not in MESSAGE_FORMATS[message_format].protocols:
+            raise ValueError(f'Invalid message format for {protocol}: {message_format}. Valid formats are: '
+                             f'{", ".join(name for name, f in MESSAGE_FORMATS.items() if protocol in f.protocols)}')
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.message_format = message_format
+        self.flows = flows
+        self.tick = tick
+        self.late_after = late_after
+        self._messages = [MESSAGE_FORMATS[message_format].build(i) for i in range(MESSAGE_POOL_SIZE)]
+
+    async def _open_flows(self):
+        loop = asyncio.get_running_loop()
+        soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft_limit != resource.RLIM_INFINITY and soft_limit < self.flows + 100:
+            # Thousands of connections need more file descriptors than the usual default of 1024.
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard_limit, hard_limit))
+        if self.protocol == 'TCP':
+            # Connections are opened in bounded groups, as the origin's accept backlog is limited.
+            flows = []
+            while len(flows) < self.flows:
+                connections = min(CONNECT_BATCH_SIZE, self.flows - len(flows))
+                flows.extend(writer for _, writer in await asyncio.gather(
+                    *(asyncio.open_connection(self.host, self.port) for _ in range(connections))))
+            return flows
+        return [transport for transport, _ in await asyncio.gather(
+            *(loop.create_datagram_endpoint(_UdpFlow, remote_addr=(self.host, self.port)) for _ in range(self.flows)))]
+
+    async def _run(self, rate, duration):
+        flows = await self._open_flows()
+        logger.info('Opened %s %s flow(s) to %s:%s', len(flows), self.protocol, self.host, self.port)
+        sent = late = 0
+        start = time.monotonic()
+        try:
+            while True:
+                elapsed = time.monotonic() - start
+                due = min(int(elapsed * rate), int(duration * rate)) - sent
+                # Messages scheduled more than late_after ago.
+                late += max(0, min(due, int((elapsed - self.late_after) * rate) - sent))
+                for message in range(sent, sent + due):
+                    flow = flows[message % len(flows)]
+                    data = self._messages[message % MESSAGE_POOL_SIZE]
+                    if self.protocol == 'TCP':
+                        flow.write(data)
+                    else:
+                        flow.sendto(data)
+                sent += due
+                if self.protocol == 'TCP':
+                    full = [flow for flow in flows if flow.transport.get_write_buffer_size() > WRITE_HIGH_WATER_MARK]
+                    if full:
+                        await asyncio.gather(*(flow.drain() for flow in full))
+                if sent >= int(duration * rate):
+                    break
+                await asyncio.sleep(max(0.0, start + (int(elapsed / self.tick) + 1) * self.tick - time.monotonic()))
+            if self.protocol == 'TCP':
+                await asyncio.gather(*(flow.drain() for flow in flows))
+            send_duration = time.monotonic() - start
+        finally:
+            for flow in flows:
+                flow.close()
+        return start, sent, late, send_duration
+
+    def run(self, rate, duration):
+        """Sends ``rate`` messages per second for ``duration`` seconds, once all flows are open.
+
+        Returns:
+            A :py:class:`TrafficResult`, whose ``started`` time excludes opening the flows (e.g. connecting
+            thousands of TCP connections).
+        """
+        started, sent, late, send_duration = asyncio.run(self._run(rate, duration))
+        result = TrafficResult(protocol=self.protocol,
+                               message_format=self.message_format,
+                               flows=self.flows,
+                               started=started,
+                               duration=send_duration,
+                               messages_sent=sent,
+                               records_sent=sent * MESSAGE_FORMATS[self.message_format].records_per_message,
+                               late_messages=late,
+                               messages_per_second=sent / send_duration)
+        logger.info('Sent %s %s message(s) (%s records) over %s %s flow(s) in %.1f s (%.0f messages/sec), %s late',
+                    result.messages_sent, self.message_format, result.records_sent, self.flows, self.protocol,
+                    result.duration, result.messages_per_second, result.late_messages)
+        return result
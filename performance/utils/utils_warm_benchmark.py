@@ -0,0 +1,88 @@
+# Copyright 2023 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing a benchmark mode that reuses a single imported pipeline across parameter sets
+import logging
+import time
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 1800  # seconds
+
+WarmBenchmarkResult = namedtuple('WarmBenchmarkResult', ['runtime_parameters', 'record_count', 'durations',
+                                                         'records_per_second'])
+
+
+class WarmPipelineBenchmark:
+    """Benchmarks a pipeline template imported once into a running SDC.
+
+    The template references pipeline parameters (e.g. ``number_of_threads='${THREADS}'``) for everything that varies
+    between benchmark cases, so that each case only needs to reset the origin offset and start the pipeline with other
+    runtime parameters, rather than building, importing, validating and removing a pipeline of its own.  Warming up
+    the JVM once before the first measurement keeps JIT compilation out of the measured runs.
+
+    Args:
+        sdc_executor: STF Data Collector.
+        pipeline: Pipeline template with its parameters (and their default values) added.
+        warmup_record_count (:obj:`int`, optional): Number of records to process before the first measurement, with the
+            default parameter values. ``0`` disables the warm-up. Default: ``0``.
+        timeout_sec (:obj:`int`, optional): Timeout of each run. Default: ``1800``.
+    """
+    def __init__(self, sdc_executor, pipeline, warmup_record_count=0, timeout_sec=DEFAULT_TIMEOUT):
+        self._sdc_executor = sdc_executor
+        self.pipeline = pipeline
+        self._warmup_record_count = warmup_record_count
+        self._timeout_sec = timeout_sec
+        self._added = False
+        self._warmed_up = False
+
+    def _run_once(self, record_count, runtime_parameters):
+        self._sdc_executor.reset_origin(self.pipeline)
+        start = time.time()
+        try:
+            (self._sdc_executor.start_pipeline(self.pipeline, runtime_parameters)
+                               .wait_for_pipeline_output_records_count(record_count, timeout_sec=self._timeout_sec))
+            return time.time() - start
+        finally:
+            self._sdc_executor.stop_pipeline(self.pipeline)
+
+    def add(self):
+        if not self._added:
+            self._sdc_executor.add_pipeline(self.pipeline)
+            self._added = True
+        if self._warmup_record_count and not self._warmed_up:
+            logger.info('Warming up with %s records of pipeline %s ...', self._warmup_record_count, self.pipeline.id)
+            self._run_once(self._warmup_record_count, {})
+            self._warmed_up = True
+        return self
+
+    def run(self, record_count, runs=1, **runtime_parameters):
+        """Runs the pipeline ``runs`` times with the given runtime parameters, resetting the origin before each run.
+
+        Returns:
+            A :py:class:`WarmBenchmarkResult`.
+        """
+        self.add()
+        durations = [self._run_once(record_count, runtime_parameters) for _ in range(runs)]
+        result = WarmBenchmarkResult(runtime_parameters, record_count, durations,
+                                     [record_count / duration for duration in durations])
+        logger.info('Pipeline %s with %s: %s records/sec', self.pipeline.id, runtime_parameters,
+                    ', '.join(f'{throughput:.0f}' for throughput in result.records_per_second))
+        return result
+
+    def remove(self):
+        if self._added:
+            self._sdc_executor.remove_pipeline(self.pipeline)
+            self._added = False
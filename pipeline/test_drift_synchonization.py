@@ -15,7 +15,6 @@
 import json
 import logging
 import string
-import time
 import uuid
 from collections import OrderedDict
 from datetime import datetime
@@ -31,6 +30,8 @@ from streamsets.testframework.environments.hortonworks import AmbariCluster
 from streamsets.testframework.markers import database, cluster, sdc_min_version
 from streamsets.testframework.utils import get_random_string, Version
 
+from stage.utils.utils_wait import Condition, wait_until
+
 logger = logging.getLogger(__name__)
 
 
@@ -1788,11 +1789,14 @@ def test_native_parquet_timestamps(sdc_builder, sdc_executor, cluster):
     hive_cursor = cluster.hive.client.cursor()
     try:
         sdc_executor.start_pipeline(pipeline).wait_for_finished()
-        # Need to wait for 45 seconds until mapreduce jobs are finished.
-        time.sleep(120)
-        hive_cursor.execute('RELOAD {0}'.format(_get_qualified_table_name(None, table_name)))
-        hive_cursor.execute('SELECT * from {0}'.format(_get_qualified_table_name(None, table_name)))
-        hive_values = [list(row) for row in hive_cursor.fetchall()]
+
+        # The MapReduce jobs converting the files to Parquet run after the pipeline finished.
+        def hive_rows():
+            hive_cursor.execute('RELOAD {0}'.format(_get_qualified_table_name(None, table_name)))
+            hive_cursor.execute('SELECT * from {0}'.format(_get_qualified_table_name(None, table_name)))
+            return [list(row) for row in hive_cursor.fetchall()]
+        hive_values = wait_until(Condition(hive_rows, lambda rows: len(rows) >= len(raw_data), 'rows in Hive table'),
+                                 timeout_sec=300)
 
         def split_date_time_string(datetime_str):
             v = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S')
@@ -25,6 +25,9 @@ from streamsets.sdk.utils import Version
 from streamsets.testframework.utils import get_random_string
 from streamsets.testframework.markers import database, sdc_min_version
 
+from stage.utils.utils_pipeline_template import pipeline_templates
+from stage.utils.utils_table_diff import assert_tables_equal
+
 logger = logging.getLogger(__name__)
 
 
@@ -49,18 +52,8 @@ def assert_tables_replicated(database=None, src_tables=None):
         target_table_name = re.sub(SRC_TABLE_PREFIX, TGT_TABLE_PREFIX, src_table_info.name, 1)
         logger.info('Comparing Source Table : %s and Target Table : %s', src_table_info.name, target_table_name)
 
-        src_table = sqlalchemy.Table(src_table_info.name, sqlalchemy.MetaData(), autoload=True, autoload_with=db_engine)
-        src_result = db_engine.execute(src_table.select().order_by(src_table.c[FIRST_COLUMN]))
-        src_result_list = src_result.fetchall()
-        src_result.close()
-
-        target_table = sqlalchemy.Table(target_table_name, sqlalchemy.MetaData(),
-                                        autoload=True, autoload_with=db_engine)
-        target_result = db_engine.execute(target_table.select().order_by(target_table.c[FIRST_COLUMN]))
-        target_result_list = target_result.fetchall()
-        target_result.close()
-
-        assert src_result_list == target_result_list
+        # Both tables are streamed in key order and compared chunk by chunk, after comparing checksums of key ranges.
+        assert_tables_equal(db_engine, src_table_info.name, target_table_name, key=FIRST_COLUMN, checksum_ranges=16)
 
 def setup_tables(database, src_tables, target_tables, event_table_name):
     """Creates source, target and event tables, inserts rows to the source table and
@@ -110,6 +103,35 @@ def teardown_tables(database, table_names):
 def get_name(val):
     return val
 
+
+def _build_multitable_to_jdbc_pipeline(pipeline_builder, database, sdc_version):
+    """Builds jdbc_multitable_consumer >> jdbc_query_dest, jdbc_multitable_consumer >= finisher."""
+    jdbc_multitable_consumer = pipeline_builder.add_stage('JDBC Multitable Consumer')
+
+    # The target used to replicate is JDBCQueryExecutor.
+    # After SDC-5757 is resolved, we can use JDBCProducer.
+    jdbc_query_dest = pipeline_builder.add_stage('JDBC Query', type='executor')
+    table_name = (f"${{str:replace(record:attribute('jdbc.tables'),"
+                  f"'{SRC_TABLE_PREFIX if not database.type == 'Oracle' else SRC_TABLE_PREFIX.upper()}',"
+                  f"'{TGT_TABLE_PREFIX}')}}")
+    query = (f"INSERT into {table_name} values "
+             f"(${{record:value('/{FIRST_COLUMN if not database.type == 'Oracle' else FIRST_COLUMN.upper()}')}}"
+             f", '${{record:value('/{OTHER_COLUMN if not database.type == 'Oracle' else OTHER_COLUMN.upper()}')}}')")
+
+    if Version(sdc_version) < Version('3.14.0'):
+        jdbc_query_dest.set_attributes(sql_query=query)
+    else:
+        jdbc_query_dest.set_attributes(sql_queries=[query])
+
+    finisher = pipeline_builder.add_stage('Pipeline Finisher Executor')
+    finisher.set_attributes(stage_record_preconditions=["${record:eventType() == 'no-more-data'}"])
+
+    jdbc_multitable_consumer >> jdbc_query_dest
+    jdbc_multitable_consumer >= finisher
+
+    return pipeline_builder.build()
+
+
 @database
 # lowercase for db compatibility (e.g. PostgreSQL)
 @pytest.mark.parametrize('threads', [1, 5])
@@ -141,53 +163,34 @@ def test_jdbc_multitable_consumer_to_jdbc(sdc_builder, sdc_executor, database,
     event_table_name = get_random_string(string.ascii_lowercase, 10)
     update_event_table_statement = f'UPDATE {event_table_name} set {EVENT_COLUMN_NAME} = 1'
 
-    pipeline_builder = sdc_builder.get_pipeline_builder()
-
-    jdbc_multitable_consumer = pipeline_builder.add_stage('JDBC Multitable Consumer')
-
     table_configs = [{'tablePattern': f'{SRC_TABLE_PREFIX}%',
                       'partitioningMode': partitioning_mode,
                       'partitionSize': PARTITION_SIZE}]
     if Version(sdc_builder.version) >= Version('3.0.0.0'):
         table_configs[0]['enableNonIncremental'] = non_incremental
-    jdbc_multitable_consumer.set_attributes(number_of_threads=threads,
-                                            per_batch_strategy=per_batch_strategy,
-                                            maximum_pool_size=threads,
-                                            minimum_idle_connections=threads,
-                                            table_configs=table_configs)
+    consumer_attributes = dict(number_of_threads=threads,
+                               per_batch_strategy=per_batch_strategy,
+                               maximum_pool_size=threads,
+                               minimum_idle_connections=threads,
+                               table_configs=table_configs)
 
     if per_batch_strategy == 'SWITCH_TABLES' and Version(sdc_builder.version) >= Version('5.4.0'):
         # set number of tables to -1 for unlimited no. of tables to read from if Per Batch Strategy is set to
         # Switch Tables to avoid getting the error 'JDBC_205 - Reached maximum number of tables to read from'
-        jdbc_multitable_consumer.maximum_number_of_tables = -1
+        consumer_attributes['maximum_number_of_tables'] = -1
 
     if partitioning_mode == 'BEST_EFFORT' and Version(sdc_builder.version) < Version('3.0.0.0'):
         # pipeline upgraded across 3.0 boundary with partitioning; default resulting queriesPerSecond will be
         # unacceptably slow for partitioning, so set query interval to 0 instead
-        jdbc_multitable_consumer.query_interval = 0
-
-    # The target used to replicate is JDBCQueryExecutor.
-    # After SDC-5757 is resolved, we can use JDBCProducer.
-    jdbc_query_dest = pipeline_builder.add_stage('JDBC Query', type='executor')
-    table_name = (f"${{str:replace(record:attribute('jdbc.tables'),"
-                  f"'{SRC_TABLE_PREFIX if not database.type == 'Oracle' else SRC_TABLE_PREFIX.upper()}',"
-                  f"'{TGT_TABLE_PREFIX}')}}")
-    query = (f"INSERT into {table_name} values "
-             f"(${{record:value('/{FIRST_COLUMN if not database.type == 'Oracle' else FIRST_COLUMN.upper()}')}}"
-             f", '${{record:value('/{OTHER_COLUMN if not database.type == 'Oracle' else OTHER_COLUMN.upper()}')}}')")
-
-    if Version(sdc_builder.version) < Version('3.14.0'):
-        jdbc_query_dest.set_attributes(sql_query=query)
-    else:
-        jdbc_query_dest.set_attributes(sql_queries=[query])
-
-    finisher = pipeline_builder.add_stage('Pipeline Finisher Executor')
-    finisher.set_attributes(stage_record_preconditions=["${record:eventType() == 'no-more-data'}"])
-
-    jdbc_multitable_consumer >> jdbc_query_dest
-    jdbc_multitable_consumer >= finisher
-
-    pipeline = pipeline_builder.build().configure_for_environment(database)
+        consumer_attributes['query_interval'] = 0
+
+    # The pipeline structure is the same for all parameters, so it is only built once per database type; each case
+    # gets a copy with its own consumer attributes.
+    pipeline = pipeline_templates.get(sdc_builder, ('jdbc_multitable_consumer_to_jdbc', database.type),
+                                      lambda pipeline_builder: _build_multitable_to_jdbc_pipeline(
+                                          pipeline_builder, database, sdc_builder.version),
+                                      stage_attributes={'JDBC Multitable Consumer': consumer_attributes})
+    pipeline.configure_for_environment(database)
     sdc_executor.add_pipeline(pipeline)
 
     # Generate random table names.
@@ -0,0 +1,243 @@
+# Copyright 2021 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A pool of Data Collectors shared by the test modules of a session. Modules whose sdc_common_hook/sdc_executor_hook
+# fixtures set SDC up the same way (same stage libs, JVM options, sdc.properties, ...) reuse the same running Data
+# Collector, which is reset between modules, instead of starting a fresh one. Enabled with --sdc-pool.
+
+import logging
+
+import pytest
+from streamsets.sdk import ControlHub
+from streamsets.testframework.sdc import DataCollector
+from streamsets.testframework.sdc_models import CustomLib, DataProtectorStageLib, EnterpriseLib
+from streamsets.testframework.utils import get_stf_env_vars, parse_multi_versions, parse_version_git_hash
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_HOOK_FIXTURES = ('sdc_common_hook', 'sdc_executor_hook')
+# Environments a Data Collector is configured for when a test module uses them, as the stock sdc_executor does.
+ENVIRONMENT_FIXTURES = ('aws', 'cluster', 'database', 'elasticsearch', 'gcp', 'salesforce')
+# Methods of a Data Collector which hooks may call to set it up, besides add_stage_lib.
+RECORDED_METHODS = ('add_user', 'set_user')
+
+# Data Collectors kept running at most; the least recently used one is torn down to make room for another.
+DEFAULT_POOL_SIZE = 4
+
+
+class _RecordingDataCollector:
+    """Stands in for a Data Collector when running a hook, to record how the hook sets it up."""
+    def __init__(self, version):
+        self.version = version
+        self.stage_libs = set()
+        self.sdc_properties = {}
+        self.docker_env_vars = {}
+        self.SDC_JAVA_OPTS = None
+        self.calls = []
+
+    def add_stage_lib(self, *stage_libs):
+        self.stage_libs.update(stage_libs)
+
+    def __getattr__(self, name):
+        # Known set-up methods are recorded along with their arguments. Anything else may change the Data Collector in
+        # a way the key would miss, so it is refused rather than silently ignored.
+        if name not in RECORDED_METHODS:
+            raise AttributeError(f'{name!r} is not supported in hooks with --sdc-pool; '
+                                 f'supported methods are add_stage_lib and {", ".join(RECORDED_METHODS)}')
+
+        def record(*args, **kwargs):
+            self.calls.append((name, repr(args), repr(sorted(kwargs.items()))))
+        return record
+
+    def key(self):
+        java_opts = ' '.join(sorted((self.SDC_JAVA_OPTS or '').split()))
+        return (self.version,
+                tuple(sorted(self.stage_libs)),
+                java_opts,
+                tuple(sorted((str(name), str(value)) for name, value in self.sdc_properties.items())),
+                tuple(sorted((str(name), str(value)) for name, value in self.docker_env_vars.items())),
+                tuple(self.calls))
+
+
+def configuration_key(hooks, version, environments=()):
+    """Get the normalized configuration a Data Collector gets from hooks.
+
+    Args:
+        hooks (:obj:`list`): Hook functions, each taking a Data Collector.
+        version (:obj:`str`): Data Collector version.
+        environments (:obj:`list`, optional): Names of the environment fixtures the Data Collector is configured for.
+            Default: ``()``
+
+    Returns:
+        A hashable :obj:`tuple` of the version, environments, stage libs, JVM options, sdc.properties, Docker
+        environment variables and other calls made by the hooks. Stage libs, JVM options and properties are sorted.
+    """
+    recorder = _RecordingDataCollector(version)
+    for hook in hooks:
+        hook(recorder)
+    return (tuple(sorted(environments)),) + recorder.key()
+
+
+def new_data_collector(args, version, git_hash):
+    """Create a Data Collector set up from the STF command-line arguments, the way the stock ``sdc_executor`` fixture
+    (and ``stf start sdc``) does: Docker and authentication settings, sdc.properties, Java heap size and stage libs.
+
+    Args:
+        args (:py:class:`argparse.Namespace`): STF command-line arguments, i.e. the ``args`` fixture.
+        version (:obj:`str`): Data Collector version.
+        git_hash (:obj:`str`): Git hash of the Data Collector build, if any.
+
+    Returns:
+        A :py:class:`streamsets.testframework.sdc.DataCollector`, not started yet.
+    """
+    control_hub = None
+    if getattr(args, 'sch_credential_id', None) and getattr(args, 'sch_token', None):
+        control_hub = ControlHub(credential_id=args.sch_credential_id,
+                                 token=args.sch_token,
+                                 use_websocket_tunneling=not args.sch_dont_use_websocket_tunneling,
+                                 aster_url=args.aster_server_url)
+    data_collector = DataCollector(version=version,
+                                   git_hash=git_hash,
+                                   always_pull=getattr(args, 'always_pull', False),
+                                   aster_authentication_token=getattr(args, 'aster_authentication_token', None),
+                                   aster_server_url=getattr(args, 'aster_server_url', None),
+                                   authentication_method=getattr(args, 'sdc_authentication_method', None),
+                                   https=getattr(args, 'https', None),
+                                   network=getattr(args, 'docker_network', None),
+                                   control_hub=control_hub,
+                                   hostname=getattr(args, 'hostname', None),
+                                   enable_base_http_url=getattr(args, 'enable_base_http_url', None),
+                                   tear_down_on_exit=True)
+    data_collector.docker_env_vars.update(get_stf_env_vars())
+
+    data_collector._skip_default_stage_libs = bool(getattr(args, 'skip_default_stage_libs', False))
+    for property_ in getattr(args, 'sdc_property', None) or []:
+        key, value = property_.split('=', 1)
+        if key not in data_collector.sdc_properties:
+            logger.warning('Could not find property %s in sdc.properties. Ignoring ...', key)
+        else:
+            data_collector.sdc_properties[key] = value
+    java_heap_size = getattr(args, 'java_heap_size', None)
+    if java_heap_size:
+        data_collector.SDC_JAVA_OPTS = f'-Xmx{java_heap_size} -Xms{java_heap_size}'
+    if control_hub:
+        data_collector.enable_control_hub()
+
+    if getattr(args, 'stage_lib', None):
+        data_collector.add_stage_lib(*[f'streamsets-datacollector-{lib}-lib' for lib in args.stage_lib])
+    if getattr(args, 'custom_stage_lib', None):
+        data_collector.add_stage_lib(*[CustomLib(f"streamsets-datacollector-{lib.split(',')[0]}-lib",
+                                                 lib.split(',')[1])
+                                       for lib in args.custom_stage_lib])
+    if getattr(args, 'enterprise_stage_lib', None):
+        data_collector.add_stage_lib(*[EnterpriseLib(f"streamsets-datacollector-{lib.split(',')[0]}-lib",
+                                                     lib.split(',')[1])
+                                       for lib in args.enterprise_stage_lib])
+    if getattr(args, 'sdp_stage_lib_version', None):
+        data_collector.add_stage_lib(DataProtectorStageLib('streamsets-datacollector-dataprotector-lib',
+                                                           args.sdp_stage_lib_version))
+    return data_collector
+
+
+def reset_data_collector(data_collector):
+    """Get a Data Collector back to a clean state: all pipelines are stopped and removed, along with their offsets."""
+    for pipeline in list(data_collector.pipelines):
+        status = data_collector.get_pipeline_status(pipeline).response.json().get('status')
+        if status in ('RUNNING', 'STARTING', 'RETRY'):
+            data_collector.stop_pipeline(pipeline, force=True)
+        data_collector.remove_pipeline(pipeline)
+
+
+class SdcPool:
+    """Running Data Collectors by configuration key (see :py:func:`configuration_key`).
+
+    Args:
+        version (:obj:`str`): Data Collector version, possibly with a ``git:<hash>`` suffix.
+        size (:obj:`int`, optional): Maximum number of running Data Collectors. Default: :py:const:`DEFAULT_POOL_SIZE`
+    """
+    def __init__(self, version, size=DEFAULT_POOL_SIZE):
+        self.version, self.git_hash = parse_version_git_hash(version)
+        self.size = size
+        self._data_collectors = {}
+
+    def acquire(self, args, hooks, environments=None):
+        """Get a running Data Collector set up by hooks, reusing a pooled one if any was set up the same way.
+
+        Args:
+            args (:py:class:`argparse.Namespace`): STF command-line arguments, used to create Data Collectors.
+            hooks (:obj:`list`): Hook functions, each taking a Data Collector.
+            environments (:obj:`dict`, optional): Environments to configure the Data Collector for, by fixture name.
+                Default: ``None``
+
+        Returns:
+            A started :py:class:`streamsets.testframework.sdc.DataCollector`.
+        """
+        environments = environments or {}
+        key = configuration_key(hooks, self.version, environments)
+        data_collector = self._data_collectors.pop(key, None)
+        if data_collector is not None:
+            logger.info('Reusing Data Collector %s', data_collector.server_url)
+            reset_data_collector(data_collector)
+        else:
+            while len(self._data_collectors) >= self.size:
+                self._tear_down(self._data_collectors.pop(next(iter(self._data_collectors))))
+            data_collector = new_data_collector(args, self.version, self.git_hash)
+            data_collector.__enter__()
+            for environment in environments.values():
+                data_collector.configure_for_environment(environment)
+            for hook in hooks:
+                hook(data_collector)
+            logger.info('Starting pooled Data Collector (%s pooled)', len(self._data_collectors))
+            data_collector.start()
+        # Most recently used last.
+        self._data_collectors[key] = data_collector
+        return data_collector
+
+    @staticmethod
+    def _tear_down(data_collector):
+        try:
+            data_collector.__exit__(None, None, None)
+        except Exception as e:
+            logger.warning('Error while tearing down Data Collector: %s', e)
+
+    def close(self):
+        """Tear down all pooled Data Collectors."""
+        while self._data_collectors:
+            self._tear_down(self._data_collectors.popitem()[1])
+
+
+class SdcPoolPlugin:
+    """Plugin overriding the ``sdc_executor`` fixture with Data Collectors from a session-wide :py:class:`SdcPool`."""
+    def __init__(self, config):
+        versions = parse_multi_versions(config.getoption('sdc_version'))
+        if versions.pre_upgrade_version:
+            raise pytest.UsageError('--sdc-pool cannot be used for upgrade tests')
+        self.pool = SdcPool(versions.version, size=config.getoption('sdc_pool_size'))
+
+    @pytest.fixture(scope='module')
+    def sdc_executor(self, request):
+        hooks = []
+        for name in EXECUTOR_HOOK_FIXTURES:
+            try:
+                hooks.append(request.getfixturevalue(name))
+            except pytest.FixtureLookupError:
+                pass
+        # Environments used by any test of the module, all of which share this Data Collector.
+        fixture_names = {name for item in request.session.items if item.module is request.module
+                         for name in item.fixturenames}
+        environments = {name: request.getfixturevalue(name) for name in ENVIRONMENT_FIXTURES if name in fixture_names}
+        return self.pool.acquire(request.getfixturevalue('args'), [hook for hook in hooks if hook], environments)
+
+    def pytest_sessionfinish(self, session):
+        self.pool.close()
@@ -1,21 +1,48 @@
 import csv
 import io
-import textwrap
+import os
 
 import pytest
 from streamsets.sdk.models import Configuration
 
-FILE_WRITER_SCRIPT = """
-    file_contents = '''{file_contents}'''
-    for record in records:
-        with open('{filepath}', 'w') as f:
-            f.write(file_contents.decode('utf8').encode('{encoding}'))
-"""
+from ..utils.utils_file_writer import FileWriter, write_file_with_pipeline
+from ..utils.utils_stub_index import StubIndex
+
+CONFIGURATION_TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Paths relative to this directory that pytest does not collect. Stub-only modules are added to it by pytest_configure
+# when running with --skip-stubs, so they are never imported.
+collect_ignore = []
+
+
+def pytest_configure(config):
+    if not config.getoption('skip_stubs', default=False):
+        return
+    # Most tests in this directory are @stub placeholders generated from stage definitions.  Which ones they are is
+    # found by parsing the modules, which is cached across sessions (see utils_stub_index).
+    config._stub_index = StubIndex()
+    collect_ignore.extend(config._stub_index.stub_only_modules(CONFIGURATION_TESTS_DIR))
+    config._stub_index.save()
+
+
+def pytest_collection_modifyitems(config, items):
+    stub_index = getattr(config, '_stub_index', None)
+    if stub_index is None:
+        return
+    selected, deselected = [], []
+    for item in items:
+        module_path = getattr(getattr(item, 'module', None), '__file__', None)
+        if module_path and os.path.dirname(os.path.abspath(module_path)) == CONFIGURATION_TESTS_DIR:
+            test_name = getattr(item, 'originalname', None) or item.name.split('[')[0]
+            if test_name in stub_index.stubs(module_path):
+                deselected.append(item)
+                continue
+        selected.append(item)
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+    stub_index.save()
 
-FILE_WRITER_SCRIPT_BINARY = """
-    with open('{filepath}', 'wb') as f:
-        f.write({file_contents})
-"""
 
 @pytest.fixture(scope='module')
 def sdc_common_hook():
@@ -33,10 +60,11 @@ def file_writer(sdc_executor):
         file_contents (:obj:`str`): The file contents.
         encoding (:obj:`str`, optional): The file encoding. Default: ``'utf8'``
         file_data_type (:obj:`str`, optional): The file which type of data containing . Default: ``'NOT_BINARY'``
+
+    Files can also be written many at a time with one pipeline, using ``file_writer.write_many(files)`` or by
+    writing them inside a ``with file_writer.batch():`` block.
     """
-    def file_writer_(filepath, file_contents, encoding='utf8', file_data_type='NOT_BINARY'):
-        write_file_with_pipeline(sdc_executor, filepath, file_contents, encoding, file_data_type)
-    return file_writer_
+    return FileWriter(sdc_executor)
 
 
 @pytest.fixture
@@ -60,25 +88,6 @@ def shell_executor(sdc_executor):
     return shell_executor_
 
 
-def write_file_with_pipeline(sdc_executor, filepath, file_contents, encoding='utf8', file_data_type='NOT_BINARY'):
-    builder = sdc_executor.get_pipeline_builder()
-    dev_raw_data_source = builder.add_stage('Dev Raw Data Source')
-    dev_raw_data_source.set_attributes(data_format='TEXT', raw_data='noop', stop_after_first_batch=True)
-    jython_evaluator = builder.add_stage('Jython Evaluator')
-
-    file_writer_script = FILE_WRITER_SCRIPT_BINARY if file_data_type == 'BINARY' else FILE_WRITER_SCRIPT
-    jython_evaluator.script = textwrap.dedent(file_writer_script).format(filepath=str(filepath),
-                                                                         file_contents=file_contents,
-                                                                         encoding=encoding)
-    trash = builder.add_stage('Trash')
-    dev_raw_data_source >> jython_evaluator >> trash
-    pipeline = builder.build('File writer pipeline')
-
-    sdc_executor.add_pipeline(pipeline)
-    sdc_executor.start_pipeline(pipeline).wait_for_finished()
-    sdc_executor.remove_pipeline(pipeline)
-
-
 @pytest.fixture
 def delimited_file_writer(sdc_executor):
     def delimited_file_writer_(filepath, file_contents_list, delimiter_format, delimiter_character, encoding='utf8',
@@ -261,8 +261,9 @@ def test_directory_origin_configuration_batch_size_in_recs(sdc_builder, sdc_exec
     try:
         logger.debug('Creating files directory %s ...', files_directory)
         shell_executor(f'mkdir {files_directory}')
-        file_writer(os.path.join(files_directory, FILE_NAME_1), FILE_CONTENTS_1)
-        file_writer(os.path.join(files_directory, FILE_NAME_2), FILE_CONTENTS_2)
+        with file_writer.batch():
+            file_writer(os.path.join(files_directory, FILE_NAME_1), FILE_CONTENTS_1)
+            file_writer(os.path.join(files_directory, FILE_NAME_2), FILE_CONTENTS_2)
 
         pipeline_builder = sdc_builder.get_pipeline_builder()
         directory = pipeline_builder.add_stage('Directory')
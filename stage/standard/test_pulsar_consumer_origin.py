@@ -21,6 +21,8 @@ from streamsets.testframework.decorators import stub
 from streamsets.testframework.markers import pulsar
 from streamsets.testframework.utils import get_random_string
 
+from ..utils.utils_wiretap import StreamingWiretap
+
 logger = logging.getLogger(__name__)
 
 # Topics are URLs so we have to respect URL specs
@@ -306,7 +308,9 @@ def test_multiple_batch(sdc_builder, sdc_executor, pulsar, keep_data):
     consumer.consumer_name = get_random_string()
     consumer.initial_offset = 'EARLIEST'
 
-    wiretap = builder.add_wiretap()
+    # Records are written on SDC and read back as raw JSON, and counted there to stop the pipeline as soon as they all
+    # were written.
+    wiretap = StreamingWiretap(sdc_executor, builder)
 
     consumer >> wiretap.destination
 
@@ -325,13 +329,14 @@ def test_multiple_batch(sdc_builder, sdc_executor, pulsar, keep_data):
 
         sdc_executor.start_pipeline(pipeline)
 
-        sdc_executor.wait_for_pipeline_metric(pipeline, 'input_record_count', message_count, timeout_sec=60)
+        wiretap.wait_for_count(message_count, timeout_sec=60)
         sdc_executor.stop_pipeline(pipeline)
 
         records = [record.field['text'] for record in wiretap.output_records]
         assert len(records) == message_count
-        assert all(element in total_data for element in records)
+        assert set(records) <= set(total_data)
     finally:
+        wiretap.remove()
         if not keep_data:
             producer.close()
             client.close()
@@ -27,6 +27,7 @@ from streamsets.testframework.utils import get_random_string, Version
 from xlwt import Workbook
 
 from .utils.utils_aws import configure_stage_for_anonymous, create_bucket
+from .utils.utils_object_store import S3ObjectStore, put_objects
 
 logger = logging.getLogger(__name__)
 
@@ -96,8 +97,9 @@ def test_s3_origin_multithread_start_stop(sdc_builder, sdc_executor, aws):
         for iteration in range(1, 4):
             wiretap.reset()
             # Insert objects into S3.
-            for i in range(s3_obj_count):
-                client.put_object(Bucket=aws.s3_bucket_name, Key=f'{s3_key}/{iteration}-{i}', Body=json.dumps(data))
+            result = put_objects(S3ObjectStore(client, aws.s3_bucket_name),
+                                 ((f'{s3_key}/{iteration}-{i}', json.dumps(data)) for i in range(s3_obj_count)))
+            assert not result.failures
 
             # In case of multithreaded pipeline we want to verify the amount of records.
             sdc_executor.start_pipeline(s3_origin_pipeline).wait_for_finished()
@@ -253,8 +255,9 @@ def base_s3_origin(sdc_builder, sdc_executor, aws, read_order, data_format, numb
         acl = 'public-read' if anonymous else 'private'
 
         # Insert objects into S3.
-        for i in range(s3_obj_count):
-            client.put_object(Bucket=s3_bucket, Key=f'{s3_key}/{i}', Body=json.dumps(json_data), ACL=acl)
+        result = put_objects(S3ObjectStore(client, s3_bucket, ACL=acl),
+                             ((f'{s3_key}/{i}', json.dumps(json_data)) for i in range(s3_obj_count)))
+        assert not result.failures
 
         if number_of_threads == SINGLETHREADED:
             sdc_executor.start_pipeline(s3_origin_pipeline).wait_for_finished()
@@ -16,11 +16,11 @@ import logging
 import pytest
 import os
 import io
-import textwrap
 from xlwt import Workbook
 
 from streamsets.testframework.markers import sdc_min_version
 from streamsets.testframework.utils import get_random_string
+from stage.utils.utils_file_writer import write_file_with_pipeline
 from stage.utils.utils_xml import get_xml_output_field
 
 logger = logging.getLogger(__name__)
@@ -350,28 +350,7 @@ def test_excel_dataformats_headers(sdc_builder, sdc_executor, header_data_type,
 
 
 def file_writer(sdc_executor, file_path, file_contents):
-    encoding = 'utf8'
-    FILE_WRITER_SCRIPT_BINARY = """
-        with open('{filepath}', 'wb') as f:
-            f.write({file_contents})
-    """
-
-    builder = sdc_executor.get_pipeline_builder()
-    dev_raw_data_source = builder.add_stage('Dev Raw Data Source')
-    dev_raw_data_source.set_attributes(data_format='TEXT', raw_data='noop', stop_after_first_batch=True)
-    jython_evaluator = builder.add_stage('Jython Evaluator')
-
-    file_writer_script = FILE_WRITER_SCRIPT_BINARY
-    jython_evaluator.script = textwrap.dedent(file_writer_script).format(filepath=str(file_path),
-                                                                         file_contents=file_contents,
-                                                                         encoding=encoding)
-    trash = builder.add_stage('Trash')
-    dev_raw_data_source >> jython_evaluator >> trash
-    pipeline = builder.build('File writer pipeline')
-
-    sdc_executor.add_pipeline(pipeline)
-    sdc_executor.start_pipeline(pipeline).wait_for_finished()
-    sdc_executor.remove_pipeline(pipeline)
+    write_file_with_pipeline(sdc_executor, file_path, file_contents, file_data_type='BINARY')
 
 
 def generate_excel_file():
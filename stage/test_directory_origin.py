@@ -28,19 +28,11 @@ import re
 from streamsets.testframework.markers import sdc_min_version
 from streamsets.testframework.utils import get_random_string
 
-logger = logging.getLogger(__name__)
-
-FILE_WRITER_SCRIPT = """
-    file_contents = '''{file_contents}'''
-    for record in records:
-        with open('{filepath}', 'w') as f:
-            f.write(file_contents.decode('utf8').encode('{encoding}'))
-"""
+from .utils.utils_file_writer import FileWriter
+from .utils.utils_shell import ShellBatch, execute_shell_commands
+from .utils.utils_wait import assert_holds_for, pipeline_metric, wait_until
 
-FILE_WRITER_SCRIPT_BINARY = """
-    with open('{filepath}', 'wb') as f:
-        f.write({file_contents})
-"""
+logger = logging.getLogger(__name__)
 
 
 @pytest.fixture(scope='module')
@@ -59,29 +51,11 @@ def file_writer(sdc_executor):
         file_contents (:obj:`str`): The file contents.
         encoding (:obj:`str`, optional): The file encoding. Default: ``'utf8'``
         file_data_type (:obj:`str`, optional): The file which type of data containing . Default: ``'NOT_BINARY'``
-    """
-    def file_writer_(filepath, file_contents, encoding='utf8', file_data_type='NOT_BINARY'):
-        write_file_with_pipeline(sdc_executor, filepath, file_contents, encoding, file_data_type)
-    return file_writer_
-
-
-def write_file_with_pipeline(sdc_executor, filepath, file_contents, encoding='utf8', file_data_type='NOT_BINARY'):
-    builder = sdc_executor.get_pipeline_builder()
-    dev_raw_data_source = builder.add_stage('Dev Raw Data Source')
-    dev_raw_data_source.set_attributes(data_format='TEXT', raw_data='noop', stop_after_first_batch=True)
-    jython_evaluator = builder.add_stage('Jython Evaluator')
 
-    file_writer_script = FILE_WRITER_SCRIPT_BINARY if file_data_type == 'BINARY' else FILE_WRITER_SCRIPT
-    jython_evaluator.script = textwrap.dedent(file_writer_script).format(filepath=str(filepath),
-                                                                         file_contents=file_contents,
-                                                                         encoding=encoding)
-    trash = builder.add_stage('Trash')
-    dev_raw_data_source >> jython_evaluator >> trash
-    pipeline = builder.build('File writer pipeline')
-
-    sdc_executor.add_pipeline(pipeline)
-    sdc_executor.start_pipeline(pipeline).wait_for_finished()
-    sdc_executor.remove_pipeline(pipeline)
+    Files can also be written many at a time with one pipeline, using ``file_writer.write_many(files)`` or by
+    writing them inside a ``with file_writer.batch():`` block.
+    """
+    return FileWriter(sdc_executor)
 
 
 @pytest.fixture
@@ -1429,10 +1403,10 @@ def test_directory_no_post_process_older_files(sdc_builder, sdc_executor, read_o
     UNPROCESSED_FILES = ['file-0.txt', 'file-1.txt']
     PROCESSED_FILES = ['file-2.txt', 'file-3.txt']
 
-    sdc_executor.execute_shell(f'mkdir -p {files_directory} {archive_directory}')
-
-    for i in range(4):
-        sdc_executor.write_file(os.path.join(files_directory, f'file-{i}.txt'), str(i))
+    shell = ShellBatch(sdc_executor)
+    shell.add(f'mkdir -p {archive_directory}')
+    shell.upload(files_directory, {f'file-{i}.txt': str(i) for i in range(4)})
+    shell.run(check=True)
 
     pipeline_builder = sdc_builder.get_pipeline_builder()
     directory = pipeline_builder.add_stage('Directory')
@@ -1454,10 +1428,11 @@ def test_directory_no_post_process_older_files(sdc_builder, sdc_executor, read_o
     sdc_executor.add_pipeline(pipeline)
     sdc_executor.start_pipeline(pipeline).wait_for_finished()
 
-    assert sorted(sdc_executor.execute_shell(f'ls {files_directory}').stdout.split()) == UNPROCESSED_FILES
+    files, archived_files = execute_shell_commands(sdc_executor, [f'ls {files_directory}', f'ls {archive_directory}'])
+    assert sorted(files.stdout.split()) == UNPROCESSED_FILES
 
     if file_post_processing == 'ARCHIVE':
-        assert sorted(sdc_executor.execute_shell(f'ls {archive_directory}').stdout.split()) == PROCESSED_FILES
+        assert sorted(archived_files.stdout.split()) == PROCESSED_FILES
 
 
 def setup_avro_file(sdc_executor, tmp_directory):
@@ -1761,9 +1736,9 @@ def test_directory_origin_read_while_writing(sdc_builder, sdc_executor):
     tmp_write_directory = os.path.join(tempfile.gettempdir(), get_random_string())
     tmp_in_directory = os.path.join(tempfile.gettempdir(), get_random_string())
     tmp_out_directory = os.path.join(tempfile.gettempdir(), get_random_string())
-    sdc_executor.execute_shell(f'mkdir {tmp_write_directory}')
-    sdc_executor.execute_shell(f'mkdir {tmp_in_directory}')
-    sdc_executor.execute_shell(f'mkdir {tmp_out_directory}')
+    execute_shell_commands(sdc_executor, [f'mkdir {tmp_write_directory}',
+                                          f'mkdir {tmp_in_directory}',
+                                          f'mkdir {tmp_out_directory}'], check=True)
     raw_data = 'hello'
 
     pipeline_builder = sdc_executor.get_pipeline_builder()
@@ -1853,9 +1828,9 @@ def test_directory_origin_read_while_writing(sdc_builder, sdc_executor):
         assert history.latest.metrics.counter('pipeline.batchInputRecords.counter').count == number_processed_files
 
     finally:
-        sdc_executor.execute_shell(f'rm -fr {tmp_write_directory}')
-        sdc_executor.execute_shell(f'rm -fr {tmp_in_directory}')
-        sdc_executor.execute_shell(f'rm -fr {tmp_out_directory}')
+        execute_shell_commands(sdc_executor, [f'rm -fr {tmp_write_directory}',
+                                              f'rm -fr {tmp_in_directory}',
+                                              f'rm -fr {tmp_out_directory}'])
 
 
 @pytest.mark.parametrize('total_time', [10])
@@ -2017,10 +1992,9 @@ def test_directory_origin_number_of_batches_generated(
     try:
         logger.debug(f'Creating files directory {files_directory}...')
         shell_executor(f'mkdir {files_directory}')
-        logger.debug(f'Creating file {files_directory}...')
-        file_writer(os.path.join(files_directory, file_name_1), file_contents_1)
-        logger.debug(f'Creating file {files_directory}...')
-        file_writer(os.path.join(files_directory, file_name_2), file_contents_2)
+        logger.debug(f'Creating files in {files_directory}...')
+        file_writer.write_many([(os.path.join(files_directory, file_name_1), file_contents_1),
+                                (os.path.join(files_directory, file_name_2), file_contents_2)])
 
         pipeline_builder = sdc_builder.get_pipeline_builder()
         directory = pipeline_builder.add_stage('Directory')
@@ -2041,8 +2015,12 @@ def test_directory_origin_number_of_batches_generated(
         sdc_executor.start_pipeline(pipeline)
         sdc_executor.wait_for_pipeline_metric(pipeline, 'input_record_count', 100)
 
-        # Wait for 60 seconds to give time for further batches to be generated
-        time.sleep(60)
+        # Wait for the expected batches, then give time for further (unexpected) batches to be generated
+        wait_until(pipeline_metric(sdc_executor, pipeline, 'pipeline.batchCount.counter', at_least=number_of_batches),
+                   timeout_sec=60)
+        assert_holds_for(pipeline_metric(sdc_executor, pipeline, 'pipeline.batchCount.counter',
+                                         equals=number_of_batches),
+                         duration_sec=30)
         sdc_executor.stop_pipeline(pipeline)
 
         # Assert that we get the correct number of batches
@@ -24,6 +24,8 @@ from hadoop.io import SequenceFile
 from streamsets.testframework.markers import aster_authentication, cluster, large, sdc_min_version
 from streamsets.testframework.utils import get_random_string
 
+from .utils.utils_shell import ShellBatch
+
 logger = logging.getLogger(__name__)
 
 # Specify a port for SDC RPC stages to use.
@@ -882,8 +884,9 @@ def test_cdh_file_event_filepath_when_whole_file_mode_enabled(sdc_builder, sdc_e
         src.batch_size_in_recs = 1
         src.batch_wait_time_in_secs = 1
 
-        sdc_executor.execute_shell(f'mkdir -p {src.files_directory}')
-        sdc_executor.write_file(f'{src.files_directory}/input.txt', 'message2\n')
+        shell = ShellBatch(sdc_executor)
+        shell.upload(src.files_directory, {'input.txt': 'message2\n'})
+        shell.run(check=True)
 
         hadoop_fs = builder.add_stage('Hadoop FS', type='destination')
         hadoop_fs.set_attributes(data_format='WHOLE_FILE',
@@ -23,6 +23,8 @@ from streamsets.testframework.environments.cloudera import ClouderaManagerCluste
 from streamsets.testframework.markers import cluster, sdc_min_version
 from streamsets.testframework.utils import get_random_string, Version
 
+from .utils.utils_wait import Condition, wait_until
+
 logger = logging.getLogger(__name__)
 
 
@@ -94,12 +96,14 @@ def test_kafka_origin_timestamp_offset_strategy(sdc_builder, sdc_executor, clust
     kafka_multitopic_consumer = get_kafka_multitopic_consumer_stage(pipeline_builder, cluster)
 
     # Send first 3 messages, save the timestamp to use, then send the last 2.
+    last_timestamp = None
     for i in range(3):
         producer = cluster.kafka.producer()
-        producer.send(kafka_multitopic_consumer.topic_list[0], INPUT_DATA[i].encode())
+        last_timestamp = producer.send(kafka_multitopic_consumer.topic_list[0], INPUT_DATA[i].encode()).get().timestamp
         producer.flush()
-    time.sleep(30)
-    timestamp = int(time.time() * 1000)
+    # The timestamp only has to be later than the ones of the messages already sent.
+    timestamp = wait_until(Condition(lambda: int(time.time() * 1000), lambda now: now > last_timestamp,
+                                     'clock to pass the timestamp of the last message sent'))
     for i in range(3, 5):
         producer = cluster.kafka.producer()
         producer.send(kafka_multitopic_consumer.topic_list[0], INPUT_DATA[i].encode())
@@ -34,6 +34,8 @@ from streamsets.sdk.utils import Version
 from streamsets.testframework.markers import database, sdc_min_version
 from streamsets.testframework.utils import get_random_string
 
+from stage.utils.utils_table_diff import assert_table_rows
+
 
 logger = logging.getLogger(__name__)
 
@@ -1712,17 +1714,17 @@ def test_oracle_cdc_to_jdbc_producer(sdc_builder, sdc_executor, database, buffer
         sdc_executor.start_pipeline(pipeline)
         sdc_executor.wait_for_pipeline_metric(pipeline, 'input_record_count', 10)
 
-        assert [tuple(row.values()) for row in inserts] == _select_from_table(db_engine=db_engine, dest_table=dest_table)
+        assert_table_rows(db_engine, dest_table, inserts, key=PRIMARY_KEY)
 
         updates = _update(connection=connection, table=src_table, count=batch_size).rows
         sdc_executor.wait_for_pipeline_metric(pipeline, 'input_record_count', 20)
 
-        assert [tuple(row.values()) for row in updates] == _select_from_table(db_engine=db_engine, dest_table=dest_table)
+        assert_table_rows(db_engine, dest_table, updates, key=PRIMARY_KEY)
 
         _delete(connection=connection, table=src_table, count=batch_size)
         sdc_executor.wait_for_pipeline_metric(pipeline, 'input_record_count', 30)
 
-        assert len(_select_from_table(db_engine=db_engine, dest_table=dest_table)) == 0
+        assert_table_rows(db_engine, dest_table, [], key=PRIMARY_KEY)
 
     finally:
         if pipeline is not None:
@@ -6431,12 +6433,6 @@ def _delete(connection, table, count=3):
                       change_count=count)
 
 
-def _select_from_table(db_engine, dest_table):
-    target_result = db_engine.execute(dest_table.select().order_by(dest_table.c[PRIMARY_KEY]))
-    target_result_list = target_result.fetchall()
-    target_result.close()
-    return target_result_list
-
 def _dump_dictionary_to_log(connection):
     """Make a dump of dictionary to redolog for better performance"""
     logger.info('Dumping dictionary to redolog started...')
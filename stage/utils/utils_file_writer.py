@@ -0,0 +1,142 @@
+# Copyright 2021 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing utils for writing files to SDC's local FS with a Jython Evaluator pipeline.  All the files of a
+# call are written by a single pipeline, so seeding many files costs one pipeline lifecycle.  The Jython stage library
+# must be installed (streamsets-datacollector-jython_2_7-lib).
+
+import base64
+import json
+import logging
+import textwrap
+from collections import namedtuple
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# The files are passed to the script as base64-encoded JSON, so that their contents never need escaping.
+FILE_WRITER_SCRIPT = """
+    import base64
+    import json
+
+    files = json.loads(base64.b64decode('{files}').decode('utf8'))
+    for record in records:
+        for entry in files:
+            if entry['binary']:
+                file_contents = base64.b64decode(entry['contents'])
+            else:
+                file_contents = entry['contents'].encode(entry['encoding'])
+            with open(entry['path'], 'wb') as f:
+                f.write(file_contents)
+"""
+
+FileWrite = namedtuple('FileWrite', 'filepath file_contents encoding file_data_type')
+FileWrite.__new__.__defaults__ = ('utf8', 'NOT_BINARY')
+
+
+def _as_json(file):
+    file = FileWrite(*file)
+    binary = file.file_data_type == 'BINARY'
+    if binary:
+        file_contents = file.file_contents
+        if isinstance(file_contents, str):
+            file_contents = file_contents.encode(file.encoding)
+        file_contents = base64.b64encode(file_contents).decode('ascii')
+    else:
+        file_contents = file.file_contents
+    return {'path': str(file.filepath), 'contents': file_contents, 'encoding': file.encoding, 'binary': binary}
+
+
+def write_files_with_pipeline(sdc_executor, files):
+    """Write files to SDC's local FS with one pipeline.
+
+    Args:
+        sdc_executor (:py:class:`streamsets.testframework.sdc.DataCollector`): Data Collector to write the files with.
+        files (:obj:`list`): :py:class:`FileWrite` instances, or tuples of the same fields.
+    """
+    files = [_as_json(file) for file in files]
+    if not files:
+        return
+
+    builder = sdc_executor.get_pipeline_builder()
+    dev_raw_data_source = builder.add_stage('Dev Raw Data Source')
+    dev_raw_data_source.set_attributes(data_format='TEXT', raw_data='noop', stop_after_first_batch=True)
+    jython_evaluator = builder.add_stage('Jython Evaluator')
+    payload = base64.b64encode(json.dumps(files).encode('utf8')).decode('ascii')
+    jython_evaluator.script = textwrap.dedent(FILE_WRITER_SCRIPT).format(files=payload)
+    trash = builder.add_stage('Trash')
+    dev_raw_data_source >> jython_evaluator >> trash
+    pipeline = builder.build('File writer pipeline')
+
+    logger.debug('Writing %s file(s) to SDC local FS ...', len(files))
+    sdc_executor.add_pipeline(pipeline)
+    sdc_executor.start_pipeline(pipeline).wait_for_finished()
+    sdc_executor.remove_pipeline(pipeline)
+
+
+def write_file_with_pipeline(sdc_executor, filepath, file_contents, encoding='utf8', file_data_type='NOT_BINARY'):
+    """Write one file to SDC's local FS. See :py:func:`write_files_with_pipeline`."""
+    write_files_with_pipeline(sdc_executor, [FileWrite(filepath, file_contents, encoding, file_data_type)])
+
+
+class FileWriter:
+    """Writes files to SDC's local FS, either one pipeline per file or many files per pipeline.
+
+    Calling the writer writes a file right away, unless inside a :py:meth:`batch` block, in which case the files are
+    written together when the block exits.
+
+    Args:
+        sdc_executor (:py:class:`streamsets.testframework.sdc.DataCollector`): Data Collector to write the files with.
+    """
+    def __init__(self, sdc_executor):
+        self.sdc_executor = sdc_executor
+        self._pending = None
+
+    def __call__(self, filepath, file_contents, encoding='utf8', file_data_type='NOT_BINARY'):
+        """Write a file.
+
+        Args:
+            filepath (:obj:`str`): The absolute path to which to write the file.
+            file_contents (:obj:`str` or :obj:`bytes`): The file contents.
+            encoding (:obj:`str`, optional): The file encoding. Default: ``'utf8'``
+            file_data_type (:obj:`str`, optional): ``'BINARY'`` to write ``file_contents`` as is.
+                Default: ``'NOT_BINARY'``
+        """
+        self.write_many([FileWrite(filepath, file_contents, encoding, file_data_type)])
+
+    def write_many(self, files):
+        """Write many files with one pipeline.
+
+        Args:
+            files (:obj:`list`): :py:class:`FileWrite` instances, or tuples of the same fields.
+        """
+        if self._pending is not None:
+            self._pending.extend(files)
+        else:
+            write_files_with_pipeline(self.sdc_executor, files)
+
+    @contextmanager
+    def batch(self):
+        """Defer the writes done inside the block, and write them all with one pipeline when it exits."""
+        if self._pending is not None:
+            # Nested batches are written by the outermost one.
+            yield self
+            return
+        self._pending = []
+        try:
+            yield self
+            pending = self._pending
+        finally:
+            self._pending = None
+        write_files_with_pipeline(self.sdc_executor, pending)
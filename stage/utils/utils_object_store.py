@@ -0,0 +1,233 @@
+# Copyright 2023 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing utils for seeding object stores (Amazon S3, ADLS Gen2) with many objects concurrently
+import json
+import logging
+import posixpath
+import random
+import string
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 1  # seconds, doubled on every retry
+DEFAULT_REPORT_INTERVAL = 10  # seconds
+S3_DELETE_BATCH_SIZE = 1000  # maximum number of keys accepted by a single DeleteObjects request
+
+DATA_FORMATS = ['TEXT', 'JSON', 'DELIMITED']
+
+SeedResult = namedtuple('SeedResult', ['paths', 'bytes', 'seconds', 'failures'])
+
+
+class ObjectTreeSpec:
+    """Declarative layout of a tree of objects.
+
+    The tree has ``fan_out ** depth`` leaf directories, each holding ``files_per_directory`` files.  For instance, the
+    default layout is 100 directories of 10 files each, directly under the root.
+
+    Args:
+        depth (:obj:`int`, optional): Number of directory levels under the root. Default: ``1``.
+        fan_out (:obj:`int`, optional): Number of subdirectories per directory. Default: ``100``.
+        files_per_directory (:obj:`int`, optional): Number of files per leaf directory. Default: ``10``.
+        file_size (:obj:`int` or :obj:`tuple`, optional): Size of each file in bytes, or a (min, max) tuple to draw
+            sizes uniformly from. Default: ``100``.
+        data_format (:obj:`str`, optional): One of ``TEXT``, ``JSON`` or ``DELIMITED``. Default: ``TEXT``.
+        extension (:obj:`str`, optional): File name extension. Default: ``txt``.
+        seed (:obj:`int`, optional): Seed of the random generator used for names and sizes. Default: ``None``.
+    """
+    def __init__(self, depth=1, fan_out=100, files_per_directory=10, file_size=100, data_format='TEXT',
+                 extension='txt', seed=None):
+        if data_format not in DATA_FORMATS:
+            raise ValueError(f'Invalid data format: {data_format}. Valid formats are: {", ".join(DATA_FORMATS)}')
+        self.depth = depth
+        self.fan_out = fan_out
+        self.files_per_directory = files_per_directory
+        self.file_size = file_size
+        self.data_format = data_format
+        self.extension = extension
+        self.seed = seed
+
+    @property
+    def file_count(self):
+        return self.fan_out ** self.depth * self.files_per_directory
+
+    @staticmethod
+    def _name(rng):
+        return ''.join(rng.choice(string.ascii_letters) for _ in range(10))
+
+    def _size(self, rng):
+        if isinstance(self.file_size, tuple):
+            return rng.randint(*self.file_size)
+        return self.file_size
+
+    def _directories(self, rng, root, depth):
+        if depth == 0:
+            yield root
+            return
+        for _ in range(self.fan_out):
+            yield from self._directories(rng, posixpath.join(root, self._name(rng)), depth - 1)
+
+    def layout(self, root):
+        """Lazily yields a (path, size) tuple for each file of the tree under ``root``."""
+        rng = random.Random(self.seed)
+        for directory in self._directories(rng, root, self.depth):
+            for _ in range(self.files_per_directory):
+                yield posixpath.join(directory, f'{self._name(rng)}.{self.extension}'), self._size(rng)
+
+    def contents(self, path, size):
+        """Returns ``size`` bytes (rounded to whole lines) of ``data_format`` data for the file at ``path``."""
+        if self.data_format == 'JSON':
+            line = json.dumps({'path': path, 'value': ''}) + '\n'
+            padding = max(size - len(line), 0)
+            line = json.dumps({'path': path, 'value': 'x' * padding}) + '\n'
+        elif self.data_format == 'DELIMITED':
+            line = f'{path},{"x" * max(size - len(path) - 2, 0)}\n'
+        else:
+            line = path + '\n'
+        return (line * max(size // len(line), 1)).encode()
+
+
+class S3ObjectStore:
+    """Object store backed by an Amazon S3 bucket. Extra keyword arguments (e.g. ``ACL``) are passed to put_object."""
+    def __init__(self, client, bucket, **put_kwargs):
+        self._client = client
+        self._bucket = bucket
+        self._put_kwargs = put_kwargs
+
+    def put(self, path, body):
+        self._client.put_object(Bucket=self._bucket, Key=path, Body=body, **self._put_kwargs)
+
+    def delete_tree(self, root):
+        # Objects are deleted in batches of up to 1000 keys per DeleteObjects request.
+        deleted = 0
+        paginator = self._client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self._bucket, Prefix=root):
+            keys = [{'Key': item['Key']} for item in page.get('Contents', [])]
+            for start in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+                self._client.delete_objects(Bucket=self._bucket,
+                                            Delete={'Objects': keys[start:start + S3_DELETE_BATCH_SIZE],
+                                                    'Quiet': True})
+            deleted += len(keys)
+        return deleted
+
+
+class AdlsGen2ObjectStore:
+    """Object store backed by an ADLS Gen2 file system."""
+    def __init__(self, file_system):
+        self._fs = file_system
+
+    def put(self, path, body):
+        responses = [self._fs.touch(path), self._fs.write(path, body)]
+        if not all(response.response.ok for response in responses):
+            raise RuntimeError(f'Could not create file: {path}')
+
+    def delete_tree(self, root):
+        self._fs.rmdir(root, recursive=True)
+
+
+class _Progress:
+    def __init__(self, total, report_interval):
+        self._total = total
+        self._report_interval = report_interval
+        self._lock = threading.Lock()
+        self._start = self._last_report = time.time()
+        self.count = 0
+        self.bytes = 0
+
+    def update(self, size):
+        with self._lock:
+            self.count += 1
+            self.bytes += size
+            now = time.time()
+            if now - self._last_report >= self._report_interval:
+                self._last_report = now
+                logger.info('Written %s/%s objects (%.0f objects/s)',
+                            self.count, self._total or '?', self.count / (now - self._start))
+
+
+def put_objects(store, objects, max_workers=DEFAULT_MAX_WORKERS, max_retries=DEFAULT_MAX_RETRIES,
+                backoff=DEFAULT_BACKOFF, report_interval=DEFAULT_REPORT_INTERVAL, total=None):
+    """Writes objects to ``store`` on a thread pool.
+
+    Args:
+        store: :py:class:`S3ObjectStore` or :py:class:`AdlsGen2ObjectStore`.
+        objects: Iterable of (path, body) tuples; bodies may also be callables returning the body, so that contents
+            are only generated by the worker writing them.
+        max_workers (:obj:`int`, optional): Maximum number of concurrent writes. Default: ``16``.
+        max_retries (:obj:`int`, optional): Number of retries of a failed write. Default: ``3``.
+        backoff (:obj:`int`, optional): Seconds to wait before the first retry, doubled on every retry. Default: ``1``.
+        report_interval (:obj:`int`, optional): Seconds between progress reports. Default: ``10``.
+        total (:obj:`int`, optional): Number of objects, only used for progress reports.
+
+    Returns:
+        A :py:class:`SeedResult`; ``failures`` lists the (path, exception) tuples of writes that failed for good.
+    """
+    progress = _Progress(total, report_interval)
+    failures = []
+    paths = []
+
+    def put(path, body):
+        body = body() if callable(body) else body
+        for attempt in range(max_retries + 1):
+            try:
+                store.put(path, body)
+                progress.update(len(body))
+                return
+            except Exception as e:
+                if attempt == max_retries:
+                    raise
+                logger.debug('Retrying write of %s after error: %s', path, str(e))
+                time.sleep(backoff * 2 ** attempt)
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Bound the number of pending writes, so that large trees are not queued all at once.
+        pending = {}
+        for path, body in objects:
+            paths.append(path)
+            pending[executor.submit(put, path, body)] = path
+            if len(pending) >= max_workers * 4:
+                done = next(as_completed(pending))
+                _collect(done, pending, failures)
+        for done in as_completed(list(pending)):
+            _collect(done, pending, failures)
+    elapsed = time.time() - start
+
+    logger.info('Written %s objects (%s bytes) in %.2f s (%.0f objects/s), %s failures',
+                progress.count, progress.bytes, elapsed, progress.count / elapsed if elapsed else progress.count,
+                len(failures))
+    return SeedResult(paths, progress.bytes, elapsed, failures)
+
+
+def _collect(future, pending, failures):
+    path = pending.pop(future)
+    exception = future.exception()
+    if exception is not None:
+        logger.error('Could not write object %s: %s', path, str(exception))
+        failures.append((path, exception))
+
+
+def seed_object_tree(store, root, spec, **kwargs):
+    """Writes the tree of objects described by ``spec`` (an :py:class:`ObjectTreeSpec`) under ``root``.
+
+    Keyword arguments are passed to :py:func:`put_objects`.
+    """
+    objects = ((path, lambda path=path, size=size: spec.contents(path, size)) for path, size in spec.layout(root))
+    return put_objects(store, objects, total=spec.file_count, **kwargs)
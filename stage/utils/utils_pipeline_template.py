@@ -0,0 +1,103 @@
+# Copyright 2021 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing a session-wide cache of built pipelines (templates) for parametrized tests whose cases only differ
+# in stage attributes. The first case builds the pipeline through a pipeline builder; the following ones get a copy of
+# its JSON with only the parametrized attributes set, skipping the builder (stage classes generated from the
+# definitions, stage placement, lanes, ...) altogether. Templates are dropped when the SDC version changes.
+#
+#     pipeline = pipeline_templates.get(sdc_builder, ('jdbc', version_branch), build_pipeline,
+#                                       stage_attributes={'JDBC Multitable Consumer': dict(number_of_threads=threads)})
+
+import copy
+import logging
+import re
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+
+def _stage(pipeline, name):
+    for stage in pipeline.stages:
+        if stage.instance_name == name:
+            return stage
+    stages = [stage for stage in pipeline.stages if stage.label == name]
+    if len(stages) != 1:
+        raise ValueError(f'{len(stages)} stages labelled {name} in pipeline, use an instance name instead')
+    return stages[0]
+
+
+def clone_pipeline(pipeline, title='Pipeline'):
+    """Copy a built pipeline under a new ID and title.
+
+    Args:
+        pipeline (:py:class:`streamsets.sdk.sdc_models.Pipeline`): Pipeline to copy.
+        title (:obj:`str`, optional): Title of the copy. Default: ``'Pipeline'``
+
+    Returns:
+        A :py:class:`streamsets.sdk.sdc_models.Pipeline` whose stages can be changed independently of ``pipeline``.
+    """
+    # Same class as the original (the test framework's pipelines can be configured for environments), sharing its
+    # stage classes rather than generating them again from the definitions.
+    clone = type(pipeline)(pipeline=copy.deepcopy(pipeline._data), all_stages=pipeline._all_stages)
+    # Same ID format as the pipeline builder's.
+    clone.id = '{}{}'.format(re.sub(r'[\W]|_', r'', title), uuid4())
+    clone.title = title
+    return clone
+
+
+class PipelineTemplateCache:
+    """Built pipelines by structural key, for the SDC version they were built against."""
+    def __init__(self):
+        self._templates = {}
+        self._version = None
+
+    def get(self, sdc_builder, key, build, title='Pipeline', stage_attributes=None):
+        """Get a pipeline built from the template of a given key, building the template if needed.
+
+        Args:
+            sdc_builder (:py:class:`streamsets.testframework.sdc.DataCollector`): Data Collector to build with.
+            key (:obj:`tuple`): Hashable key of the pipeline structure, i.e. of everything ``build`` depends on
+                (its stages, and the parameters and version checks deciding which attributes it sets).
+            build (:obj:`callable`): Function taking a pipeline builder and returning the built pipeline.
+            title (:obj:`str`, optional): Title of the pipeline. Default: ``'Pipeline'``
+            stage_attributes (:obj:`dict`, optional): Attributes to set, by stage instance name or label.
+                Default: ``None``
+
+        Returns:
+            A new :py:class:`streamsets.sdk.sdc_models.Pipeline`.
+        """
+        if sdc_builder.version != self._version:
+            if self._templates:
+                logger.info('SDC version changed from %s to %s, dropping %s pipeline template(s)',
+                            self._version, sdc_builder.version, len(self._templates))
+            self._templates.clear()
+            self._version = sdc_builder.version
+
+        template = self._templates.get(key)
+        if template is None:
+            logger.debug('Building pipeline template %s', key)
+            template = self._templates[key] = build(sdc_builder.get_pipeline_builder())
+
+        pipeline = clone_pipeline(template, title)
+        for name, attributes in (stage_attributes or {}).items():
+            _stage(pipeline, name).set_attributes(**attributes)
+        return pipeline
+
+    def clear(self):
+        self._templates.clear()
+
+
+# Shared by all the tests of a session (or of an xdist worker).
+pipeline_templates = PipelineTemplateCache()
@@ -0,0 +1,191 @@
+# Copyright 2021 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing utils for comparing large sets of records (wiretap records, database rows, plain dicts) without
+# sorting them: both sides are normalized and reduced to an order-insensitive digest in one pass, and a diff bounded
+# in size is only computed when the digests differ.
+
+import datetime
+import decimal
+import hashlib
+import logging
+from collections import Counter, namedtuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DIFFS = 10
+
+_DIGEST_MODULUS = 2 ** 256
+
+RecordSetDiff = namedtuple('RecordSetDiff', 'missing unexpected changed')
+
+
+class _Map(tuple):
+    """A normalized map: sorted (key, value) pairs, hashable, shown as a dict."""
+    def __repr__(self):
+        return repr(dict(self))
+
+    def get(self, key, default=None):
+        return dict(self).get(key, default)
+
+
+class _Boolean:
+    """A normalized boolean, which unlike :obj:`bool` is not equal to the numbers ``0`` and ``1``."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return isinstance(other, _Boolean) and self.value == other.value
+
+    def __hash__(self):
+        return hash((_Boolean, self.value))
+
+    def __repr__(self):
+        return repr(self.value)
+
+
+def normalize(value):
+    """Normalize a value for comparison.
+
+    SDC fields are replaced by their value, maps (including SQLAlchemy rows) by :py:class:`_Map`, lists by tuples,
+    numbers by an :obj:`int` or a normalized :py:class:`decimal.Decimal` (so that ``1``, ``1.0`` and ``Decimal('1.00')``
+    are equal), booleans by a :py:class:`_Boolean` (so that ``True`` and ``1`` differ), dates and times by their ISO
+    format and bytes by their hex representation.
+
+    Args:
+        value: The value to normalize.
+
+    Returns:
+        A hashable value.
+    """
+    if hasattr(value, 'value') and hasattr(value, 'type'):
+        # SDC field.
+        value = value.value
+    if isinstance(value, bool):
+        return _Boolean(value)
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float, decimal.Decimal)):
+        normalized = decimal.Decimal(str(value))
+        return int(normalized) if normalized.is_finite() and normalized == normalized.to_integral_value() \
+            else normalized.normalize()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).hex()
+    if hasattr(value, 'items'):
+        return _Map(sorted(((str(key), normalize(item)) for key, item in value.items()), key=lambda pair: pair[0]))
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize(item) for item in value)
+    return value
+
+
+def _hash(normalized):
+    return int.from_bytes(hashlib.sha256(repr(normalized).encode()).digest(), 'big')
+
+
+def digest(records):
+    """Compute an order-insensitive digest of a multiset of records, in one pass.
+
+    Args:
+        records (:obj:`iterable`): Records (anything :py:func:`normalize` accepts).
+
+    Returns:
+        A :obj:`tuple` of the number of records and the sum of their hashes modulo 2^256.
+    """
+    count, total = 0, 0
+    for record in records:
+        count += 1
+        total = (total + _hash(normalize(record))) % _DIGEST_MODULUS
+    return count, total
+
+
+def _key_of(record, key):
+    return record.get(key) if isinstance(record, _Map) else record[key]
+
+
+def diff_records(actual, expected, key=None, max_diffs=DEFAULT_MAX_DIFFS):
+    """Compute the differences between two multisets of records.
+
+    Args:
+        actual (:obj:`iterable`): Actual records.
+        expected (:obj:`iterable`): Expected records.
+        key (:obj:`str` or :obj:`int`, optional): Primary key field (or index, for tuple records). When given, a
+            missing and an unexpected record with the same key are reported as a changed record. Default: ``None``
+        max_diffs (:obj:`int`, optional): Number of records reported at most in each category.
+            Default: :py:const:`DEFAULT_MAX_DIFFS`
+
+    Returns:
+        A :py:class:`RecordSetDiff` of the missing records, the unexpected records and the changed records (pairs of
+        expected and actual record).
+    """
+    actual_counts = Counter(normalize(record) for record in actual)
+    expected_counts = Counter(normalize(record) for record in expected)
+    missing = list((expected_counts - actual_counts).elements())
+    unexpected = list((actual_counts - expected_counts).elements())
+
+    changed = []
+    if key is not None:
+        unexpected_by_key = {}
+        for record in unexpected:
+            unexpected_by_key.setdefault(_key_of(record, key), []).append(record)
+        still_missing = []
+        for record in missing:
+            same_key = unexpected_by_key.get(_key_of(record, key))
+            if same_key:
+                changed.append((record, same_key.pop()))
+            else:
+                still_missing.append(record)
+        missing = still_missing
+        unexpected = [record for records in unexpected_by_key.values() for record in records]
+
+    return RecordSetDiff(missing[:max_diffs], unexpected[:max_diffs], changed[:max_diffs])
+
+
+def assert_same_records(actual, expected, key=None, max_diffs=DEFAULT_MAX_DIFFS):
+    """Assert that two collections hold the same records, in any order.
+
+    The records are compared by digest first; only when the digests differ is a diff (bounded by ``max_diffs``)
+    computed and reported.
+
+    Args:
+        actual (:obj:`list`): Actual records, e.g. ``[record.field for record in wiretap.output_records]``.
+        expected (:obj:`list`): Expected records.
+        key (:obj:`str` or :obj:`int`, optional): Primary key used to report changed records. Default: ``None``
+        max_diffs (:obj:`int`, optional): Number of records reported at most in each category.
+            Default: :py:const:`DEFAULT_MAX_DIFFS`
+    """
+    actual_count, actual_digest = digest(actual)
+    expected_count, expected_digest = digest(expected)
+    if actual_digest == expected_digest and actual_count == expected_count:
+        return
+
+    diff = diff_records(actual, expected, key, max_diffs)
+    if not any(diff):
+        # Equal records whose normalized forms still differ in repr, and thus in digest.
+        logger.debug('Record digests differ but records are equal')
+        return
+    raise AssertionError(describe_diff(diff, f'Records differ: {actual_count} actual, {expected_count} expected'))
+
+
+def describe_diff(diff, header):
+    """Describe a diff (anything with ``missing``, ``unexpected`` and ``changed`` attributes) in an error message."""
+    lines = [header]
+    lines.extend(f'  missing: {record!r}' for record in diff.missing)
+    lines.extend(f'  unexpected: {record!r}' for record in diff.unexpected)
+    lines.extend(f'  changed: expected {expected_record!r}, got {actual_record!r}'
+                 for expected_record, actual_record in diff.changed)
+    return '\n'.join(lines)
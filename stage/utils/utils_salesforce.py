@@ -30,6 +30,8 @@ from streamsets.sdk.utils import (DEFAULT_TIME_BETWEEN_CHECKS as DEFAULT_WAIT_TI
 from streamsets.testframework.utils import get_random_string
 from streamsets.testframework.environments.salesforce import API_VERSION
 
+from .utils_records import assert_same_records
+
 CONTACT = 'Contact'
 CDC = 'CDC'
 PUSH_TOPIC = 'PUSH_TOPIC'
@@ -571,11 +573,10 @@ def verify_wiretap_records_data(wiretap_records, expected_data, sort=True):
                          for record in rows_from_wiretap]
 
     if data_from_wiretap and sort:
-        data_from_wiretap = sorted(data_from_wiretap,
-                                   key=lambda k: k[
-                                       'FirstName' if 'FirstName' in data_from_wiretap[0] else 'surName'].value)
-
-    if data_from_wiretap:
+        # Order does not matter: compare as sets of records, reporting changed records by name.
+        assert_same_records(data_from_wiretap, expected_data,
+                            key='FirstName' if 'FirstName' in data_from_wiretap[0] else 'surName')
+    elif data_from_wiretap:
         assert data_from_wiretap == expected_data
 
 
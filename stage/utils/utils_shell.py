@@ -0,0 +1,182 @@
+# Copyright 2021 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing utils for running many shell commands on SDC's host with a single sdc_executor.execute_shell()
+# call, i.e. one exec round trip, while still getting the output and exit code of each command.
+
+import base64
+import io
+import logging
+import re
+import shlex
+import tarfile
+import time
+import uuid
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# The script of an execute_shell() call is passed to the shell as a single argument, which Linux caps at 128 KiB.
+DEFAULT_MAX_SCRIPT_LENGTH = 100_000
+
+# Size of the base64 pieces in which uploaded archives are sent, so that each piece fits in one script.
+UPLOAD_CHUNK_SIZE = 64_000
+
+OK_STATUS = 0
+
+ShellResult = namedtuple('ShellResult', 'command stdout stderr exit_code')
+
+
+class ShellCommandError(Exception):
+    """Raised by :py:meth:`ShellBatch.run` when asked to check the exit codes and a command failed."""
+    def __init__(self, result):
+        super().__init__(f'Command {result.command!r} exited with {result.exit_code}: {result.stderr}')
+        self.result = result
+
+
+class ShellBatch:
+    """Runs shell commands on SDC's host in as few ``sdc_executor.execute_shell()`` calls as possible.
+
+    Commands run one after the other in the same shell, so ``cd`` and variables carry over to the following commands
+    of the same script (but not across scripts, see ``max_script_length``). A command calling ``exit`` ends its
+    script, leaving the remaining commands of that script without a result.
+
+    Args:
+        sdc_executor (:py:class:`streamsets.testframework.sdc.DataCollector`): Data Collector to run the commands on.
+        max_script_length (:obj:`int`, optional): Commands are split over several ``execute_shell()`` calls when they
+            do not fit in a script of this length. Default: :py:const:`DEFAULT_MAX_SCRIPT_LENGTH`
+    """
+    def __init__(self, sdc_executor, max_script_length=DEFAULT_MAX_SCRIPT_LENGTH):
+        self.sdc_executor = sdc_executor
+        self.max_script_length = max_script_length
+        self.commands = []
+
+    def add(self, command):
+        """Add a command to the batch.
+
+        Args:
+            command (:obj:`str`): Shell command, possibly spanning several lines (e.g. with a heredoc).
+
+        Returns:
+            The index of the command's result in the list returned by :py:meth:`run`.
+        """
+        self.commands.append(command)
+        return len(self.commands) - 1
+
+    def upload(self, directory, files, mode=0o644):
+        """Add commands writing files under a directory, sent as a tar archive.
+
+        Args:
+            directory (:obj:`str`): Directory to extract the files in. It is created if missing.
+            files (:obj:`dict`): File contents (:obj:`str` or :obj:`bytes`) by path relative to ``directory``, modified
+                in this order.
+            mode (:obj:`int`, optional): Permissions of the files. Default: ``0o644``
+
+        Returns:
+            The index of the extraction command's result in the list returned by :py:meth:`run`.
+        """
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode='w:gz') as tar:
+            now = time.time()
+            for index, (path, contents) in enumerate(files.items()):
+                data = contents.encode() if isinstance(contents, str) else contents
+                info = tarfile.TarInfo(path)
+                info.size = len(data)
+                info.mode = mode
+                # TarInfo defaults to the epoch. Files get the current time, a millisecond apart in the order of
+                # `files`, like files written one after the other (float times are kept by the pax format).
+                info.mtime = now + index / 1000
+                tar.addfile(info, io.BytesIO(data))
+        payload = base64.b64encode(archive.getvalue()).decode('ascii')
+
+        directory = shlex.quote(directory)
+        upload_file = f'/tmp/stf-upload-{uuid.uuid4().hex}.b64'
+        self.add(f': > {upload_file}')
+        for start in range(0, len(payload), UPLOAD_CHUNK_SIZE):
+            self.add(f"printf '%s' '{payload[start:start + UPLOAD_CHUNK_SIZE]}' >> {upload_file}")
+        return self.add(f'mkdir -p {directory} && base64 -d {upload_file} | tar -xz -C {directory}; '
+                        f'exit_code=$?; rm -f {upload_file}; (exit $exit_code)')
+
+    def _scripts(self, commands):
+        # Yields (marker, command indexes, script) tuples, each script fitting in max_script_length when possible.
+        marker = f'STF-{uuid.uuid4().hex}'
+        script, indexes = [], []
+        for index, command in enumerate(commands):
+            # The newline before the end markers makes sure they start a line; it is removed when parsing the output.
+            snippet = (f"printf '%s\\n' '{marker} {index}'; printf '%s\\n' '{marker} {index}' >&2\n"
+                       f'{{\n{command}\n}}\n'
+                       f"exit_code=$?; printf '\\n%s\\n' '{marker} {index} '$exit_code; "
+                       f"printf '\\n%s\\n' '{marker} {index}' >&2\n")
+            if script and sum(len(part) for part in script) + len(snippet) > self.max_script_length:
+                yield marker, indexes, ''.join(script)
+                script, indexes = [], []
+            script.append(snippet)
+            indexes.append(index)
+        if script:
+            yield marker, indexes, ''.join(script)
+
+    @staticmethod
+    def _split(output, marker):
+        # Maps command index to (output, exit code) for each command whose output is complete.
+        pattern = re.compile(rf'^{marker} (\d+)\n(.*?)\n{marker} \1(?: (\d+))?$', re.DOTALL | re.MULTILINE)
+        return {int(match.group(1)): (match.group(2), int(match.group(3)) if match.group(3) else None)
+                for match in pattern.finditer(output)}
+
+    def run(self, check=False):
+        """Run the commands added so far, and clear the batch.
+
+        Args:
+            check (:obj:`bool`, optional): Raise :py:class:`ShellCommandError` for the first command with a non-zero
+                exit code. Default: ``False``
+
+        Returns:
+            A :obj:`list` of :py:class:`ShellResult`, one per command. Commands which did not run to completion (e.g.
+            after an ``exit``) have ``None`` as exit code.
+        """
+        commands, self.commands = self.commands, []
+        scripts = list(self._scripts(commands))
+        logger.debug('Running %s command(s) in %s execute_shell() call(s) ...', len(commands), len(scripts))
+
+        results = []
+        for marker, indexes, script in scripts:
+            command = self.sdc_executor.execute_shell(script)
+            stdouts = self._split(command.stdout or '', marker)
+            stderrs = self._split(command.stderr or '', marker)
+            for index in indexes:
+                stdout, exit_code = stdouts.get(index, ('', None))
+                stderr, _ = stderrs.get(index, ('', None))
+                results.append(ShellResult(commands[index], stdout, stderr, exit_code))
+
+        if check:
+            for result in results:
+                if result.exit_code != OK_STATUS:
+                    raise ShellCommandError(result)
+        return results
+
+
+def execute_shell_commands(sdc_executor, commands, check=False):
+    """Run shell commands on SDC's host with one ``sdc_executor.execute_shell()`` call. See :py:class:`ShellBatch`.
+
+    Args:
+        sdc_executor (:py:class:`streamsets.testframework.sdc.DataCollector`): Data Collector to run the commands on.
+        commands (:obj:`list`): Shell commands.
+        check (:obj:`bool`, optional): Raise :py:class:`ShellCommandError` if a command fails. Default: ``False``
+
+    Returns:
+        A :obj:`list` of :py:class:`ShellResult`, one per command.
+    """
+    batch = ShellBatch(sdc_executor)
+    for command in commands:
+        batch.add(command)
+    return batch.run(check=check)
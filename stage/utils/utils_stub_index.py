@@ -0,0 +1,153 @@
+# Copyright 2021 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing an index of the ``@stub`` tests found in test modules, built by parsing their source (the modules
+# are never imported) and cached on disk so that only modules changed since the last run have to be parsed again.
+
+import ast
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser('~'), '.streamsets', 'stf_stub_index.json')
+
+# Bumped whenever the layout of the cached entries changes, so that stale caches are simply rebuilt.
+INDEX_VERSION = 1
+
+
+def _is_stub_decorator(decorator):
+    # Matches both ``@stub`` and ``@decorators.stub``.
+    if isinstance(decorator, ast.Call):
+        decorator = decorator.func
+    return ((isinstance(decorator, ast.Name) and decorator.id == 'stub')
+            or (isinstance(decorator, ast.Attribute) and decorator.attr == 'stub'))
+
+
+def scan_module(source):
+    """Find the tests defined by a test module.
+
+    Args:
+        source (:obj:`str`): Source code of the module.
+
+    Returns:
+        A :obj:`tuple` of two :obj:`list` with the names of the ``@stub`` tests and of the remaining tests. Test classes
+        are counted as remaining tests.
+    """
+    stubs, tests = [], []
+    for node in ast.parse(source).body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith('test'):
+            is_stub = any(_is_stub_decorator(decorator) for decorator in node.decorator_list)
+            (stubs if is_stub else tests).append(node.name)
+        elif isinstance(node, ast.ClassDef) and node.name.startswith('Test'):
+            tests.append(node.name)
+    return stubs, tests
+
+
+class StubIndex:
+    """Index of the ``@stub`` tests of test modules, cached in a JSON file.
+
+    Entries are keyed by module path and reused as long as the module's mtime and size are unchanged. When they
+    changed (e.g. after a fresh checkout), the module's SHA-1 is compared before parsing it again.
+
+    Args:
+        path (:obj:`str`, optional): Path of the JSON file in which the index is cached. Default:
+            :py:const:`DEFAULT_INDEX_PATH`
+    """
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self._entries = self._read()
+        self._dirty = False
+
+    def _read(self):
+        try:
+            with open(self.path) as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            return {}
+        return index.get('entries', {}) if index.get('version') == INDEX_VERSION else {}
+
+    def save(self):
+        """Write the index back to its cache file if any entry changed."""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Written to a temporary file first so that concurrent sessions (e.g. xdist workers) never read half an index.
+        temporary_path = '{}.{}'.format(self.path, os.getpid())
+        with open(temporary_path, 'w') as index_file:
+            json.dump({'version': INDEX_VERSION, 'entries': self._entries}, index_file)
+        os.replace(temporary_path, self.path)
+        self._dirty = False
+
+    def _entry(self, module_path):
+        module_path = os.path.abspath(str(module_path))
+        stat = os.stat(module_path)
+        entry = self._entries.get(module_path)
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry
+
+        with open(module_path, 'rb') as module_file:
+            source = module_file.read()
+        sha1 = hashlib.sha1(source).hexdigest()
+        if not entry or entry['sha1'] != sha1:
+            try:
+                stubs, tests = scan_module(source)
+            except SyntaxError:
+                # Let pytest import the module and report the error.
+                stubs, tests = [], [None]
+            logger.debug('Indexed %s stub(s) and %s other test(s) in %s', len(stubs), len(tests), module_path)
+            entry = {'sha1': sha1, 'stubs': stubs, 'tests': tests}
+        entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        self._entries[module_path] = entry
+        self._dirty = True
+        return entry
+
+    def stubs(self, module_path):
+        """Get the names of the ``@stub`` tests of a module.
+
+        Args:
+            module_path (:obj:`str`): Path of the test module.
+
+        Returns:
+            A :obj:`set` of test function names.
+        """
+        return set(self._entry(module_path)['stubs'])
+
+    def is_stub_only(self, module_path):
+        """Check whether all the tests of a module are ``@stub`` tests.
+
+        Args:
+            module_path (:obj:`str`): Path of the test module.
+
+        Returns:
+            ``True`` if the module has at least one test and none of them is a real one.
+        """
+        entry = self._entry(module_path)
+        return bool(entry['stubs']) and not entry['tests']
+
+    def stub_only_modules(self, directory, pattern_prefix='test_'):
+        """Get the test modules of a directory whose tests are all ``@stub`` tests.
+
+        Args:
+            directory (:obj:`str`): Directory to look for test modules in (not recursively).
+            pattern_prefix (:obj:`str`, optional): File name prefix of test modules. Default: ``'test_'``
+
+        Returns:
+            A sorted :obj:`list` of module file names, relative to ``directory``.
+        """
+        return sorted(file_name for file_name in os.listdir(str(directory))
+                      if file_name.startswith(pattern_prefix) and file_name.endswith('.py')
+                      and self.is_stub_only(os.path.join(str(directory), file_name)))
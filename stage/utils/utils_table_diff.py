@@ -0,0 +1,312 @@
+# Copyright 2021 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing utils for comparing database tables too large to be fetched in memory, e.g. the source and target
+# tables of a replication test. Both tables are streamed with server-side cursors ordered by key and compared chunk by
+# chunk in a merge join. Optionally, a first pass compares checksums of key ranges computed by the database itself,
+# so that only the ranges whose checksums differ are streamed.
+#
+#     assert_tables_equal(database.engine, src_table, target_table, checksum_ranges=64)
+#     assert_table_rows(database.engine, dest_table, expected_rows, key='ID')
+
+import logging
+from collections import namedtuple
+
+import sqlalchemy
+
+from .utils_records import DEFAULT_MAX_DIFFS, describe_diff, normalize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+TableDiff = namedtuple('TableDiff', 'source_rows target_rows difference_count missing unexpected changed')
+
+
+def _table(engine, table):
+    if isinstance(table, str):
+        return sqlalchemy.Table(table, sqlalchemy.MetaData(), autoload=True, autoload_with=engine)
+    return table
+
+
+def _key_names(table, key):
+    if key is None:
+        key = [column.name for column in table.primary_key.columns]
+        if not key:
+            raise ValueError(f'Table {table.name} has no primary key, a key must be given')
+    elif isinstance(key, str):
+        key = [key]
+    return list(key)
+
+
+def _column_names(table, key, columns):
+    names = list(columns) if columns else [column.name for column in table.columns]
+    return key + [name for name in names if name not in key]
+
+
+def stream_rows(engine, table, key=None, columns=None, where=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Iterate over the rows of a table ordered by key, fetching them with a server-side cursor chunk by chunk.
+
+    Args:
+        engine (:py:class:`sqlalchemy.engine.Engine`): Engine of the database.
+        table (:py:class:`sqlalchemy.Table` or :obj:`str`): Table or table name.
+        key (:obj:`str` or :obj:`list`, optional): Key column(s) to order by. Default: the table's primary key
+        columns (:obj:`list`, optional): Columns to select. Default: all the table's columns
+        where (:py:class:`sqlalchemy.sql.ClauseElement`, optional): Filter of the rows. Default: ``None``
+        chunk_size (:obj:`int`, optional): Number of rows fetched at once. Default: :py:const:`DEFAULT_CHUNK_SIZE`
+    """
+    table = _table(engine, table)
+    key = _key_names(table, key)
+    query = sqlalchemy.select([table.c[name] for name in (columns or [column.name for column in table.columns])])
+    if where is not None:
+        query = query.where(where)
+    query = query.order_by(*(table.c[name] for name in key))
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True).execute(query)
+        try:
+            while True:
+                rows = result.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            result.close()
+
+
+def _keyed(rows, key_size, side):
+    # Rows are compared as tuples of normalized values, the key columns first.
+    previous_key = None
+    for row in rows:
+        values = tuple(normalize(value) for value in row)
+        row_key = values[:key_size]
+        if previous_key is not None and row_key <= previous_key:
+            raise ValueError(f'{side} rows are not ordered by a unique key ({previous_key!r} then {row_key!r}); '
+                             'string keys must sort the same way in the database and in Python')
+        previous_key = row_key
+        yield row_key, values
+
+
+class _DiffBuilder:
+    def __init__(self, column_names, max_diffs):
+        self.column_names = column_names
+        self.max_diffs = max_diffs
+        self.source_rows = 0
+        self.target_rows = 0
+        self.difference_count = 0
+        self.missing = []
+        self.unexpected = []
+        self.changed = []
+
+    def _row(self, values):
+        return normalize(dict(zip(self.column_names, values)))
+
+    def _report(self, differences, difference):
+        self.difference_count += 1
+        if len(differences) < self.max_diffs:
+            differences.append(difference)
+
+    def merge(self, source, target):
+        """Merge join rows of the source and of the target, both ordered by key, as given by :py:func:`_keyed`."""
+        source_item, target_item = next(source, None), next(target, None)
+        while source_item is not None or target_item is not None:
+            if target_item is None or (source_item is not None and source_item[0] < target_item[0]):
+                self.source_rows += 1
+                self._report(self.missing, self._row(source_item[1]))
+                source_item = next(source, None)
+            elif source_item is None or target_item[0] < source_item[0]:
+                self.target_rows += 1
+                self._report(self.unexpected, self._row(target_item[1]))
+                target_item = next(target, None)
+            else:
+                self.source_rows += 1
+                self.target_rows += 1
+                if source_item[1] != target_item[1]:
+                    self._report(self.changed, (self._row(source_item[1]), self._row(target_item[1])))
+                source_item, target_item = next(source, None), next(target, None)
+
+    def build(self):
+        return TableDiff(self.source_rows, self.target_rows, self.difference_count,
+                         self.missing, self.unexpected, self.changed)
+
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def _row_hash(engine, column_names):
+    """Get an SQL expression hashing a row to a non-negative integer, or ``None`` if the dialect is not supported."""
+    columns = [_quote(engine, name) for name in column_names]
+    dialect = engine.dialect.name
+    if dialect == 'mysql':
+        return f"CAST(CONV(SUBSTRING(MD5(CONCAT_WS('|', {', '.join(columns)})), 1, 15), 16, 10) AS UNSIGNED)"
+    if dialect == 'postgresql':
+        return f"('x' || SUBSTR(MD5(CONCAT_WS('|', {', '.join(columns)})), 1, 15))::BIT(60)::BIGINT"
+    if dialect == 'mssql':
+        concatenation = ", '|', ".join(columns)
+        # First 7 bytes of the MD5 hash, as a decimal so that summing millions of them does not overflow.
+        return f"CAST(CAST(CAST(HASHBYTES('MD5', CONCAT({concatenation}, '')) AS BINARY(7)) AS BIGINT) AS DECIMAL(38))"
+    if dialect == 'oracle':
+        concatenation = " || '|' || ".join(columns)
+        return f'ORA_HASH({concatenation})'
+    return None
+
+
+def _range_checksums(engine, table, key_name, column_names, low, width):
+    """Get the number of rows and the sum of their hashes by key range, computed by the database in a single scan."""
+    bucket = f'FLOOR(({_quote(engine, key_name)} - {low}) / {width})'
+    query = (f'SELECT {bucket}, COUNT(*), SUM({_row_hash(engine, column_names)}) '
+             f'FROM {engine.dialect.identifier_preparer.format_table(table)} GROUP BY {bucket}')
+    with engine.connect() as connection:
+        return {int(bucket): (count, normalize(checksum))
+                for bucket, count, checksum in connection.execute(sqlalchemy.text(query))}
+
+
+def _key_bounds(engine, table, key_name):
+    column = table.c[key_name]
+    with engine.connect() as connection:
+        return connection.execute(sqlalchemy.select([sqlalchemy.func.min(column), sqlalchemy.func.max(column)])).first()
+
+
+def _differing_ranges(engine, target_engine, source, target, key, column_names, ranges):
+    """Compare checksums of key ranges of both tables.
+
+    Returns:
+        A :obj:`tuple` of the number of rows in the ranges which match, and the ``(low, high)`` bounds of those which
+        do not, or ``None`` if checksums cannot be used (several key columns, non-integer key, unsupported database).
+    """
+    if (len(key) != 1 or engine.dialect.name != target_engine.dialect.name
+            or _row_hash(engine, column_names) is None):
+        logger.info('Range checksums not supported for key %s on %s, comparing all rows', key, engine.dialect.name)
+        return None
+    bounds = [normalize(bound) for bound in (*_key_bounds(engine, source, key[0]),
+                                             *_key_bounds(target_engine, target, key[0]))
+              if bound is not None]
+    if not bounds:
+        return 0, []
+    if not all(isinstance(bound, int) for bound in bounds):
+        logger.info('Range checksums need an integer key, comparing all rows')
+        return None
+    low = min(bounds)
+    width = max((max(bounds) - low) // ranges + 1, 1)
+
+    source_checksums = _range_checksums(engine, source, key[0], column_names, low, width)
+    target_checksums = _range_checksums(target_engine, target, key[0], column_names, low, width)
+    matching_rows, differing = 0, []
+    for bucket in sorted(set(source_checksums) | set(target_checksums)):
+        if bucket in source_checksums and source_checksums.get(bucket) == target_checksums.get(bucket):
+            matching_rows += source_checksums[bucket][0]
+        else:
+            differing.append((low + bucket * width, low + (bucket + 1) * width))
+    logger.info('%s of %s key range(s) have different checksums', len(differing),
+                len(set(source_checksums) | set(target_checksums)))
+    return matching_rows, differing
+
+
+def diff_tables(engine, source, target, key=None, columns=None, target_engine=None, checksum_ranges=None,
+                chunk_size=DEFAULT_CHUNK_SIZE, max_diffs=DEFAULT_MAX_DIFFS):
+    """Compare two tables by streaming them in key order, without holding them in memory.
+
+    Args:
+        engine (:py:class:`sqlalchemy.engine.Engine`): Engine of the source database.
+        source (:py:class:`sqlalchemy.Table` or :obj:`str`): Source table (the expected rows).
+        target (:py:class:`sqlalchemy.Table` or :obj:`str`): Target table (the actual rows).
+        key (:obj:`str` or :obj:`list`, optional): Key column(s), unique in both tables.
+            Default: the source table's primary key
+        columns (:obj:`list`, optional): Columns to compare, present in both tables. Default: all source columns
+        target_engine (:py:class:`sqlalchemy.engine.Engine`, optional): Engine of the target database.
+            Default: ``engine``
+        checksum_ranges (:obj:`int`, optional): Number of key ranges whose checksums are compared first, only the
+            ranges whose checksums differ being streamed. Needs a single integer key and both tables in MySQL,
+            PostgreSQL, SQL Server or Oracle. Default: ``None`` (stream all rows)
+        chunk_size (:obj:`int`, optional): Number of rows fetched at once. Default: :py:const:`DEFAULT_CHUNK_SIZE`
+        max_diffs (:obj:`int`, optional): Number of rows reported at most in each category.
+            Default: :py:const:`DEFAULT_MAX_DIFFS`
+
+    Returns:
+        A :py:class:`TableDiff` of the number of rows in each table and of differing rows, the rows missing from
+        the target, the rows unexpected in the target and the changed rows (pairs of source and target row).
+    """
+    target_engine = target_engine or engine
+    source, target = _table(engine, source), _table(target_engine, target)
+    key = _key_names(source, key)
+    column_names = _column_names(source, key, columns)
+    builder = _DiffBuilder(column_names, max_diffs)
+
+    ranges = [None]
+    if checksum_ranges:
+        checked = _differing_ranges(engine, target_engine, source, target, key, column_names, checksum_ranges)
+        if checked is not None:
+            matching_rows, ranges = checked
+            builder.source_rows += matching_rows
+            builder.target_rows += matching_rows
+
+    def in_range(table, key_range):
+        if key_range is None:
+            return None
+        low, high = key_range
+        return sqlalchemy.and_(table.c[key[0]] >= low, table.c[key[0]] < high)
+
+    for key_range in ranges:
+        builder.merge(_keyed(stream_rows(engine, source, key, column_names, in_range(source, key_range), chunk_size),
+                             len(key), 'Source'),
+                      _keyed(stream_rows(target_engine, target, key, column_names, in_range(target, key_range),
+                                         chunk_size),
+                             len(key), 'Target'))
+    return builder.build()
+
+
+def assert_tables_equal(engine, source, target, key=None, **kwargs):
+    """Assert that two tables hold the same rows (see :py:func:`diff_tables` for the arguments)."""
+    diff = diff_tables(engine, source, target, key, **kwargs)
+    if diff.difference_count:
+        raise AssertionError(describe_diff(diff, f'Tables differ on {diff.difference_count} row(s): '
+                                                 f'{diff.source_rows} in source, {diff.target_rows} in target'))
+
+
+def diff_table_rows(engine, table, expected_rows, key=None, columns=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                    max_diffs=DEFAULT_MAX_DIFFS):
+    """Compare a table with expected rows, streaming the table in key order.
+
+    Args:
+        engine (:py:class:`sqlalchemy.engine.Engine`): Engine of the database.
+        table (:py:class:`sqlalchemy.Table` or :obj:`str`): Table (the actual rows).
+        expected_rows (:obj:`list`): Expected rows, as dicts by column name (matched case-insensitively).
+        key (:obj:`str` or :obj:`list`, optional): Key column(s). Default: the table's primary key
+        columns (:obj:`list`, optional): Columns to compare. Default: all the table's columns
+
+    Returns:
+        A :py:class:`TableDiff` where the expected rows are the source.
+    """
+    table = _table(engine, table)
+    key = _key_names(table, key)
+    column_names = _column_names(table, key, columns)
+    builder = _DiffBuilder(column_names, max_diffs)
+
+    def expected_values(row):
+        by_name = {str(name).lower(): value for name, value in row.items()}
+        return tuple(by_name.get(name.lower()) for name in column_names)
+
+    expected = sorted((expected_values(row) for row in expected_rows),
+                      key=lambda values: tuple(normalize(value) for value in values[:len(key)]))
+    builder.merge(_keyed(iter(expected), len(key), 'Expected'),
+                  _keyed(stream_rows(engine, table, key, column_names, chunk_size=chunk_size), len(key), 'Table'))
+    return builder.build()
+
+
+def assert_table_rows(engine, table, expected_rows, key=None, **kwargs):
+    """Assert that a table holds exactly the expected rows (see :py:func:`diff_table_rows` for the arguments)."""
+    diff = diff_table_rows(engine, table, expected_rows, key, **kwargs)
+    if diff.difference_count:
+        raise AssertionError(describe_diff(diff, f'Table differs on {diff.difference_count} row(s): '
+                                                 f'{diff.source_rows} expected, {diff.target_rows} in table'))
@@ -0,0 +1,254 @@
+# Copyright 2021 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing utils for waiting on conditions instead of sleeping for a fixed time: wait_until() polls a
+# Condition with exponential backoff and fails with the last observed value once the timeout expires. Conditions are
+# combined with & and |, and negated with ~.
+#
+#     wait_until(pipeline_status(sdc_executor, pipeline, 'RETRY'), timeout_sec=30)
+#     wait_until(table_row_count(database.engine, table, at_least=100) & file_exists(sdc_executor, path))
+
+import logging
+import time
+
+import sqlalchemy
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT_SEC = 60
+DEFAULT_INITIAL_INTERVAL_SEC = 0.1
+DEFAULT_MAX_INTERVAL_SEC = 5
+
+
+class WaitTimeoutError(AssertionError):
+    """Raised by :py:func:`wait_until` when a condition does not hold before the timeout."""
+
+
+class Condition:
+    """A condition on a value observed on demand.
+
+    Args:
+        probe (:obj:`callable`): Function without arguments returning the observed value.
+        predicate (:obj:`callable`, optional): Function telling whether the observed value satisfies the condition.
+            Default: :py:func:`bool`
+        description (:obj:`str`, optional): What is waited for, used in logs and errors. Default: the probe's name.
+    """
+    def __init__(self, probe, predicate=bool, description=None):
+        self.probe = probe
+        self.predicate = predicate
+        self.description = description or getattr(probe, '__name__', repr(probe))
+
+    def evaluate(self):
+        """Observe the value and check it.
+
+        Returns:
+            A :obj:`tuple` of whether the condition holds and the observed value.
+        """
+        value = self.probe()
+        return bool(self.predicate(value)), value
+
+    def __and__(self, other):
+        return _Combination(all, 'and', [self, other])
+
+    def __or__(self, other):
+        return _Combination(any, 'or', [self, other])
+
+    def __invert__(self):
+        return Condition(self.probe, lambda value: not self.predicate(value), f'not ({self.description})')
+
+    def __str__(self):
+        return self.description
+
+
+class _Combination(Condition):
+    def __init__(self, combine, operator, conditions):
+        self.combine = combine
+        self.conditions = conditions
+        self.description = f' {operator} '.join(f'({condition})' for condition in conditions)
+
+    def evaluate(self):
+        results = [condition.evaluate() for condition in self.conditions]
+        return self.combine(holds for holds, _ in results), [value for _, value in results]
+
+    def __invert__(self):
+        return Condition(lambda: self.evaluate()[0], lambda holds: not holds, f'not ({self.description})')
+
+
+def wait_until(condition, timeout_sec=DEFAULT_TIMEOUT_SEC, initial_interval_sec=DEFAULT_INITIAL_INTERVAL_SEC,
+               max_interval_sec=DEFAULT_MAX_INTERVAL_SEC, backoff=2):
+    """Poll a condition until it holds, with exponential backoff between polls.
+
+    Args:
+        condition (:py:class:`Condition`): Condition to wait for.
+        timeout_sec (:obj:`float`, optional): Time to wait for at most. Default: :py:const:`DEFAULT_TIMEOUT_SEC`
+        initial_interval_sec (:obj:`float`, optional): Time between the first two polls.
+            Default: :py:const:`DEFAULT_INITIAL_INTERVAL_SEC`
+        max_interval_sec (:obj:`float`, optional): Longest time between two polls.
+            Default: :py:const:`DEFAULT_MAX_INTERVAL_SEC`
+        backoff (:obj:`float`, optional): Factor by which the time between polls grows. Default: ``2``
+
+    Returns:
+        The value observed when the condition held.
+
+    Raises:
+        :py:class:`WaitTimeoutError`: If the condition still does not hold after ``timeout_sec``.
+    """
+    start = time.monotonic()
+    deadline = start + timeout_sec
+    interval = initial_interval_sec
+    polls = 0
+    while True:
+        polls += 1
+        holds, value = condition.evaluate()
+        if holds:
+            logger.debug('%s held after %.1f seconds (%s polls)', condition, time.monotonic() - start, polls)
+            return value
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise WaitTimeoutError(f'Timed out after {timeout_sec} seconds waiting for {condition}; '
+                                   f'last observed {value!r} ({polls} polls)')
+        time.sleep(min(interval, remaining))
+        interval = min(interval * backoff, max_interval_sec)
+
+
+def assert_holds_for(condition, duration_sec, interval_sec=1):
+    """Check that a condition keeps holding for a while, e.g. that no further batch comes once all were processed.
+
+    Args:
+        condition (:py:class:`Condition`): Condition which must hold on every poll.
+        duration_sec (:obj:`float`): Time to watch the condition for.
+        interval_sec (:obj:`float`, optional): Time between two polls. Default: ``1``
+
+    Returns:
+        The value observed last.
+
+    Raises:
+        :py:class:`AssertionError`: As soon as the condition does not hold.
+    """
+    start = time.monotonic()
+    deadline = start + duration_sec
+    while True:
+        holds, value = condition.evaluate()
+        assert holds, (f'{condition} stopped holding after {time.monotonic() - start:.1f} seconds; '
+                       f'observed {value!r}')
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return value
+        time.sleep(min(interval_sec, remaining))
+
+
+def _threshold_predicate(at_least=None, at_most=None, equals=None):
+    def predicate(value):
+        return ((at_least is None or value >= at_least)
+                and (at_most is None or value <= at_most)
+                and (equals is None or value == equals))
+    return predicate
+
+
+def _threshold_description(at_least=None, at_most=None, equals=None):
+    bounds = [f'>= {at_least}' if at_least is not None else None,
+              f'<= {at_most}' if at_most is not None else None,
+              f'== {equals}' if equals is not None else None]
+    return ' and '.join(bound for bound in bounds if bound) or 'truthy'
+
+
+def pipeline_status(sdc_executor, pipeline, *statuses):
+    """Condition on a pipeline being in one of the given statuses (e.g. ``'RUNNING'``, ``'RETRY'``, ``'FINISHED'``)."""
+    def status():
+        return sdc_executor.get_pipeline_status(pipeline).response.json().get('status')
+    return Condition(status, lambda value: value in statuses,
+                     f'pipeline {pipeline.id} status in {", ".join(statuses)}')
+
+
+def pipeline_metric(sdc_executor, pipeline, value_of, name=None, at_least=None, at_most=None, equals=None):
+    """Condition on a metric of a running pipeline.
+
+    Args:
+        value_of (:obj:`callable` or :obj:`str`): Function getting the value from the pipeline metrics, or the name of
+            a counter (e.g. ``'stage.Trash_01.inputRecords.counter'``).
+        name (:obj:`str`, optional): Name of the metric in logs and errors. Default: ``value_of`` if a counter name.
+        at_least, at_most, equals (:obj:`int`, optional): Bounds the value must be within.
+    """
+    if isinstance(value_of, str):
+        counter, name = value_of, name or value_of
+
+        def value_of(metrics):
+            return metrics.counter(counter).count
+
+    def metric():
+        metrics = sdc_executor.get_pipeline_metrics(pipeline)
+        # Metrics are empty until the pipeline is running.
+        return value_of(metrics) if metrics else None
+
+    predicate = _threshold_predicate(at_least, at_most, equals)
+    description = _threshold_description(at_least, at_most, equals)
+    return Condition(metric, lambda value: value is not None and predicate(value),
+                     f'{name or "metric"} of pipeline {pipeline.id} {description}')
+
+
+def table_row_count(engine, table, at_least=None, at_most=None, equals=None):
+    """Condition on the number of rows of a table (a :py:class:`sqlalchemy.Table` or a table name)."""
+    if isinstance(table, str):
+        table = sqlalchemy.Table(table, sqlalchemy.MetaData(), autoload=True, autoload_with=engine)
+
+    def row_count():
+        with engine.connect() as connection:
+            return connection.execute(sqlalchemy.select([sqlalchemy.func.count()]).select_from(table)).scalar()
+    return Condition(row_count, _threshold_predicate(at_least, at_most, equals),
+                     f'row count of {table.name} {_threshold_description(at_least, at_most, equals)}')
+
+
+def file_exists(sdc_executor, path, exists=True):
+    """Condition on a file existing (or not, with ``exists=False``) on SDC's file system."""
+    def file_exists_():
+        return sdc_executor.execute_shell(f'test -e {path}').exit_code == '0'
+    return Condition(file_exists_, lambda value: value == exists, f'{path} {"existing" if exists else "missing"}')
+
+
+def _partitions(consumer, topic):
+    from kafka import TopicPartition
+    return [TopicPartition(topic, partition) for partition in consumer.partitions_for_topic(topic) or []]
+
+
+def topic_end_offset(brokers, topic, at_least=None, at_most=None, equals=None):
+    """Condition on the number of messages of a Kafka topic (the sum of the end offsets of its partitions)."""
+    from kafka import KafkaConsumer
+
+    def end_offset():
+        consumer = KafkaConsumer(bootstrap_servers=brokers)
+        try:
+            return sum(consumer.end_offsets(_partitions(consumer, topic)).values())
+        finally:
+            consumer.close()
+    return Condition(end_offset, _threshold_predicate(at_least, at_most, equals),
+                     f'end offset of topic {topic} {_threshold_description(at_least, at_most, equals)}')
+
+
+def consumer_group_lag(brokers, group_id, topic, at_most=0):
+    """Condition on the lag of a Kafka consumer group on a topic (messages not committed yet, over all partitions)."""
+    from kafka import KafkaAdminClient, KafkaConsumer
+
+    def lag():
+        admin = KafkaAdminClient(bootstrap_servers=brokers)
+        consumer = KafkaConsumer(bootstrap_servers=brokers)
+        try:
+            committed = admin.list_consumer_group_offsets(group_id)
+            end_offsets = consumer.end_offsets(_partitions(consumer, topic))
+            return sum(end_offset - (committed[partition].offset if partition in committed else 0)
+                       for partition, end_offset in end_offsets.items())
+        finally:
+            consumer.close()
+            admin.close()
+    return Condition(lag, _threshold_predicate(at_most=at_most),
+                     f'lag of consumer group {group_id} on topic {topic} <= {at_most}')
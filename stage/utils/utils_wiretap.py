@@ -0,0 +1,207 @@
+# Copyright 2021 StreamSets Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A module providing a wiretap whose records can be read while the pipeline runs. Records go to a Local FS destination
+# writing JSON lines in a directory on SDC, which is read incrementally with execute_shell(). Records are kept as their
+# raw JSON and only decoded when accessed, and can be counted on SDC's side without being transferred at all.
+
+import base64
+import json
+import logging
+import os
+import random
+import time
+import uuid
+
+from .utils_shell import ShellBatch
+from .utils_wait import Condition, WaitTimeoutError, wait_until
+
+logger = logging.getLogger(__name__)
+
+# Prefix Local FS gives to the files it is still writing to.
+TMP_FILE_PREFIX = '_tmp_'
+
+DEFAULT_POLL_INTERVAL_SEC = 1
+
+# Value of RawRecord._field until the record is decoded, as None is a valid JSON value.
+_UNDECODED = object()
+
+
+class RawRecord:
+    """A record written by a :py:class:`StreamingWiretap`, kept as raw JSON until its field is accessed.
+
+    Unlike the records of STF's wiretap, :py:attr:`field` holds plain Python values (no SDC types nor header).
+    """
+    __slots__ = ('raw', '_field')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._field = _UNDECODED
+
+    @property
+    def field(self):
+        if self._field is _UNDECODED:
+            self._field = json.loads(self.raw)
+        return self._field
+
+    def __repr__(self):
+        return f'RawRecord({self.raw!r})'
+
+
+class StreamingWiretap:
+    """Wiretap whose records can be read incrementally while the pipeline runs.
+
+    Connect stages to :py:attr:`destination` as to the destination of ``pipeline_builder.add_wiretap()``.
+
+    Args:
+        sdc_executor (:py:class:`streamsets.testframework.sdc.DataCollector`): Data Collector running the pipeline.
+        pipeline_builder (:py:class:`streamsets.sdk.sdc_models.PipelineBuilder`): Builder of the pipeline.
+        directory (:obj:`str`, optional): Directory on SDC to write the records to. Default: a new one under ``/tmp``
+        max_records (:obj:`int`, optional): Number of records kept in memory at most; the following ones are only
+            counted. Default: ``None`` (no limit)
+    """
+    def __init__(self, sdc_executor, pipeline_builder, directory=None, max_records=None):
+        self.sdc_executor = sdc_executor
+        self.directory = directory or f'/tmp/stf-wiretap-{uuid.uuid4().hex}'
+        self.max_records = max_records
+        self.destination = pipeline_builder.add_stage('Local FS', type='destination')
+        self.destination.set_attributes(data_format='JSON',
+                                        directory_template=self.directory,
+                                        files_prefix='wiretap',
+                                        files_suffix='json',
+                                        max_records_in_file=0,
+                                        idle_timeout='-1')
+        self._records = []
+        self._received = 0
+        # Bytes read so far and incomplete last line, by file name (without TMP_FILE_PREFIX, which Local FS removes
+        # when closing a file).
+        self._offsets = {}
+        self._partial_lines = {}
+
+    def _file_sizes(self):
+        command = self.sdc_executor.execute_shell(f"find {self.directory} -maxdepth 1 -type f -printf '%f %s\\n'")
+        sizes = {}
+        for line in (command.stdout or '').splitlines():
+            name, size = line.rsplit(' ', 1)
+            sizes[name[len(TMP_FILE_PREFIX):] if name.startswith(TMP_FILE_PREFIX) else name] = int(size)
+        return sizes
+
+    def poll(self):
+        """Read the records written since the last poll.
+
+        Returns:
+            A :obj:`list` of the new :py:class:`RawRecord`, including those not kept because of ``max_records``.
+        """
+        reads = [(name, self._offsets.get(name, 0), size) for name, size in sorted(self._file_sizes().items())
+                 if size > self._offsets.get(name, 0)]
+        if not reads:
+            return []
+
+        shell = ShellBatch(self.sdc_executor)
+        for name, offset, size in reads:
+            # The file is renamed when Local FS closes it, which may happen between listing and reading it.
+            path, tmp_path = os.path.join(self.directory, name), os.path.join(self.directory, TMP_FILE_PREFIX + name)
+            # Bytes are sent as base64, so that what is read is exactly what the file holds (line endings, encoding).
+            shell.add(f'f={tmp_path}; [ -e "$f" ] || f={path}; '
+                      f'tail -c +{offset + 1} "$f" | head -c {size - offset} | base64')
+
+        new_records = []
+        for (name, offset, size), result in zip(reads, shell.run(check=True)):
+            data = base64.b64decode(result.stdout)
+            self._offsets[name] = offset + len(data)
+            lines = (self._partial_lines.pop(name, b'') + data).split(b'\n')
+            if lines[-1]:
+                self._partial_lines[name] = lines[-1]
+            new_records.extend(RawRecord(line) for line in lines[:-1] if line)
+
+        self._received += len(new_records)
+        if self.max_records is None:
+            self._records.extend(new_records)
+        else:
+            self._records.extend(new_records[:max(self.max_records - len(self._records), 0)])
+        return new_records
+
+    def iter_records(self, count=None, timeout_sec=60, poll_interval_sec=DEFAULT_POLL_INTERVAL_SEC):
+        """Iterate over records as they are written.
+
+        Args:
+            count (:obj:`int`, optional): Stop after this many records. Default: ``None`` (stop after ``timeout_sec``
+                without new records)
+            timeout_sec (:obj:`float`, optional): Time to wait for new records at most. Default: ``60``
+            poll_interval_sec (:obj:`float`, optional): Time between two polls. Default:
+                :py:const:`DEFAULT_POLL_INTERVAL_SEC`
+
+        Raises:
+            :py:class:`stage.utils.utils_wait.WaitTimeoutError`: If ``count`` records were not received before the
+                timeout.
+        """
+        # Records already received are yielded first.
+        yielded = 0
+        for record in self._records:
+            if count is not None and yielded >= count:
+                return
+            yield record
+            yielded += 1
+        last_record_time = time.monotonic()
+        while count is None or yielded < count:
+            records = self.poll()
+            if records:
+                last_record_time = time.monotonic()
+            elif time.monotonic() - last_record_time > timeout_sec:
+                if count is not None:
+                    raise WaitTimeoutError(f'Timed out after {timeout_sec} seconds without new records; '
+                                           f'received {yielded} of {count} records')
+                return
+            for record in records:
+                if count is not None and yielded >= count:
+                    return
+                yield record
+                yielded += 1
+            if not records:
+                time.sleep(poll_interval_sec)
+
+    def count(self):
+        """Count the records written so far, on SDC's side, without transferring them."""
+        command = self.sdc_executor.execute_shell(f'cat {self.directory}/* 2>/dev/null | wc -l')
+        return int((command.stdout or '').strip() or 0)
+
+    def wait_for_count(self, count, timeout_sec=120):
+        """Wait until at least ``count`` records were written, e.g. to stop the pipeline as soon as they are."""
+        return wait_until(Condition(self.count, lambda value: value >= count, f'{count} records in wiretap'),
+                          timeout_sec=timeout_sec)
+
+    @property
+    def output_records(self):
+        """Records received so far (after polling for new ones), at most ``max_records`` of them."""
+        self.poll()
+        return self._records
+
+    @property
+    def received_count(self):
+        """Number of records received so far, including those not kept because of ``max_records``."""
+        return self._received
+
+    def sample(self, size, seed=None):
+        """Get a random sample of the records received so far.
+
+        Args:
+            size (:obj:`int`): Number of records in the sample (or fewer, if fewer were received).
+            seed (:obj:`int`, optional): Seed of the random generator. Default: ``None``
+        """
+        records = self.output_records
+        return random.Random(seed).sample(records, min(size, len(records)))
+
+    def remove(self):
+        """Delete the records written on SDC."""
+        self.sdc_executor.execute_shell(f'rm -rf {self.directory}')